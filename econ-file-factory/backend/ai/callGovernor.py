@@ -0,0 +1,306 @@
+"""
+AI Call Governor Module
+Puts every OpenAI request of a pipeline run under one set of limits: a
+time budget for the run's calls as a whole, a timeout per attempt, retries with jittered
+exponential backoff, and a circuit breaker that stops calling an upstream
+that keeps failing. A call the governor won't make raises AIUnavailable, which
+callers handle like any other API error by using their local fallback.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar('T')
+
+# Seconds a run may spend on AI calls in total. Only time with a call in
+# flight counts, so local work between calls doesn't use up the budget.
+DEFAULT_AI_BUDGET_SECONDS = 20.0
+
+# Seconds allowed for one attempt at a call
+DEFAULT_AI_CALL_TIMEOUT = 10.0
+
+# Attempts after the first for a failed call
+DEFAULT_AI_RETRIES = 2
+
+# Consecutive failures that open the circuit, and seconds it stays open
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_COOLDOWN_SECONDS = 30.0
+
+# Backoff before retry n is drawn from [0, min(BACKOFF_MAX, BACKOFF_BASE * 2**n)]
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 4.0
+
+# HTTP statuses that won't change on a retry
+_NON_RETRYABLE_STATUSES = {400, 401, 403, 404, 422}
+
+
+class AIUnavailable(RuntimeError):
+    """
+    Raised instead of calling the API when the circuit is open or the run's
+    budget is spent.
+    """
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker, safe to share across threads and runs.
+
+    After `failure_threshold` failures in a row the circuit opens and calls
+    are refused for `cooldown_seconds`. Then one trial call is let through:
+    success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 cooldown_seconds: float = DEFAULT_COOLDOWN_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.clock = clock
+        self.failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """
+        'closed', 'open' or 'half_open' (cooldown over, trial call allowed).
+        """
+        with self._lock:
+            return self._state()
+
+    def allow(self) -> bool:
+        """
+        Whether a call may be made now. In the half-open state only one
+        caller is let through until it reports back.
+        """
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                self._opened_at = self.clock()
+            self._trial_running = False
+
+    def release_trial(self) -> None:
+        """
+        Let another caller make the half-open trial, when a trial call was
+        abandoned without an outcome.
+        """
+        with self._lock:
+            self._trial_running = False
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return 'closed'
+        if self.clock() - self._opened_at < self.cooldown_seconds:
+            return 'open'
+        return 'half_open'
+
+
+class AICallGovernor:
+    """
+    Limits and accounting for the AI calls of one pipeline run.
+
+    Calls are made through `call` (sync) or `acall` (async) with a function
+    that takes the timeout for the attempt in seconds, so the timeout can be
+    handed to the client. Several governors can share one CircuitBreaker.
+
+    The budget is charged for the time at least one call is in progress,
+    retries and backoff included; concurrent calls are charged once.
+    """
+
+    def __init__(self, budget_seconds: Optional[float] = DEFAULT_AI_BUDGET_SECONDS,
+                 call_timeout: float = DEFAULT_AI_CALL_TIMEOUT,
+                 max_retries: int = DEFAULT_AI_RETRIES,
+                 breaker: Optional[CircuitBreaker] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.budget_seconds = budget_seconds
+        self.call_timeout = call_timeout
+        self.max_retries = max_retries
+        self.breaker = breaker if breaker is not None else CircuitBreaker(clock=clock)
+        self.clock = clock
+        self.sleep = sleep
+        self.counters = {'calls': 0, 'retries': 0, 'failures': 0, 'refused': 0}
+        self.wait_seconds = 0.0
+        self._spent = 0.0
+        self._in_flight = 0
+        self._active_since: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """
+        Whether calls would currently be attempted, without claiming the
+        circuit's half-open trial.
+        """
+        return self.breaker.state != 'open' and self.remaining() != 0
+
+    def remaining(self) -> Optional[float]:
+        """
+        Seconds left in the run's budget, or None if it has no budget.
+        """
+        if self.budget_seconds is None:
+            return None
+        with self._lock:
+            spent = self._spent
+            if self._in_flight:
+                spent += self.clock() - self._active_since
+        return max(0.0, self.budget_seconds - spent)
+
+    def call(self, request: Callable[[float], T]) -> T:
+        """
+        Make a call, retrying failures with jittered backoff.
+
+        Raises:
+            AIUnavailable: If the circuit is open or the budget is spent
+                before an attempt
+            Exception: The last attempt's error, once retries are used up
+        """
+        self._enter_call()
+        try:
+            attempt = 0
+            while True:
+                timeout = self._begin_attempt(attempt)
+                started = self.clock()
+                try:
+                    result = request(timeout)
+                except Exception as e:
+                    self._end_attempt(started, ok=False)
+                    delay = self._retry_delay(attempt, e)
+                    if delay is None:
+                        raise
+                    self.sleep(delay)
+                    attempt += 1
+                else:
+                    self._end_attempt(started, ok=True)
+                    return result
+        finally:
+            self._leave_call()
+
+    async def acall(self, request: Callable[[float], Awaitable[T]]) -> T:
+        """
+        Async version of `call`. Each attempt is also bounded with
+        asyncio.wait_for, in case the client doesn't honour the timeout.
+        """
+        self._enter_call()
+        try:
+            attempt = 0
+            while True:
+                timeout = self._begin_attempt(attempt)
+                started = self.clock()
+                try:
+                    result = await asyncio.wait_for(request(timeout), timeout)
+                except asyncio.CancelledError:
+                    self._end_attempt(started, ok=None)
+                    raise
+                except Exception as e:
+                    self._end_attempt(started, ok=False)
+                    delay = self._retry_delay(attempt, e)
+                    if delay is None:
+                        raise
+                    await asyncio.sleep(delay)
+                    attempt += 1
+                else:
+                    self._end_attempt(started, ok=True)
+                    return result
+        finally:
+            self._leave_call()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Counters, total seconds spent waiting on calls, budget left and
+        circuit state.
+        """
+        remaining = self.remaining()
+        with self._lock:
+            return {
+                **self.counters,
+                'wait_seconds': round(self.wait_seconds, 3),
+                'budget_seconds': self.budget_seconds,
+                'budget_remaining_seconds': None if remaining is None else round(remaining, 3),
+                'circuit': self.breaker.state,
+            }
+
+    def _enter_call(self) -> None:
+        """
+        Start charging the budget, if this is the only call in progress.
+        """
+        with self._lock:
+            if self._in_flight == 0:
+                self._active_since = self.clock()
+            self._in_flight += 1
+
+    def _leave_call(self) -> None:
+        """
+        Stop charging the budget once no call is in progress.
+        """
+        with self._lock:
+            self._in_flight -= 1
+            if self._in_flight == 0:
+                self._spent += self.clock() - self._active_since
+                self._active_since = None
+
+    def _begin_attempt(self, attempt: int) -> float:
+        """
+        Check the circuit and the budget, and return the timeout for this
+        attempt.
+        """
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            self._refuse("AI budget for this run is spent")
+        if not self.breaker.allow():
+            self._refuse("AI circuit is open after repeated failures")
+        with self._lock:
+            self.counters['calls' if attempt == 0 else 'retries'] += 1
+        return self.call_timeout if remaining is None else min(self.call_timeout, remaining)
+
+    def _end_attempt(self, started: float, ok: Optional[bool]) -> None:
+        with self._lock:
+            self.wait_seconds += self.clock() - started
+            if ok is False:
+                self.counters['failures'] += 1
+        if ok:
+            self.breaker.record_success()
+        elif ok is False:
+            self.breaker.record_failure()
+        else:
+            # Cancelled by the caller: neither outcome
+            self.breaker.release_trial()
+
+    def _retry_delay(self, attempt: int, error: Exception) -> Optional[float]:
+        """
+        Seconds to wait before retrying, or None if the error shouldn't be
+        retried or there is no attempt, budget or circuit left for it.
+        """
+        if attempt >= self.max_retries or isinstance(error, AIUnavailable):
+            return None
+        if getattr(error, 'status_code', None) in _NON_RETRYABLE_STATUSES:
+            return None
+        delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+        remaining = self.remaining()
+        if (remaining is not None and remaining <= delay) or self.breaker.state == 'open':
+            return None
+        return delay
+
+    def _refuse(self, reason: str) -> None:
+        with self._lock:
+            self.counters['refused'] += 1
+        raise AIUnavailable(reason)
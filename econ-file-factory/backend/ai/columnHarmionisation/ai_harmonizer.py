@@ -8,14 +8,19 @@ from typing import Dict, List, Tuple, Optional, Any
 from openai import OpenAI
 from datetime import timedelta
 
+from ai.callGovernor import AICallGovernor
+
 class AIHarmonizer:
-    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4-turbo"):
+    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4-turbo",
+                 governor: Optional[AICallGovernor] = None):
         """
         Initialize the AI Harmonizer with OpenAI API.
         
         Args:
             api_key: OpenAI API key (if None, will try to get from environment)
             model: OpenAI model to use
+            governor: Budget, timeouts, retries and circuit breaker for the
+                API calls (default: a governor of its own)
         """
         print("[AIHarmonizer] Initializing...")
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
@@ -24,8 +29,10 @@ class AIHarmonizer:
             raise ValueError("OpenAI API key must be provided or set as OPENAI_API_KEY environment variable")
         
         print(f"[AIHarmonizer] Using OpenAI model: {model}")
-        self.client = OpenAI(api_key=self.api_key)
+        # Retries are the governor's job
+        self.client = OpenAI(api_key=self.api_key, max_retries=0)
         self.model = model
+        self.governor = governor or AICallGovernor()
 
         # Default canonical columns for economic/business data
         self.canonical_columns = ['company_id', 'company_name', 'year', 'month', 'quarter', 'revenue',
@@ -131,15 +138,16 @@ Ensure ALL input columns are included in the response."""
 
             print("[AIHarmonizer] Sending request to OpenAI API...")
             # Call OpenAI API with structured output
-            response = self.client.chat.completions.create(
+            response = self.governor.call(lambda timeout: self.client.chat.completions.create(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
                 ],
                 response_format={"type": "json_object"},
-                temperature=0.1  # Low temperature for consistent mappings
-            )
+                temperature=0.1,  # Low temperature for consistent mappings
+                timeout=timeout
+            ))
             print("[AIHarmonizer] OpenAI API call completed. Parsing response...")
 
             # Parse the response
@@ -294,7 +302,8 @@ Ensure ALL input columns are included in the response."""
             "success_rate": (high_confidence + medium_confidence) / total_columns if total_columns > 0 else 0
         }
 
-def harmonize_columns(input_columns: List[str], context: Optional[str] = None, api_key: Optional[str] = None, sample_data: Optional[Dict[str, List]] = None) -> Dict[str, Dict[str, Any]]:
+def harmonize_columns(input_columns: List[str], context: Optional[str] = None, api_key: Optional[str] = None, sample_data: Optional[Dict[str, List]] = None,
+                      governor: Optional[AICallGovernor] = None) -> Dict[str, Dict[str, Any]]:
     """
     Standalone function for column harmonization.
     
@@ -303,12 +312,13 @@ def harmonize_columns(input_columns: List[str], context: Optional[str] = None, a
         context: Optional context about the data
         api_key: OpenAI API key
         sample_data: Optional sample data for context
+        governor: Limits on the API call
         
     Returns:
         Dictionary mapping each input column to harmonization info
     """
     try:
-        harmonizer = AIHarmonizer(api_key=api_key)
+        harmonizer = AIHarmonizer(api_key=api_key, governor=governor)
         return harmonizer.harmonize_columns(input_columns, context=context, sample_data=sample_data)
     except Exception as e:
         print(f"[Harmonizer] Error in harmonize_columns: {e}")
@@ -2,12 +2,14 @@ import hashlib
 import json
 import os
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
 import sqlite3
 from difflib import get_close_matches
 
 from openai import OpenAI
 
+from ai.callGovernor import AICallGovernor
+
 CACHE_PATH = Path.home() / ".wrangler_schema_cache.sqlite"
 
 CANONICAL_VARS = [
@@ -41,12 +43,14 @@ def heuristic_mapping(columns: List[str]) -> Dict[str, str]:
     return {c: canonicalize_variable(c) for c in columns}
 
 
-def llm_mapping(columns: List[str], api_key=None) -> Dict[str, str]:
+def llm_mapping(columns: List[str], api_key=None,
+                governor: Optional[AICallGovernor] = None) -> Dict[str, str]:
     if api_key is None:
         api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         return heuristic_mapping(columns)
-    client = OpenAI(api_key=api_key)
+    client = OpenAI(api_key=api_key, max_retries=0)
+    governor = governor or AICallGovernor()
     prompt = (
         "Map each input column to the best canonical name from this list: "
         + ", ".join(CANONICAL_VARS)
@@ -54,23 +58,25 @@ def llm_mapping(columns: List[str], api_key=None) -> Dict[str, str]:
         + ", ".join(columns)
     )
     try:
-        resp = client.chat.completions.create(
+        resp = governor.call(lambda timeout: client.chat.completions.create(
             model="gpt-4-turbo",
             messages=[{"role": "user", "content": prompt}],
             response_format={"type": "json_object"},
-            temperature=0
-        )
+            temperature=0,
+            timeout=timeout
+        ))
         return json.loads(resp.choices[0].message.content)
     except Exception:
         return heuristic_mapping(columns)
 
 
-def infer_mapping(columns: List[str], api_key=None) -> Dict[str, str]:
+def infer_mapping(columns: List[str], api_key=None,
+                  governor: Optional[AICallGovernor] = None) -> Dict[str, str]:
     cache = SchemaCache()
     cached = cache.get(columns)
     if cached:
         return cached
-    mapping = llm_mapping(columns, api_key=api_key)
+    mapping = llm_mapping(columns, api_key=api_key, governor=governor)
     cache.set(columns, mapping)
     return mapping
 
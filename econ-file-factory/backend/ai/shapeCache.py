@@ -0,0 +1,148 @@
+"""
+Shape Cache Module
+Persistent cache of AI shape detections, keyed by a fingerprint of a sample's
+header layout and value patterns, so files laid out like one seen before are
+classified without another AI request. Entries expire after a TTL and the
+least recently used ones are evicted once the cache is full.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+import pandas as pd
+
+
+SHAPE_CACHE_PATH = Path.home() / ".wrangler_shape_cache.sqlite"
+
+# Detections older than this are treated as misses and removed
+DEFAULT_TTL_SECONDS = 30 * 24 * 60 * 60
+
+# Number of entries kept before least recently used ones are evicted
+DEFAULT_MAX_ENTRIES = 10_000
+
+# Rows looked at for the value-pattern signature
+SIGNATURE_ROWS = 5
+
+_DIGITS = re.compile(r'\d+')
+_SEPARATORS = re.compile(r'[^0-9a-z]+')
+
+
+def shape_fingerprint(sample_df: pd.DataFrame) -> str:
+    """
+    Fingerprint of a sample's layout.
+
+    Each column contributes its normalized header (lower case, separators
+    collapsed, digit runs replaced by their length) and the kind of values in
+    its first rows. Runs of identical columns are collapsed, so a wide file
+    that gained another year of columns keeps the same fingerprint.
+    """
+    signature = []
+    for position, col in enumerate(sample_df.columns):
+        column = (_normalize_header(col), _value_kind(sample_df.iloc[:SIGNATURE_ROWS, position]))
+        if not signature or signature[-1] != column:
+            signature.append(column)
+    return hashlib.sha256(json.dumps(signature).encode()).hexdigest()
+
+
+class ShapeCache:
+    """
+    Bounded, TTL-limited cache of fingerprint -> detected shape.
+
+    Counters for hits, misses, stores, expirations and evictions are kept for
+    the lifetime of the object.
+    """
+
+    def __init__(self, path: Any = SHAPE_CACHE_PATH,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.counters = {'hits': 0, 'misses': 0, 'stores': 0, 'expired': 0, 'evictions': 0}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS shapes "
+                "(key TEXT PRIMARY KEY, shape TEXT, created REAL, last_used REAL)"
+            )
+
+    def get(self, key: str, now: Optional[float] = None) -> Optional[str]:
+        """
+        The shape stored under a fingerprint, or None on a miss.
+        """
+        now = time.time() if now is None else now
+        with self._connect() as conn:
+            row = conn.execute("SELECT shape, created FROM shapes WHERE key=?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM shapes WHERE key=?", (key,))
+                self.counters['expired'] += 1
+                row = None
+            if row is None:
+                self.counters['misses'] += 1
+                return None
+            conn.execute("UPDATE shapes SET last_used=? WHERE key=?", (now, key))
+        self.counters['hits'] += 1
+        return row[0]
+
+    def put(self, key: str, shape: str, now: Optional[float] = None) -> None:
+        """
+        Store a detected shape, evicting old entries to stay within max_entries.
+        """
+        now = time.time() if now is None else now
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO shapes VALUES (?, ?, ?, ?)", (key, shape, now, now))
+            count = conn.execute("SELECT COUNT(*) FROM shapes").fetchone()[0]
+            if count > self.max_entries:
+                stale = conn.execute(
+                    "SELECT key FROM shapes ORDER BY last_used LIMIT ?", (count - self.max_entries,)
+                ).fetchall()
+                conn.executemany("DELETE FROM shapes WHERE key=?", stale)
+                self.counters['evictions'] += len(stale)
+        self.counters['stores'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Counters plus the number of stored entries.
+        """
+        with self._connect() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM shapes").fetchone()[0]
+        return {**self.counters, 'entries': count}
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """
+        Open the database for one operation, so the cache can be shared
+        across threads and processes. Commits on success.
+        """
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def _normalize_header(col: Any) -> str:
+    header = _SEPARATORS.sub('_', str(col).strip().lower()).strip('_')
+    return _DIGITS.sub(lambda m: f"<{len(m.group(0))}>", header)
+
+
+def _value_kind(values: pd.Series) -> str:
+    """
+    Coarse kind of a column's values: 'empty', 'year', 'number' or 'text'.
+    """
+    values = values.dropna()
+    if values.empty:
+        return 'empty'
+    numbers = pd.to_numeric(values, errors='coerce')
+    if numbers.notna().all():
+        if ((numbers % 1 == 0) & numbers.between(1800, 2100)).all():
+            return 'year'
+        return 'number'
+    return 'text'
@@ -3,20 +3,52 @@ AI Shape Detection Module
 Uses OpenAI to detect the format/shape of datasets.
 """
 
+import asyncio
 import json
 import os
-from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
 import pandas as pd
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 
+from ai.callGovernor import AICallGovernor
+from ai.shapeCache import ShapeCache, shape_fingerprint
+from local.wrangler.shapeClassifier import classify_shape
 
-def detect_data_shape(sample_df: pd.DataFrame, api_key: Optional[str] = None) -> str:
+
+# Format types the AI can answer with
+SHAPE_FORMATS = [
+    'wide', 'two_row_header', 'key_value', 'cross_tab',
+    'fully_transposed', 'stacked_multi_time_long', 'pivoted_by_variable', 'unknown'
+]
+
+SHAPE_MODEL = "gpt-4-turbo"
+
+# Classification requests in flight at once in detect_data_shapes
+DEFAULT_SHAPE_CONCURRENCY = 8
+
+# Seconds allowed for one classification request, retries included
+DEFAULT_SHAPE_TIMEOUT = 30.0
+
+# Samples classified by one request in batched mode
+SHAPE_BATCH_SIZE = 20
+
+
+def detect_data_shape(sample_df: pd.DataFrame, api_key: Optional[str] = None,
+                      cache: Optional[ShapeCache] = None,
+                      confidence_threshold: Optional[float] = None,
+                      governor: Optional[AICallGovernor] = None) -> str:
     """
     Detect the shape format of a dataset using AI.
     
     Args:
         sample_df: Sample DataFrame (headers + a few rows)
         api_key: OpenAI API key
+        cache: Shape cache consulted before the AI request. Only shapes the
+            AI returned are stored, never local fallbacks.
+        confidence_threshold: When set, the local classifier's answer is used
+            without asking the AI if its confidence is at least this
+        governor: Limits on the AI call (default: a governor of its own)
         
     Returns:
         String indicating the detected format type
@@ -24,72 +56,317 @@ def detect_data_shape(sample_df: pd.DataFrame, api_key: Optional[str] = None) ->
     if api_key is None:
         api_key = os.getenv("OPENAI_API_KEY")
     
+    local = classify_shape(sample_df)
     if not api_key:
         print("[ShapeDetection] No API key available, using local fallback")
-        return _local_shape_detection(sample_df)
+        return local['shape']
+    if confidence_threshold is not None and local['confidence'] >= confidence_threshold:
+        return local['shape']
     
-    try:
-        client = OpenAI(api_key=api_key)
-        
-        # Prepare the sample data for AI analysis
-        sample_info = _prepare_sample_for_ai(sample_df)
-        
-        # Generate all format descriptions with type: description format
-        format_types = [
-            'wide', 'two_row_header', 'key_value', 'cross_tab',
-            'fully_transposed', 'stacked_multi_time_long', 'pivoted_by_variable', 'unknown'
-        ]
-        descriptions = [f"{fmt}: {get_shape_description(fmt)}" for fmt in format_types]
-        descriptions_text = "\n".join(descriptions)
+    key = None
+    if cache is not None:
+        key = shape_fingerprint(sample_df)
+        cached_shape = cache.get(key)
+        if cached_shape is not None:
+            print(f"[ShapeDetection] Shape cache hit: {cached_shape}")
+            return cached_shape
+    
+    detected_format = _detect_shape_with_ai(sample_df, api_key, governor)
+    if detected_format is None:
+        return local['shape']
+    if cache is not None:
+        cache.put(key, detected_format)
+    return detected_format
+
+
+def detect_data_shapes(sample_dfs: List[pd.DataFrame], api_key: Optional[str] = None,
+                       cache: Optional[ShapeCache] = None,
+                       max_concurrency: int = DEFAULT_SHAPE_CONCURRENCY,
+                       timeout: float = DEFAULT_SHAPE_TIMEOUT,
+                       base_url: Optional[str] = None,
+                       batched: bool = False,
+                       confidence_threshold: Optional[float] = None,
+                       governor: Optional[AICallGovernor] = None) -> List[Dict[str, Any]]:
+    """
+    Detect the shapes of several samples, sending the AI requests concurrently.
+    
+    Samples found in the cache are not sent, and samples with the same layout
+    fingerprint are sent once. The requests share one async client with at
+    most `max_concurrency` in flight; a request that fails,
+    takes longer than `timeout` seconds or gives an invalid answer falls back
+    to local detection.
+    
+    In batched mode up to SHAPE_BATCH_SIZE samples are classified by one
+    request that asks for a JSON answer, so the format descriptions are sent
+    once per batch rather than once per file. Samples the answer leaves out
+    or labels with an unknown format are then sent on their own.
+    
+    With a `confidence_threshold`, samples the local classifier is at least
+    that confident about are not sent either.
+    
+    Args:
+        sample_dfs: Sample DataFrames (headers + a few rows)
+        api_key: OpenAI API key
+        cache: Shape cache consulted before the AI requests
+        max_concurrency: Maximum number of requests in flight
+        timeout: Seconds allowed per request, retries included
+        base_url: API base URL (default: the OpenAI API)
+        batched: Classify several samples per request
+        confidence_threshold: Local classifier confidence at or above which
+            the AI isn't asked (default: always ask)
+        governor: Budget, retries and circuit breaker the requests are made
+            under (default: a governor of its own)
         
-        # Improved AI prompt for shape detection
-        prompt = build_shape_detection_prompt(sample_info['columns'], sample_info['sample_data'])
-
-        # Compose the system prompt with type: description format
-        system_prompt = (
-            "You are an expert in identifying dataset formats. "
-            "Your task is to analyze a provided dataset sample and determine its format type. "
-            "The possible format types are listed below with their descriptions.\n"
-            f"{descriptions_text}\n"
-            "The provided dataset sample includes both column information and a data sample. Ensure that these elements are clear and correctly formatted for accurate analysis."
+    Returns:
+        One {'shape', 'detected_by', 'confidence'} dict per sample, in sample
+        order; 'detected_by' is 'cache', 'ai' or 'local' and 'confidence' is
+        the local classifier's
+    """
+    if api_key is None:
+        api_key = os.getenv("OPENAI_API_KEY")
+    
+    local = [classify_shape(df) for df in sample_dfs]
+    if not api_key:
+        print("[ShapeDetection] No API key available, using local fallback")
+        return [_local_result(classification) for classification in local]
+    
+    results: List[Optional[Dict[str, Any]]] = [None] * len(sample_dfs)
+    keys = [shape_fingerprint(df) for df in sample_dfs]
+    pending: Dict[str, List[int]] = {}
+    for i, key in enumerate(keys):
+        if confidence_threshold is not None and local[i]['confidence'] >= confidence_threshold:
+            results[i] = _local_result(local[i])
+            continue
+        if key in pending:
+            pending[key].append(i)
+            continue
+        cached_shape = cache.get(key) if cache is not None else None
+        if cached_shape is not None:
+            results[i] = {'shape': cached_shape, 'detected_by': 'cache', 'confidence': local[i]['confidence']}
+        else:
+            pending[key] = [i]
+    
+    if pending:
+        answers = _run_coroutine(_classify_concurrently(
+            [sample_dfs[indexes[0]] for indexes in pending.values()],
+            api_key, max_concurrency, timeout, base_url, batched, governor
+        ))
+        for (key, indexes), shape in zip(pending.items(), answers):
+            if shape is not None and cache is not None:
+                cache.put(key, shape)
+            for i in indexes:
+                if shape is None:
+                    results[i] = _local_result(local[i])
+                else:
+                    results[i] = {'shape': shape, 'detected_by': 'ai', 'confidence': local[i]['confidence']}
+    
+    print(f"[ShapeDetection] Detected {len(sample_dfs)} shapes, {len(pending)} sent to the AI")
+    return results
+
+
+def _local_result(classification: Dict[str, Any]) -> Dict[str, Any]:
+    return {'shape': classification['shape'], 'detected_by': 'local', 'confidence': classification['confidence']}
+
+
+async def _classify_concurrently(sample_dfs: List[pd.DataFrame], api_key: str, max_concurrency: int,
+                                 timeout: float, base_url: Optional[str],
+                                 batched: bool = False,
+                                 governor: Optional[AICallGovernor] = None) -> List[Optional[str]]:
+    """
+    Classify samples over one async client, at most `max_concurrency`
+    requests at a time. Failed or invalid answers are None.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    governor = governor or AICallGovernor()
+    # Retries are the governor's job
+    client = AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=0)
+    
+    async def _complete(messages: List[Dict[str, str]], **options: Any) -> Optional[str]:
+        async with semaphore:
+            try:
+                response = await asyncio.wait_for(
+                    governor.acall(lambda attempt_timeout: client.chat.completions.create(
+                        model=SHAPE_MODEL,
+                        messages=messages,
+                        temperature=0.1,
+                        timeout=attempt_timeout,
+                        **options
+                    )),
+                    timeout
+                )
+            except asyncio.TimeoutError:
+                print(f"[ShapeDetection] AI detection timed out after {timeout}s")
+                return None
+            except Exception as e:
+                print(f"[ShapeDetection] AI detection failed: {e}")
+                return None
+        return response.choices[0].message.content
+    
+    async def _classify(sample_df: pd.DataFrame) -> Optional[str]:
+        return _parse_shape(await _complete(_shape_messages(sample_df), max_tokens=50))
+    
+    async def _classify_batch(batch: List[pd.DataFrame]) -> List[Optional[str]]:
+        content = await _complete(
+            _batch_shape_messages(batch),
+            max_tokens=50 + 20 * len(batch),
+            response_format={"type": "json_object"}
         )
+        return _parse_batch_shapes(content, len(batch))
+    
+    try:
+        if not batched or len(sample_dfs) < 2:
+            return list(await asyncio.gather(*(_classify(df) for df in sample_dfs)))
+        
+        batches = [sample_dfs[i:i + SHAPE_BATCH_SIZE] for i in range(0, len(sample_dfs), SHAPE_BATCH_SIZE)]
+        answers = [shape for shapes in await asyncio.gather(*(_classify_batch(b) for b in batches))
+                   for shape in shapes]
+        missing = [i for i, shape in enumerate(answers) if shape is None]
+        if missing:
+            print(f"[ShapeDetection] Batch answer missing {len(missing)} of {len(answers)} samples, "
+                  f"classifying them one by one")
+            retried = await asyncio.gather(*(_classify(sample_dfs[i]) for i in missing))
+            for i, shape in zip(missing, retried):
+                answers[i] = shape
+        return answers
+    finally:
+        await client.close()
+
+
+def _run_coroutine(coroutine: Any) -> Any:
+    """
+    Run a coroutine to completion from synchronous code, on a helper thread
+    if this thread already has a running event loop.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
 
+def _detect_shape_with_ai(sample_df: pd.DataFrame, api_key: str,
+                          governor: Optional[AICallGovernor] = None) -> Optional[str]:
+    """
+    Ask the AI for the shape of a sample. Returns None if the request fails
+    or the answer isn't a known format.
+    """
+    try:
+        client = OpenAI(api_key=api_key, max_retries=0)
+        governor = governor or AICallGovernor()
+        
         # Call OpenAI API
-        response = client.chat.completions.create(
-            model="gpt-4-turbo",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ],
+        response = governor.call(lambda timeout: client.chat.completions.create(
+            model=SHAPE_MODEL,
+            messages=_shape_messages(sample_df),
             temperature=0.1,  # Low temperature for consistent detection
-            max_tokens=50
-        )
-        
-        # Extract and validate the response
-        content = response.choices[0].message.content
-        if content is None:
-            print("[ShapeDetection] AI returned empty response, using local fallback")
-            return _local_shape_detection(sample_df)
-        # Robustly extract the first valid format type from the response
-        valid_formats = [
-            'wide', 'two_row_header', 'key_value', 'cross_tab', 'fully_transposed', 'stacked_multi_time_long', 'pivoted_by_variable', 'unknown'
-        ]
-        content_lower = content.strip().lower()
-        detected_format = None
-        for fmt in valid_formats:
-            if fmt in content_lower:
-                detected_format = fmt
-                break
-        if detected_format:
-            print(f"[ShapeDetection] AI detected format: {detected_format}")
-            return detected_format
-        else:
-            print(f"[ShapeDetection] AI returned invalid format '{content}', using local fallback")
-            return _local_shape_detection(sample_df)
+            max_tokens=50,
+            timeout=timeout
+        ))
+        return _parse_shape(response.choices[0].message.content)
             
     except Exception as e:
         print(f"[ShapeDetection] AI detection failed: {e}, using local fallback")
-        return _local_shape_detection(sample_df)
+        return None
+
+
+def _shape_messages(sample_df: pd.DataFrame) -> List[Dict[str, str]]:
+    """
+    Chat messages asking for the format type of one sample.
+    """
+    # Prepare the sample data for AI analysis
+    sample_info = _prepare_sample_for_ai(sample_df)
+    
+    # Improved AI prompt for shape detection
+    prompt = build_shape_detection_prompt(sample_info['columns'], sample_info['sample_data'])
+
+    # Compose the system prompt with type: description format
+    system_prompt = (
+        "You are an expert in identifying dataset formats. "
+        "Your task is to analyze a provided dataset sample and determine its format type. "
+        "The possible format types are listed below with their descriptions.\n"
+        f"{_format_descriptions()}\n"
+        "The provided dataset sample includes both column information and a data sample. Ensure that these elements are clear and correctly formatted for accurate analysis."
+    )
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def _batch_shape_messages(sample_dfs: List[pd.DataFrame]) -> List[Dict[str, str]]:
+    """
+    Chat messages asking for the format types of several samples at once,
+    answered as a JSON object mapping each sample's number to its format.
+    """
+    system_prompt = (
+        "You are an expert in identifying dataset formats. "
+        "Your task is to analyze several dataset samples and determine the format type of each. "
+        "The possible format types are listed below with their descriptions.\n"
+        f"{_format_descriptions()}\n"
+        "Each sample is numbered and includes both column information and a data sample."
+    )
+    samples = []
+    for number, sample_df in enumerate(sample_dfs):
+        sample_info = _prepare_sample_for_ai(sample_df)
+        samples.append(
+            f"Sample {number}:\nColumns: {sample_info['columns']}\nData Sample: {sample_info['sample_data']}"
+        )
+    prompt = (
+        'Return only a JSON object of the form {"formats": {"0": "<format type>", "1": "<format type>", ...}} '
+        "with one entry per sample, using the format types exactly as listed above. "
+        "If a sample does not match any of the listed types, use unknown.\n\n"
+        + "\n\n".join(samples)
+    )
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def _format_descriptions() -> str:
+    """
+    One 'type: description' line per format type.
+    """
+    return "\n".join(f"{fmt}: {get_shape_description(fmt)}" for fmt in SHAPE_FORMATS)
+
+
+def _parse_batch_shapes(content: Optional[str], count: int) -> List[Optional[str]]:
+    """
+    Read the per-sample formats from a batched JSON answer. Samples that are
+    missing or labelled with an unknown format type are None.
+    """
+    try:
+        formats = json.loads(content or '')['formats']
+    except (ValueError, KeyError, TypeError):
+        print(f"[ShapeDetection] AI returned an unreadable batch answer '{content}'")
+        return [None] * count
+    if not isinstance(formats, dict):
+        return [None] * count
+    
+    shapes = []
+    for number in range(count):
+        shape = formats.get(str(number))
+        shape = shape.strip().lower() if isinstance(shape, str) else None
+        shapes.append(shape if shape in SHAPE_FORMATS else None)
+    return shapes
+
+
+def _parse_shape(content: Optional[str]) -> Optional[str]:
+    """
+    Extract the first valid format type from an AI answer, or None.
+    """
+    if content is None:
+        print("[ShapeDetection] AI returned empty response, using local fallback")
+        return None
+    # Robustly extract the first valid format type from the response
+    content_lower = content.strip().lower()
+    for fmt in SHAPE_FORMATS:
+        if fmt in content_lower:
+            print(f"[ShapeDetection] AI detected format: {fmt}")
+            return fmt
+    print(f"[ShapeDetection] AI returned invalid format '{content}', using local fallback")
+    return None
 
 
 def _prepare_sample_for_ai(sample_df: pd.DataFrame) -> Dict[str, Any]:
@@ -117,64 +394,6 @@ def _prepare_sample_for_ai(sample_df: pd.DataFrame) -> Dict[str, Any]:
     }
 
 
-def _local_shape_detection(sample_df: pd.DataFrame) -> str:
-    """
-    Local fallback for shape detection using heuristics.
-    
-    Args:
-        sample_df: Sample DataFrame
-        
-    Returns:
-        String indicating the detected format type
-    """
-    columns = sample_df.columns.tolist()
-    
-    # Check for classic wide format (revenue_2020, emp_2021)
-    if any('_' in col and col.split('_')[-1].isdigit() and len(col.split('_')[-1]) == 4 for col in columns):
-        return 'wide'
-    
-    # Check for wide year prefix (2020_revenue, 2021_emp)
-    if any(col.split('_')[0].isdigit() and len(col.split('_')[0]) == 4 for col in columns if '_' in col):
-        return 'wide_year_prefix'
-    
-    # Check for key-value format
-    if 'variable' in columns and 'value' in columns:
-        return 'key_value'
-    
-    # Check for stacked multi-year long
-    if 'year' in columns:
-        return 'stacked_multi_year_long'
-    
-    # Check for two-row header (look for patterns in first few rows)
-    if len(sample_df) >= 2:
-        first_row = sample_df.iloc[0].astype(str)
-        second_row = sample_df.iloc[1].astype(str)
-        # Check if first row contains years and second row contains variables
-        if any(year.isdigit() and len(year) == 4 for year in first_row):
-            return 'two_row_header'
-    
-    # Check for cross-tab format (look for categorical columns)
-    categorical_cols = [col for col in columns if sample_df[col].dtype == 'object']
-    if len(categorical_cols) >= 2:
-        # Check if it looks like a cross-tabulation
-        unique_counts = [sample_df[col].nunique() for col in categorical_cols[:2]]
-        if all(count < 50 for count in unique_counts):  # Reasonable for categories
-            return 'cross_tab'
-    
-    # Check for fully transposed (years in first row)
-    if len(sample_df) > 0:
-        first_row_values = sample_df.iloc[0].astype(str)
-        if any(val.isdigit() and len(val) == 4 for val in first_row_values):
-            return 'fully_transposed'
-    
-    # Check for pivoted by variable (variables as rows)
-    if len(columns) <= 5:  # Few columns suggest variables might be in rows
-        return 'pivoted_by_variable'
-    
-    # Default to unknown
-    return 'unknown'
-
-
 def get_shape_description(shape_type: str) -> str:
 
     descriptions = {
@@ -0,0 +1,93 @@
+"""
+Stub Chat Server Module
+A local stand-in for the OpenAI chat completions endpoint, used by tests and
+benchmarks. It answers each request with the text returned by a responder
+callable, after an optional delay, and records what it was sent.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List
+
+
+class StubChatServer:
+    """
+    Threaded HTTP server answering POST .../chat/completions.
+
+    Use as a context manager and point a client at `base_url`. `requests`
+    holds the JSON body of every request received and `max_in_flight` the
+    largest number of requests that were being answered at once.
+    """
+
+    def __init__(self, responder: Callable[[Dict[str, Any]], str], delay: float = 0.0):
+        self.responder = responder
+        self.delay = delay
+        self.requests: List[Dict[str, Any]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def __enter__(self) -> 'StubChatServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler_class(self) -> type:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                with stub._lock:
+                    stub.requests.append(body)
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    if stub.delay:
+                        time.sleep(stub.delay)
+                    content = stub.responder(body)
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+
+                prompt_chars = sum(len(message.get('content') or '') for message in body.get('messages', []))
+                payload = json.dumps({
+                    'id': f"stub-{len(stub.requests)}",
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': body.get('model', 'stub'),
+                    'choices': [{
+                        'index': 0,
+                        'message': {'role': 'assistant', 'content': content},
+                        'finish_reason': 'stop'
+                    }],
+                    # Rough token counts, four characters per token
+                    'usage': {
+                        'prompt_tokens': prompt_chars // 4,
+                        'completion_tokens': len(content) // 4,
+                        'total_tokens': (prompt_chars + len(content)) // 4
+                    }
+                }).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -2,27 +2,75 @@ import os
 import io
 import zipfile
 import json
-from flask import Flask, request, send_file, jsonify
+from flask import Flask, Request, request, send_file, jsonify
 import pandas as pd
 from werkzeug.utils import secure_filename
 from flask_cors import CORS
 from dotenv import load_dotenv
 from pipeline import DataHarmonizationPipeline
+from local.ingest.readers import read_file, is_data_file
+from local.ingest.compression import split_compression, codec_available
+from local.ingest.cache import IngestCache, INGEST_CACHE_DIR
+from local.uploads.spool import UploadSpool, UploadTooLarge, SPOOL_MEMORY_BYTES, SPOOL_DISK_BYTES
+from local.uploads.sessions import UploadSessionStore, UploadSessionError, UPLOAD_SESSION_DIR
+from local.wrangler.rowFilter import validate_filter_spec
+from ai.shapeCache import ShapeCache, SHAPE_CACHE_PATH, DEFAULT_TTL_SECONDS
+from ai.callGovernor import CircuitBreaker, DEFAULT_AI_BUDGET_SECONDS
 
 # Load environment variables
 load_dotenv()
 
+
+class UploadRequest(Request):
+    """
+    Request that writes uploaded files into the UploadSpool attached to it,
+    rather than into temporary files of Werkzeug's own that would then be
+    copied into the spool.
+    """
+    upload_spool = None
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.upload_spool is not None:
+            return self.upload_spool.stream_factory(total_content_length, content_type, filename, content_length)
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+
 app = Flask(__name__)
+app.request_class = UploadRequest
 CORS(app)
 
-ALLOWED_EXTENSIONS = {'csv', 'xlsx', 'zip'}
 MAX_FILES = 20
 UPLOAD_FOLDER = 'uploads'
+# Each run's harmonized dataset is exported here
+OUTPUT_PATH = os.path.join(UPLOAD_FOLDER, 'MASTER.csv')
+# Uploads larger than UPLOAD_MEMORY_BYTES are spooled to a per-request scratch directory
+UPLOAD_SCRATCH_DIR = os.getenv('UPLOAD_SCRATCH_DIR')
+UPLOAD_MEMORY_BYTES = int(os.getenv('UPLOAD_MEMORY_BYTES', SPOOL_MEMORY_BYTES))
+UPLOAD_DISK_BYTES = int(os.getenv('UPLOAD_DISK_BYTES', SPOOL_DISK_BYTES))
 
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# Resumable chunked uploads; sessions idle for UPLOAD_SESSION_TTL seconds are removed
+UPLOAD_SESSIONS = UploadSessionStore(
+    os.getenv('UPLOAD_SESSION_DIR', UPLOAD_SESSION_DIR),
+    ttl_seconds=float(os.getenv('UPLOAD_SESSION_TTL', 24 * 60 * 60))
+)
+
+# Parsed uploads are cached by content hash, so re-uploaded reference files aren't re-parsed
+INGEST_CACHE = IngestCache(os.getenv('INGEST_CACHE_DIR', INGEST_CACHE_DIR))
+# Shapes detected by the AI, reused for files with the same layout
+SHAPE_CACHE = ShapeCache(os.getenv('SHAPE_CACHE_PATH', SHAPE_CACHE_PATH),
+                         ttl_seconds=float(os.getenv('SHAPE_CACHE_TTL', DEFAULT_TTL_SECONDS)))
+# Classify the files of an upload with one shape detection request instead of one per file
+BATCH_SHAPE_DETECTION = os.getenv('BATCH_SHAPE_DETECTION', 'true').lower() == 'true'
+# Seconds an upload may spend waiting on AI calls; uploads share one circuit
+# breaker, so an upstream that keeps failing is skipped until it recovers
+AI_BUDGET_SECONDS = float(os.getenv('AI_BUDGET_SECONDS', DEFAULT_AI_BUDGET_SECONDS))
+AI_BREAKER = CircuitBreaker()
+
 def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    # ZIP archives, plus the data files the readers take on their own or as archive members
+    return filename.lower().endswith('.zip') or is_data_file(filename)
 
 def extract_files(file_storage):
     """Extracts files from a ZIP or returns the file itself if not a ZIP."""
@@ -32,7 +80,7 @@ def extract_files(file_storage):
             return [
                 (name, io.BytesIO(z.read(name)))
                 for name in z.namelist()
-                if allowed_file(name)
+                if is_data_file(name)
             ]
     else:
         return [(filename, file_storage.stream)]
@@ -41,53 +89,99 @@ def read_to_dataframe(filename, file_stream):
     if filename.endswith('.csv'):
         return pd.read_csv(file_stream)
     elif filename.endswith('.xlsx'):
-        return pd.read_excel(file_stream)
+        # Large workbooks are streamed row by row rather than loaded whole
+        return read_file(file_stream, filename)[0]
     else:
         return None
 
 @app.route('/upload', methods=['POST'])
 def upload_files():
-    files = request.files.getlist('files')
-    print(f"Received {len(files)} file(s) for wrangling...")
-    if len(files) == 0:
+    # Attached before the form is parsed, so uploads are written straight into the spool
+    with UploadSpool(UPLOAD_SCRATCH_DIR, memory_bytes=UPLOAD_MEMORY_BYTES,
+                     disk_bytes=UPLOAD_DISK_BYTES) as spool:
+        request.upload_spool = spool
+        return _upload_files(spool)
+
+def _upload_files(spool):
+    try:
+        files = request.files.getlist('files')
+        spool.check_limit()
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    # Files sent beforehand through the chunked upload API
+    session_ids = request.form.getlist('session_id')
+    print(f"Received {len(files)} file(s) and {len(session_ids)} upload session(s) for wrangling...")
+    if len(files) + len(session_ids) == 0:
         return jsonify({'error': 'No files uploaded.'}), 400
-    if len(files) > MAX_FILES:
+    if len(files) + len(session_ids) > MAX_FILES:
         return jsonify({'error': f'Maximum {MAX_FILES} files allowed per upload.'}), 400
 
-    file_streams = []
-    filenames = []
-    for file_storage in files:
-        if not file_storage.filename or not allowed_file(file_storage.filename):
-            continue
-        filename = secure_filename(str(file_storage.filename))
-        if filename.endswith('.zip'):
-            file_storage.stream.seek(0)
-            with zipfile.ZipFile(file_storage.stream) as z:
-                for name in z.namelist():
-                    if allowed_file(name):
-                        file_stream = io.BytesIO(z.read(name))
-                        file_streams.append(file_stream)
-                        filenames.append(name)
-        else:
-            file_storage.stream.seek(0)
-            file_streams.append(file_storage.stream)
-            filenames.append(filename)
-
-    if not file_streams:
-        return jsonify({'error': 'No valid data files found.'}), 400
-
     # Get OpenAI settings from environment or request
     api_key = os.getenv('OPENAI_API_KEY')
     use_openai = request.form.get('use_openai', 'true').lower() == 'true'
     if 'api_key' in request.form and request.form['api_key']:
         api_key = request.form['api_key']
+    # Canonical columns the client will use; the rest are never parsed
+    wanted_columns = request.form.getlist('columns') or None
+    # Row filter as JSON: period_start/period_end, entities, where predicates
+    try:
+        filters = validate_filter_spec(json.loads(request.form['filters'])) if request.form.get('filters') else None
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid filters: {e}'}), 400
+
+    try:
+        for file_storage in files:
+            if not file_storage.filename:
+                continue
+            _, codec = split_compression(file_storage.filename)
+            if codec and not codec_available(codec):
+                return jsonify({'error': f'{file_storage.filename}: {codec} files are not supported by this server.'}), 400
+            if not allowed_file(file_storage.filename):
+                continue
+            filename = secure_filename(str(file_storage.filename))
+            file_storage.stream.seek(0)
+            if filename.endswith('.zip'):
+                spool.add_zip_members(file_storage.stream, is_data_file)
+            else:
+                spool.add(file_storage.stream, filename)
+        for session_id in session_ids:
+            session_file = UPLOAD_SESSIONS.completed_file(session_id)
+            if session_file['filename'].endswith('.zip'):
+                with open(session_file['path'], 'rb') as stream:
+                    spool.add_zip_members(stream, is_data_file)
+            else:
+                spool.add_path(session_file['path'], session_file['filename'])
+    except UploadSessionError as e:
+        return jsonify({'error': str(e)}), e.status
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    except zipfile.BadZipFile as e:
+        return jsonify({'error': f'Invalid ZIP archive: {e}'}), 400
 
-    pipeline = DataHarmonizationPipeline(api_key=api_key, use_openai=use_openai)
-    result = pipeline.run(file_streams, filenames)
+    if not spool.files:
+        return jsonify({'error': 'No valid data files found.'}), 400
+
+    pipeline = DataHarmonizationPipeline(api_key=api_key, use_openai=use_openai,
+                                         ingest_cache=INGEST_CACHE,
+                                         shape_cache=SHAPE_CACHE,
+                                         batch_shape_detection=BATCH_SHAPE_DETECTION,
+                                         ai_budget_seconds=AI_BUDGET_SECONDS,
+                                         ai_breaker=AI_BREAKER,
+                                         wanted_columns=wanted_columns,
+                                         output_path=OUTPUT_PATH)
+    result = pipeline.run(spool.files, spool.filenames, filters=filters)
 
+    # Sessions are kept when the run fails, so the client can retry without re-uploading
     if not result.get('success', False):
         return jsonify({'error': result.get('error', 'Unknown error'), 'audit_trail': result.get('audit_trail', {})}), 500
 
+    # Session files have been read; they can't be used for another run
+    for session_id in session_ids:
+        try:
+            UPLOAD_SESSIONS.delete_session(session_id)
+        except UploadSessionError:
+            pass
+
     master_clean = result['master_df']
     dupes = result['duplicates_df']
     audit_report = result['audit_report']
@@ -115,6 +209,52 @@ def upload_files():
         download_name='cleaned.csv'
     )
 
+@app.route('/upload/sessions', methods=['POST'])
+def open_upload_session():
+    """Open a resumable upload session for one file."""
+    params = request.get_json(silent=True) or request.form
+    filename = secure_filename(str(params.get('filename', '')))
+    if not filename or not allowed_file(filename):
+        return jsonify({'error': 'A supported filename is required.'}), 400
+    try:
+        total_bytes = int(params['total_bytes']) if params.get('total_bytes') is not None else None
+        session = UPLOAD_SESSIONS.open_session(filename, total_bytes)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), getattr(e, 'status', 400)
+    return jsonify(_session_status(session)), 201
+
+@app.route('/upload/sessions/<session_id>', methods=['GET'])
+def get_upload_session(session_id):
+    """Report how much of a session has been received, so a client can resume."""
+    try:
+        return jsonify(_session_status(UPLOAD_SESSIONS.get_session(session_id)))
+    except UploadSessionError as e:
+        return jsonify({'error': str(e)}), e.status
+
+@app.route('/upload/sessions/<session_id>/chunks/<int:index>', methods=['PUT'])
+def upload_session_chunk(session_id, index):
+    """Append chunk `index` (the raw request body) after checking its X-Chunk-SHA256 header."""
+    sha256 = request.headers.get('X-Chunk-SHA256')
+    if not sha256:
+        return jsonify({'error': 'The X-Chunk-SHA256 header is required.'}), 400
+    try:
+        session = UPLOAD_SESSIONS.append_chunk(session_id, index, request.stream, sha256)
+    except UploadSessionError as e:
+        return jsonify({'error': str(e)}), e.status
+    return jsonify(_session_status(session))
+
+@app.route('/upload/sessions/<session_id>', methods=['DELETE'])
+def delete_upload_session(session_id):
+    """Abandon a session and remove its spool file."""
+    try:
+        UPLOAD_SESSIONS.delete_session(session_id)
+    except UploadSessionError as e:
+        return jsonify({'error': str(e)}), e.status
+    return '', 204
+
+def _session_status(session):
+    return {key: session[key] for key in ('session_id', 'filename', 'total_bytes', 'received_bytes', 'next_index')}
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
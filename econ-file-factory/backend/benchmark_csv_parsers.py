@@ -0,0 +1,90 @@
+"""
+Benchmark the safe_read_csv parser tiers on wide and long CSV files.
+
+Usage:
+    python benchmark_csv_parsers.py [--long-rows N] [--wide-rows N] [--wide-cols N] [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from local.uploads.ingest.readers import safe_read_csv, PARSER_TIERS
+
+
+def make_long_csv(path: str, rows: int) -> None:
+    """Panel in long format: one row per firm-year, a handful of columns."""
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'firm_id': [f"F{i:06d}" for i in rng.integers(0, rows // 10 + 1, rows)],
+        'year': rng.integers(2000, 2024, rows),
+        'region': rng.choice(['North', 'South', 'East', 'West'], rows),
+        'industry': rng.choice(['Retail', 'Finance', 'Tech', 'Energy', 'Health'], rows),
+        'revenue': rng.normal(1e6, 2e5, rows).round(2),
+        'employees': rng.integers(1, 5000, rows),
+    })
+    df.to_csv(path, index=False)
+
+
+def make_wide_csv(path: str, rows: int, cols: int) -> None:
+    """Wide format: one row per firm, one column per variable-year."""
+    rng = np.random.default_rng(1)
+    data = {'firm_id': [f"F{i:06d}" for i in range(rows)]}
+    years = range(2024 - cols // 2, 2024)
+    for year in years:
+        data[f"revenue_{year}"] = rng.normal(1e6, 2e5, rows).round(2)
+        data[f"employees_{year}"] = rng.integers(1, 5000, rows)
+    pd.DataFrame(data).to_csv(path, index=False)
+
+
+def time_tier(path: str, tiers: tuple, repeat: int) -> tuple:
+    """Return (best seconds, tier that succeeded, frame shape)."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df, diagnostics = safe_read_csv(path, tiers=tiers)
+        best = min(best, time.perf_counter() - start)
+    return best, diagnostics['parser_tier'], df.shape
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--long-rows', type=int, default=300_000)
+    parser.add_argument('--wide-rows', type=int, default=5_000)
+    parser.add_argument('--wide-cols', type=int, default=400)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        files = {
+            'long': os.path.join(tmp_dir, 'long.csv'),
+            'wide': os.path.join(tmp_dir, 'wide.csv'),
+        }
+        make_long_csv(files['long'], args.long_rows)
+        make_wide_csv(files['wide'], args.wide_rows, args.wide_cols)
+
+        print(f"{'file':<6} {'size MB':>8} {'tier':<8} {'seconds':>9} {'speed-up':>9}  shape")
+        for label, path in files.items():
+            size_mb = os.path.getsize(path) / 1e6
+            results = []
+            for tier in PARSER_TIERS + ('manual',):
+                tiers = () if tier == 'manual' else (tier,)
+                seconds, used, shape = time_tier(path, tiers, args.repeat)
+                results.append((tier, used, seconds, shape))
+
+            slowest = max(seconds for _, _, seconds, _ in results)
+            for tier, used, seconds, shape in results:
+                note = '' if used == tier else f" (fell back to {used})"
+                print(f"{label:<6} {size_mb:>8.1f} {tier:<8} {seconds:>9.3f} {slowest / seconds:>8.1f}x  {shape}{note}")
+
+
+if __name__ == '__main__':
+    main()
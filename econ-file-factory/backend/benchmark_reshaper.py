@@ -0,0 +1,120 @@
+"""
+Benchmark splitting melted wide headers into variable and period.
+
+A wide file of `--rows` entities and `--cols` variable_year columns is melted
+as the wide reshaper does, then the header column is split two ways:
+
+    per-row    apply(pd.Series) over every melted row, as before, with an
+               uncached copy of the header parser as it was before memoisation
+    per-header each distinct header parsed once, spread over the rows by code
+
+The per-row split is timed on the first `--old-rows` melted rows and scaled
+to the full frame, since on 100k x 200 it runs for many minutes; pass
+--old-rows 0 to time it on every row. The full wide reshape is timed too.
+
+Usage:
+    python benchmark_reshaper.py [--rows N] [--cols N] [--old-rows N] [--repeat N] [--skip-reshape]
+"""
+
+import argparse
+import logging
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from local.wrangler.reShaper import _reshape_wide_to_panel, _split_melted_headers
+
+
+def make_wide(rows: int, cols: int) -> pd.DataFrame:
+    """Firm id and sector, then `cols` columns of 20 variables over cols/20 years."""
+    rng = np.random.default_rng(0)
+    variables = [f"var{i:02d}" for i in range(20)]
+    years = range(2000, 2000 + max(1, cols // len(variables)))
+    headers = [f"{variable}_{year}" for variable in variables for year in years][:cols]
+    data = {
+        'firm_id': [f"F{i:07d}" for i in range(rows)],
+        'sector': rng.choice(['agriculture', 'industry', 'services'], rows),
+    }
+    values = rng.normal(1e3, 1e2, (rows, len(headers))).round(2)
+    data.update({header: values[:, i] for i, header in enumerate(headers)})
+    return pd.DataFrame(data)
+
+
+def old_extract_var_period_dynamic(col):
+    """
+    The header parser the per-row split used, before parse_period_header
+    memoised it. Copied so the baseline pays the parse for every row.
+    """
+    logging.info(f"[Reshaper] Extracting variable and period from column name: {col}")
+    period_regex = r'(?:-?\d{4}Q\d|Q\d-?\d{4}|-?\d{4}|-?\d{2,4}|jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec|january|february|march|april|may|june|july|august|september|october|november|december)'
+    m = re.search(period_regex, col, re.IGNORECASE)
+    if m:
+        period = m.group(0)
+        prefix = col[:m.start()] + col[m.end():]
+        prefix = prefix.strip("_- ")
+        return prefix, period
+    return col, None
+
+
+def split_per_row(headers: pd.Series) -> pd.DataFrame:
+    return headers.apply(lambda x: pd.Series(old_extract_var_period_dynamic(x)))
+
+
+def best_of(function, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--cols', type=int, default=200)
+    parser.add_argument('--old-rows', type=int, default=20_000,
+                        help="melted rows to time the per-row split on (0 for all)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--skip-reshape', action='store_true', help="don't time the full wide reshape")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    df = make_wide(args.rows, args.cols)
+    long_df = df.melt(id_vars=['firm_id', 'sector'], var_name='orig_col', value_name='value')
+    headers = long_df['orig_col']
+    print(f"{args.rows:,} entities x {args.cols} columns -> {len(headers):,} melted rows, "
+          f"{headers.nunique()} distinct headers")
+
+    # Both splits must agree before either is timed
+    check = headers.iloc[:min(len(headers), 5_000)]
+    variables, periods = _split_melted_headers(check)
+    reference = split_per_row(check)
+    assert list(variables) == list(reference[0]) and list(periods) == list(reference[1])
+
+    old_rows = len(headers) if args.old_rows <= 0 else min(args.old_rows, len(headers))
+    old_seconds = best_of(lambda: split_per_row(headers.iloc[:old_rows]), 1) * len(headers) / old_rows
+    new_seconds = best_of(lambda: _split_melted_headers(headers), args.repeat)
+    scaled = '' if old_rows == len(headers) else f" (scaled from {old_rows:,} rows)"
+
+    print(f"\n{'header split':<12} {'seconds':>10}")
+    print(f"{'per-row':<12} {old_seconds:>10.2f}{scaled}")
+    print(f"{'per-header':<12} {new_seconds:>10.2f}")
+    print(f"speed-up: {old_seconds / new_seconds:.0f}x")
+
+    if not args.skip_reshape:
+        del long_df, headers
+        reshape_seconds = best_of(lambda: _reshape_wide_to_panel(df, 'benchmark.csv'), 1)
+        print(f"\nfull wide reshape: {reshape_seconds:.2f}s, of which the per-row split "
+              f"would have added about {old_seconds:.0f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+"""
+Benchmark shape detection accuracy, latency and AI calls on a labelled corpus.
+
+Every shape the reshaper supports gets generated files with varied headers,
+periods and identifiers. The AI is a local stub of the chat completions
+endpoint that knows each file's label and answers correctly with a given
+probability, after a given delay. Three strategies are compared:
+
+    local   the local classifier only
+    ai      every file sent to the AI
+    hybrid  the AI only for files the local classifier isn't confident about
+
+Usage:
+    python benchmark_shape_detection.py [--per-shape N] [--latency S] [--ai-accuracy P]
+                                        [--threshold C] [--concurrency N] [--batched] [--seed N]
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import time
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ai.shapeDetection import detect_data_shapes
+from ai.stubServer import StubChatServer
+from local.wrangler.shapeClassifier import SHAPE_TYPES, DEFAULT_CONFIDENCE_THRESHOLD, classify_shape
+
+VARIABLES = ['revenue', 'employees', 'assets', 'exports', 'wages', 'output', 'investment']
+REGIONS = ['north', 'south', 'east', 'west', 'central']
+CATEGORIES = ['agriculture', 'industry', 'services', 'mining', 'construction', 'finance']
+
+
+def _periods(rng, count: int) -> list:
+    start = int(rng.integers(1995, 2018))
+    if rng.random() < 0.25:
+        return [f"{start + i // 4}Q{i % 4 + 1}" for i in range(count)]
+    return [str(start + i) for i in range(count)]
+
+
+def _entities(rng, count: int) -> list:
+    prefix = rng.choice(['F', 'A', 'C', 'ID'])
+    return [f"{prefix}{i:04d}" for i in rng.choice(10_000, count, replace=False)]
+
+
+def _wide(rng) -> pd.DataFrame:
+    entities = _entities(rng, int(rng.integers(5, 30)))
+    periods = _periods(rng, int(rng.integers(2, 6)))
+    sep = rng.choice(['_', ' ', '-'])
+    data = {rng.choice(['firm_id', 'FirmCode', 'company', 'id', 'country_code']): entities}
+    if rng.random() < 0.3:
+        data['sector'] = rng.choice(CATEGORIES, len(entities))
+    for variable in rng.choice(VARIABLES, int(rng.integers(1, 4)), replace=False):
+        for period in periods:
+            data[f"{variable}{sep}{period}"] = rng.normal(100, 20, len(entities)).round(1)
+    return pd.DataFrame(data)
+
+
+def _two_row_header(rng) -> str:
+    periods = _periods(rng, int(rng.integers(2, 4)))
+    variables = list(rng.choice(VARIABLES, int(rng.integers(2, 4)), replace=False))
+    header_periods = [p for p in periods for _ in variables]
+    header_variables = variables * len(periods)
+    lines = [",".join([rng.choice(['Table 1', 'Source: survey', 'Firm panel'])] + [''] * len(header_periods)),
+             ",".join(['firm'] + header_periods),
+             ",".join(['id'] + header_variables)]
+    for entity in _entities(rng, int(rng.integers(5, 20))):
+        lines.append(",".join([entity] + [f"{v:.1f}" for v in rng.normal(100, 20, len(header_periods))]))
+    return "\n".join(lines) + "\n"
+
+
+def _key_value(rng) -> pd.DataFrame:
+    rows = []
+    for entity in _entities(rng, int(rng.integers(3, 10))):
+        for period in _periods(rng, 2):
+            for variable in rng.choice(VARIABLES, 3, replace=False):
+                rows.append((entity, period, variable, round(float(rng.normal(100, 20)), 1)))
+    columns = ['firm_id', rng.choice(['year', 'period']),
+               rng.choice(['variable', 'indicator', 'measure']), rng.choice(['value', 'amount'])]
+    return pd.DataFrame(rows, columns=columns)
+
+
+def _cross_tab(rng) -> pd.DataFrame:
+    rows = list(rng.choice(REGIONS + ['capital', 'coast', 'islands'], int(rng.integers(3, 8)), replace=False))
+    columns = list(rng.choice(CATEGORIES, int(rng.integers(2, 6)), replace=False))
+    data = {rng.choice(['region', 'area', 'age_group', 'sector']): rows}
+    for column in columns:
+        data[column] = rng.integers(0, 1000, len(rows))
+    return pd.DataFrame(data)
+
+
+def _fully_transposed(rng) -> pd.DataFrame:
+    variables = list(rng.choice(VARIABLES, int(rng.integers(2, 6)), replace=False))
+    data = {rng.choice(['variable', 'indicator', 'series', 'metric']): variables}
+    for period in _periods(rng, int(rng.integers(3, 8))):
+        data[period] = rng.normal(100, 20, len(variables)).round(1)
+    return pd.DataFrame(data)
+
+
+def _stacked_multi_time_long(rng) -> pd.DataFrame:
+    entities = _entities(rng, int(rng.integers(3, 10)))
+    periods = _periods(rng, int(rng.integers(2, 5)))
+    rows = len(entities) * len(periods)
+    data = {
+        rng.choice(['firm_id', 'FirmCode', 'CompanyID']): np.repeat(entities, len(periods)),
+        rng.choice(['year', 'Year', 'period', 'fiscal_year']): periods * len(entities),
+    }
+    for variable in rng.choice(VARIABLES, int(rng.integers(2, 5)), replace=False):
+        data[variable] = rng.normal(100, 20, rows).round(1)
+    if rng.random() < 0.3:
+        data['region'] = rng.choice(REGIONS, rows)
+    return pd.DataFrame(data)
+
+
+def _pivoted_by_variable(rng) -> pd.DataFrame:
+    variables = list(rng.choice(VARIABLES, int(rng.integers(2, 6)), replace=False))
+    data = {rng.choice(['indicator', 'variable', 'measure', 'series']): variables}
+    for region in rng.choice(REGIONS, int(rng.integers(2, 4)), replace=False):
+        for period in _periods(rng, 2):
+            data[f"{region}_{period}"] = rng.normal(100, 20, len(variables)).round(1)
+    return pd.DataFrame(data)
+
+
+GENERATORS = {
+    'wide': _wide,
+    'two_row_header': _two_row_header,
+    'key_value': _key_value,
+    'cross_tab': _cross_tab,
+    'fully_transposed': _fully_transposed,
+    'stacked_multi_time_long': _stacked_multi_time_long,
+    'pivoted_by_variable': _pivoted_by_variable,
+}
+
+
+def make_corpus(per_shape: int, seed: int) -> list:
+    """
+    Labelled (shape, filename, CSV text) triples, `per_shape` of each shape.
+    """
+    rng = np.random.default_rng(seed)
+    corpus = []
+    for shape in SHAPE_TYPES:
+        for i in range(per_shape):
+            generated = GENERATORS[shape](rng)
+            text = generated if isinstance(generated, str) else generated.to_csv(index=False)
+            corpus.append((shape, f"{shape}_{i:03d}.csv", text))
+    return corpus
+
+
+def make_responder(labels: dict, accuracy: float, seed: int):
+    """
+    Stub answer function. A sample is recognised by its 'Columns:' line; the
+    right label is given with probability `accuracy`, otherwise another shape,
+    chosen the same way on every run.
+    """
+    def _answer(columns: str) -> str:
+        label = labels.get(columns, 'unknown')
+        draw = int(hashlib.sha256(f"{seed}:{columns}".encode()).hexdigest(), 16)
+        if (draw % 10_000) / 10_000 < accuracy:
+            return label
+        wrong = [shape for shape in SHAPE_TYPES if shape != label]
+        return wrong[draw % len(wrong)]
+
+    def responder(body: dict) -> str:
+        prompt = body['messages'][-1]['content']
+        columns = re.findall(r'^Columns: (.*)$', prompt, re.MULTILINE)
+        if 'formats' in prompt:
+            return json.dumps({'formats': {str(i): _answer(c) for i, c in enumerate(columns)}})
+        return _answer(columns[0]) if columns else 'unknown'
+
+    return responder
+
+
+def run_strategy(name: str, samples: list, server: StubChatServer, args) -> dict:
+    """
+    Classify every sample on its own to time single-file detections, then the
+    whole corpus in one call as the pipeline would. The local strategy calls
+    the classifier directly, so an OPENAI_API_KEY in the environment can't
+    turn it into an AI run.
+    """
+    threshold = args.threshold if name == 'hybrid' else None
+
+    def detect(batch):
+        if name == 'local':
+            return [classify_shape(sample) for sample in batch]
+        return detect_data_shapes(batch, 'benchmark-key', max_concurrency=args.concurrency,
+                                  base_url=server.base_url, batched=args.batched,
+                                  confidence_threshold=threshold)
+
+    requests_before = len(server.requests)
+    latencies = []
+    shapes = []
+    for sample in samples:
+        start = time.perf_counter()
+        shapes.append(detect([sample])[0]['shape'])
+        latencies.append(time.perf_counter() - start)
+    calls = len(server.requests) - requests_before
+
+    start = time.perf_counter()
+    detect(samples)
+    corpus_seconds = time.perf_counter() - start
+
+    return {
+        'shapes': shapes,
+        'p50_ms': float(np.percentile(latencies, 50)) * 1e3,
+        'p95_ms': float(np.percentile(latencies, 95)) * 1e3,
+        'calls_per_file': calls / len(samples),
+        'corpus_seconds': corpus_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--per-shape', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.2, help="stub answer delay in seconds")
+    parser.add_argument('--ai-accuracy', type=float, default=0.95)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_CONFIDENCE_THRESHOLD)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--batched', action='store_true', help="classify the corpus run in batched requests")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.per_shape, args.seed)
+    labels = [shape for shape, _, _ in corpus]
+    samples = [pd.read_csv(StringIO(text)).head(5) for _, _, text in corpus]
+    columns_to_label = {str(list(sample.columns)): label for sample, label in zip(samples, labels)}
+    print(f"{len(corpus)} files, {args.per_shape} per shape; stub latency {args.latency}s, "
+          f"stub accuracy {args.ai_accuracy:.0%}")
+
+    # The detection modules and the HTTP client log every request; keep the report readable
+    for logger in ('httpx', 'openai'):
+        logging.getLogger(logger).setLevel(logging.WARNING)
+    results = {}
+    responder = make_responder(columns_to_label, args.ai_accuracy, args.seed)
+    with StubChatServer(responder, delay=args.latency) as server, \
+            open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for name in ('local', 'ai', 'hybrid'):
+            results[name] = run_strategy(name, samples, server, args)
+
+    print(f"\n{'strategy':<8} {'accuracy':>9} {'p50 ms':>8} {'p95 ms':>8} {'AI calls/file':>14} {'corpus s':>9}")
+    for name, result in results.items():
+        accuracy = np.mean([shape == label for shape, label in zip(result['shapes'], labels)])
+        print(f"{name:<8} {accuracy:>9.1%} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} "
+              f"{result['calls_per_file']:>14.2f} {result['corpus_seconds']:>9.2f}")
+
+    print(f"\n{'shape':<24}" + "".join(f"{name:>9}" for name in results))
+    for shape in SHAPE_TYPES:
+        row = [i for i, label in enumerate(labels) if label == shape]
+        print(f"{shape:<24}" + "".join(
+            f"{np.mean([result['shapes'][i] == shape for i in row]):>9.0%}" for result in results.values()
+        ))
+
+
+if __name__ == '__main__':
+    main()
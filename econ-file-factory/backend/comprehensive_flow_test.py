@@ -689,11 +689,13 @@ C002,2500000,2600000,125,130"""
         files = [file1, file2]
         filenames = ['data1.csv', 'data2.csv']
         
-        # Initialize pipeline (without API for testing)
-        pipeline = DataHarmonizationPipeline(use_openai=False)
-        
-        # Run pipeline
-        result = pipeline.run(files, filenames)
+        # Initialize pipeline (without API for testing), exporting to a scratch directory
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            pipeline = DataHarmonizationPipeline(use_openai=False,
+                                                 output_path=os.path.join(tmp_dir, 'MASTER.csv'))
+            
+            # Run pipeline
+            result = pipeline.run(files, filenames)
         
         # Verify result structure
         assert 'success' in result, "Missing success flag in result"
@@ -0,0 +1,16 @@
+"""
+Shared pytest fixtures for the backend tests.
+"""
+
+import pytest
+
+
+@pytest.fixture
+def scratch_app(tmp_path, monkeypatch):
+    """Point the app's ingest cache and export file at a scratch directory for one test."""
+    import app as app_module
+    from local.ingest.cache import IngestCache
+
+    monkeypatch.setattr(app_module, 'INGEST_CACHE', IngestCache(str(tmp_path / 'cache')))
+    monkeypatch.setattr(app_module, 'OUTPUT_PATH', str(tmp_path / 'MASTER.csv'))
+    return app_module
@@ -0,0 +1,218 @@
+"""
+Ingest Cache Module
+On-disk cache of parsed uploads keyed by a hash of the file's content and the
+read options. Frames are stored as Feather (Arrow IPC) files next to their
+reader metadata, and the least recently used entries are evicted once the
+cache grows past its size limit.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - pyarrow is optional
+    pa = None
+
+
+INGEST_CACHE_DIR = Path.home() / ".wrangler_ingest_cache"
+
+# Total size of cached frames before least recently used entries are evicted
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024
+
+# Block size used when hashing file contents
+HASH_BLOCK_BYTES = 1024 * 1024
+
+Entry = Tuple[pd.DataFrame, Dict[str, Any], str]
+
+
+class IngestCache:
+    """
+    Size-bounded LRU cache of parsed uploads.
+
+    Each cache key maps to the list of (DataFrame, metadata, source) entries
+    that read_upload produced for one upload. Counters for hits, misses,
+    stores and evictions are kept for the lifetime of the object, which may
+    be shared by concurrent requests; `get` and `put` also add to a caller's
+    own `tally` dict, so each run can count just its own lookups.
+    """
+
+    def __init__(self, cache_dir: Any = INGEST_CACHE_DIR, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.counters = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'uncacheable': 0}
+        self._lock = threading.Lock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries "
+                "(key TEXT PRIMARY KEY, size INTEGER, last_used REAL, data TEXT)"
+            )
+
+    def key_for(self, file_obj: Any, filename: str, options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Cache key for an upload: a hash of its bytes, its file extension and
+        the read options that change the parsed result.
+        """
+        digest = hashlib.sha256()
+        digest.update(Path(filename).suffix.lower().encode())
+        digest.update(json.dumps(options or {}, sort_keys=True, default=str).encode())
+        if isinstance(file_obj, (str, os.PathLike)):
+            with open(file_obj, 'rb') as fh:
+                _hash_stream(fh, digest)
+        else:
+            position = file_obj.tell()
+            _hash_stream(file_obj, digest)
+            file_obj.seek(position)
+        return digest.hexdigest()
+
+    def get(self, key: str, filename: Optional[str] = None,
+            tally: Optional[Dict[str, int]] = None) -> Optional[List[Entry]]:
+        """
+        Load the entries stored under a key, or None on a miss. Sources named
+        after the upload the entries were cached from are renamed to `filename`.
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT data FROM entries WHERE key=?", (key,)).fetchone()
+            if row is None or pa is None:
+                self._count('misses', tally)
+                return None
+
+            try:
+                start = time.perf_counter()
+                cached_filename, records = json.loads(row[0])
+                entries = []
+                for i, (metadata, source) in enumerate(records):
+                    df = feather.read_table(self._frame_path(key, i), memory_map=True).to_pandas()
+                    if filename is not None and (source == cached_filename or source.startswith(f"{cached_filename}::")):
+                        source = filename + source[len(cached_filename):]
+                        metadata['filename'] = filename
+                    metadata.update({
+                        'ingest_cache': 'hit',
+                        'cache_load_seconds': round(time.perf_counter() - start, 6)
+                    })
+                    entries.append((df, metadata, source))
+            except (OSError, pa.ArrowException, ValueError):
+                # Frame files went missing or were damaged; drop the entry
+                self._delete(conn, key)
+                self._count('misses', tally)
+                return None
+
+            conn.execute("UPDATE entries SET last_used=? WHERE key=?", (time.time(), key))
+        self._count('hits', tally)
+        return entries
+
+    def put(self, key: str, entries: List[Entry], filename: Optional[str] = None,
+            tally: Optional[Dict[str, int]] = None) -> bool:
+        """
+        Store the entries read from upload `filename` under a key, evicting
+        old entries to stay within max_bytes. Returns False if the frames
+        can't be stored as Feather.
+        """
+        if pa is None:
+            return False
+
+        size = 0
+        records = []
+        try:
+            for i, (df, metadata, source) in enumerate(entries):
+                path = self._frame_path(key, i)
+                tmp_path = path.with_suffix('.tmp')
+                feather.write_feather(df, tmp_path, compression='uncompressed')
+                os.replace(tmp_path, path)
+                size += path.stat().st_size
+                records.append((metadata, source))
+        except (pa.ArrowException, TypeError, ValueError, OSError):
+            # Duplicate or non-string column names, mixed-type object columns
+            self._remove_files(key, len(entries))
+            self._count('uncacheable', tally)
+            return False
+
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                (key, size, time.time(), json.dumps([filename, records], default=str))
+            )
+            self._evict(conn, tally)
+        self._count('stores', tally)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Counters plus the number and total size of cached entries.
+        """
+        with self._connect() as conn:
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        with self._lock:
+            counters = dict(self.counters)
+        return {**counters, 'entries': count, 'bytes': total}
+
+    def _count(self, name: str, tally: Optional[Dict[str, int]] = None) -> None:
+        with self._lock:
+            self.counters[name] += 1
+        if tally is not None:
+            tally[name] = tally.get(name, 0) + 1
+
+    def _evict(self, conn: sqlite3.Connection, tally: Optional[Dict[str, int]] = None) -> None:
+        """
+        Delete least recently used entries until the cache fits in max_bytes.
+        """
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        rows = conn.execute("SELECT key, size FROM entries ORDER BY last_used").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._delete(conn, key)
+            total -= size
+            self._count('evictions', tally)
+
+    def _delete(self, conn: sqlite3.Connection, key: str) -> None:
+        row = conn.execute("SELECT data FROM entries WHERE key=?", (key,)).fetchone()
+        conn.execute("DELETE FROM entries WHERE key=?", (key,))
+        if row is not None:
+            self._remove_files(key, len(json.loads(row[0])[1]))
+
+    def _remove_files(self, key: str, count: int) -> None:
+        for i in range(count):
+            for path in (self._frame_path(key, i), self._frame_path(key, i).with_suffix('.tmp')):
+                if path.exists():
+                    path.unlink()
+
+    def _frame_path(self, key: str, index: int) -> Path:
+        return self.cache_dir / f"{key}-{index}.feather"
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """
+        Open the index for one operation, so the cache can be shared across
+        threads and processes. Commits on success.
+        """
+        conn = sqlite3.connect(self.cache_dir / "index.sqlite", timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def _hash_stream(stream: Any, digest: Any) -> None:
+    """
+    Feed a binary (or text) stream into a hash object from its start.
+    """
+    if hasattr(stream, 'seek'):
+        stream.seek(0)
+    while True:
+        block = stream.read(HASH_BLOCK_BYTES)
+        if not block:
+            break
+        digest.update(block.encode('utf-8') if isinstance(block, str) else block)
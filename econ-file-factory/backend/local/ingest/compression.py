@@ -0,0 +1,82 @@
+"""
+Compression Module
+Recognises compressed single-file CSVs (.csv.gz, .csv.bz2, .csv.xz, .csv.zst)
+and opens them as decompressing binary streams, so they can be parsed
+without ever being written out uncompressed.
+"""
+
+import bz2
+import gzip
+import lzma
+import os
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard is optional
+    zstandard = None
+
+
+# Compression suffix -> codec name recorded in the metadata
+COMPRESSION_SUFFIXES = {
+    '.gz': 'gzip',
+    '.bz2': 'bz2',
+    '.xz': 'xz',
+    '.zst': 'zstd',
+}
+
+# Filename endings of compressed CSVs
+COMPRESSED_CSV_EXTENSIONS = tuple(f".csv{suffix}" for suffix in COMPRESSION_SUFFIXES)
+
+
+def codec_available(codec: str) -> bool:
+    """
+    Whether the package a codec needs is installed.
+    """
+    return codec != 'zstd' or zstandard is not None
+
+
+# Endings of the compressed CSVs that can be read here, and so are accepted as uploads
+READABLE_COMPRESSED_CSV_EXTENSIONS = tuple(
+    f".csv{suffix}" for suffix, codec in COMPRESSION_SUFFIXES.items() if codec_available(codec)
+)
+
+
+def split_compression(filename: str) -> Tuple[str, Optional[str]]:
+    """
+    Split a compression suffix off a filename.
+
+    Returns:
+        Tuple of (filename without the compression suffix, codec name), or
+        (filename, None) if the file isn't compressed
+    """
+    suffix = Path(filename).suffix.lower()
+    if suffix in COMPRESSION_SUFFIXES:
+        return filename[:-len(suffix)], COMPRESSION_SUFFIXES[suffix]
+    return filename, None
+
+
+def open_decompressed(file_path: Any, codec: str) -> Any:
+    """
+    Open a path or binary file-like object as a stream of decompressed bytes.
+    A file-like object is read from its current position and left open when
+    the returned stream is closed.
+    """
+    if codec == 'gzip':
+        if isinstance(file_path, (str, os.PathLike)):
+            return gzip.open(file_path, 'rb')
+        return gzip.GzipFile(fileobj=file_path, mode='rb')
+    if codec == 'bz2':
+        return bz2.open(file_path, 'rb')
+    if codec == 'xz':
+        return lzma.open(file_path, 'rb')
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError("The zstandard package is required to read .zst files")
+        # Files written by parallel compressors are made of several frames
+        decompressor = zstandard.ZstdDecompressor()
+        if isinstance(file_path, (str, os.PathLike)):
+            return decompressor.stream_reader(open(file_path, 'rb'), read_across_frames=True, closefd=True)
+        return decompressor.stream_reader(file_path, read_across_frames=True, closefd=False)
+    raise ValueError(f"Unsupported compression: {codec}")
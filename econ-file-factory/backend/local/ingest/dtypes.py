@@ -0,0 +1,140 @@
+"""
+Dtype Planning Module
+Plans a compact dtype for each column of an ingested frame from a sample of
+its values: categoricals for low-cardinality text, downcast integers, and
+nullable integers for whole-number float columns with missing values.
+"""
+
+from typing import Any, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# Number of rows sampled from each column when planning its dtype
+DTYPE_SAMPLE_ROWS = 10_000
+
+# Text columns whose sampled distinct/total ratio is at most this become categorical
+MAX_CATEGORY_RATIO = 0.5
+
+# Text columns with more distinct sampled values than this stay as text
+MAX_CATEGORIES = 1_000
+
+# Smallest first: the first type whose range holds the column is used
+INTEGER_TYPES = [np.int8, np.int16, np.int32, np.int64]
+
+
+def plan_dtypes(df: pd.DataFrame, sample_rows: int = DTYPE_SAMPLE_ROWS,
+                max_category_ratio: float = MAX_CATEGORY_RATIO,
+                max_categories: int = MAX_CATEGORIES) -> Dict[str, str]:
+    """
+    Choose a compact dtype for each column of a DataFrame.
+
+    Args:
+        df: DataFrame to plan for
+        sample_rows: Number of rows sampled when judging text cardinality
+        max_category_ratio: Highest distinct/total ratio for a categorical
+        max_categories: Highest number of distinct values for a categorical
+
+    Returns:
+        Dictionary of column name to dtype name, for columns that should change
+    """
+    sample = df.sample(n=sample_rows, random_state=0) if len(df) > sample_rows else df
+    plan = {}
+
+    for col in df.columns:
+        series = df[col]
+        if not isinstance(col, str) or isinstance(series, pd.DataFrame):
+            # Duplicate or non-string labels are left for harmonization to sort out
+            continue
+
+        if pd.api.types.is_bool_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype):
+            continue
+        elif pd.api.types.is_integer_dtype(series):
+            dtype = _smallest_integer(series, nullable=pd.api.types.is_extension_array_dtype(series))
+        elif pd.api.types.is_float_dtype(series):
+            dtype = _whole_number_dtype(series)
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            dtype = _text_dtype(sample[col], max_category_ratio, max_categories)
+        else:
+            dtype = None
+
+        if dtype is not None and dtype != str(series.dtype):
+            plan[col] = dtype
+
+    return plan
+
+
+def _smallest_integer(series: pd.Series, nullable: bool) -> str:
+    """
+    Name of the smallest integer dtype that holds every value of a series.
+    """
+    low, high = series.min(), series.max()
+    if pd.isna(low):
+        return 'Int8' if nullable else 'int8'
+    for int_type in INTEGER_TYPES:
+        info = np.iinfo(int_type)
+        if info.min <= low and high <= info.max:
+            name = np.dtype(int_type).name
+            return name.capitalize() if nullable else name
+    return 'Int64' if nullable else 'int64'
+
+
+def _whole_number_dtype(series: pd.Series):
+    """
+    Nullable integer dtype for a float column holding only whole numbers,
+    or None if it holds fractions (float precision is never reduced).
+    """
+    values = series.dropna().to_numpy()
+    if len(values) == 0 or not np.all(np.isfinite(values)) or not np.all(values == np.round(values)):
+        return None
+    if values.min() < np.iinfo(np.int64).min or values.max() > np.iinfo(np.int64).max:
+        return None
+    return _smallest_integer(series, nullable=True)
+
+
+def _text_dtype(sample: pd.Series, max_category_ratio: float, max_categories: int):
+    """
+    'category' for low-cardinality text, judged from a sample, else None.
+    """
+    values = sample.dropna()
+    if len(values) == 0 or not all(isinstance(v, str) for v in values.head(100)):
+        return None
+    distinct = values.nunique()
+    if distinct <= max_categories and distinct / len(values) <= max_category_ratio:
+        return 'category'
+    return None
+
+
+def compact_dataframe(df: pd.DataFrame, **plan_options: Any) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Convert a DataFrame to the dtypes chosen by plan_dtypes.
+
+    The caller's frame is left as it is: the converted columns are set on a
+    shallow copy, which shares the data of the columns that don't change.
+
+    Args:
+        df: DataFrame to compact
+        **plan_options: Passed through to plan_dtypes
+
+    Returns:
+        Tuple of (new compacted DataFrame, report) where the report holds the
+        dtype plan and the memory used before and after, in bytes
+    """
+    memory_before = int(df.memory_usage(deep=True).sum())
+    plan = plan_dtypes(df, **plan_options)
+
+    df = df.copy(deep=False)
+    for col, dtype in list(plan.items()):
+        try:
+            df[col] = df[col].astype(dtype)
+        except (TypeError, ValueError, OverflowError):
+            del plan[col]
+
+    memory_after = int(df.memory_usage(deep=True).sum())
+    return df, {
+        'dtype_plan': plan,
+        'memory_bytes_before': memory_before,
+        'memory_bytes_after': memory_after,
+        'memory_saved_bytes': memory_before - memory_after
+    }
@@ -0,0 +1,222 @@
+"""
+Encoding Detection Module
+Detects the text encoding of an upload once, from a bounded byte sample, and
+decodes the stream incrementally, switching encoding mid-stream when a later
+byte turns out to be invalid in the detected encoding.
+"""
+
+import codecs
+import io
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from local.uploads.ingest.readers import detect_encoding
+
+
+# Number of bytes sampled from the start of a file for encoding detection
+ENCODING_SAMPLE_BYTES = 64 * 1024
+
+# Encodings switched to, in order, when the detected one fails mid-stream.
+# latin-1 maps every byte, so decoding can never fail after reaching it.
+FALLBACK_ENCODINGS = ['cp1252', 'latin-1']
+
+# Detector results below this confidence fall back to FALLBACK_ENCODINGS[0]
+MIN_DETECTION_CONFIDENCE = 0.5
+
+# Block size used when decoding the raw byte stream
+DECODE_BLOCK_BYTES = 256 * 1024
+
+
+def read_sample(file_obj: Any, size: int = ENCODING_SAMPLE_BYTES) -> bytes:
+    """
+    Read up to `size` bytes from the start of a path or binary file-like
+    object, leaving a file-like object positioned where it was.
+    """
+    if isinstance(file_obj, (str, os.PathLike)):
+        with open(file_obj, 'rb') as fh:
+            return fh.read(size)
+
+    position = file_obj.tell()
+    sample = file_obj.read(size)
+    file_obj.seek(position)
+    return sample
+
+
+def sniff_encoding(file_obj: Any, sample_size: int = ENCODING_SAMPLE_BYTES) -> Tuple[str, float]:
+    """
+    Detect the encoding of a file from a bounded sample of its bytes.
+
+    Args:
+        file_obj: Path or binary file-like object
+        sample_size: Number of bytes to sample
+
+    Returns:
+        Tuple of (codec name, seconds spent detecting)
+    """
+    start = time.perf_counter()
+    sample = read_sample(file_obj, sample_size)
+
+    if _is_utf8(sample):
+        encoding = 'utf-8'
+    else:
+        # Low-confidence guesses on short samples are often exotic code pages;
+        # cp1252 is the most likely encoding for a non-UTF-8 upload
+        encoding = _normalize_encoding(
+            detect_encoding(sample, default=FALLBACK_ENCODINGS[0], min_confidence=MIN_DETECTION_CONFIDENCE)
+        )
+    return encoding, time.perf_counter() - start
+
+
+def _is_utf8(sample: bytes) -> bool:
+    """
+    Check whether a sample is valid UTF-8, allowing a multi-byte character
+    cut off at the end of the sample.
+    """
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, False)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def _normalize_encoding(encoding: Optional[str]) -> str:
+    """
+    Map a detector result to a Python codec name, defaulting to utf-8.
+    """
+    if not encoding:
+        return 'utf-8'
+    try:
+        name = codecs.lookup(encoding).name
+    except LookupError:
+        return 'utf-8'
+    # Pure-ASCII samples are decoded as utf-8, which is a superset
+    return 'utf-8' if name == 'ascii' else name
+
+
+def is_text_stream(file_obj: Any) -> bool:
+    """
+    Check whether a file-like object yields already-decoded text.
+    """
+    return isinstance(file_obj, io.TextIOBase)
+
+
+class FallbackDecodingStream(io.TextIOBase):
+    """
+    Read-only text stream that decodes a binary stream block by block.
+
+    Decoding starts in the detected encoding. If a byte sequence is invalid,
+    the text before it is kept and decoding continues from that byte in the
+    next fallback encoding, without re-reading the stream from the start.
+    """
+
+    def __init__(self, raw: Any, encoding: str,
+                 fallbacks: Optional[List[str]] = None,
+                 owns_raw: bool = False,
+                 block_size: int = DECODE_BLOCK_BYTES):
+        self._raw = raw
+        self._owns_raw = owns_raw
+        self._block_size = block_size
+        self._encoding = codecs.lookup(encoding).name
+        self._decoder = codecs.getincrementaldecoder(self._encoding)()
+        self._fallbacks = [
+            codecs.lookup(e).name for e in (FALLBACK_ENCODINGS if fallbacks is None else fallbacks)
+            if codecs.lookup(e).name != self._encoding
+        ]
+        self._pending = ''
+        self._bytes_read = 0
+        self._eof = False
+        self.detected_encoding = self._encoding
+        self.switches: List[Dict[str, Any]] = []
+
+    @property
+    def encoding(self) -> str:
+        return self._encoding
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: Optional[int] = -1) -> str:
+        if size is None or size < 0:
+            parts = [self._pending]
+            while not self._eof:
+                parts.append(self._read_block())
+            self._pending = ''
+            return ''.join(parts)
+
+        while len(self._pending) < size and not self._eof:
+            self._pending += self._read_block()
+        text, self._pending = self._pending[:size], self._pending[size:]
+        return text
+
+    def readline(self, size: Optional[int] = -1) -> str:
+        while '\n' not in self._pending and not self._eof:
+            self._pending += self._read_block()
+        end = self._pending.find('\n') + 1 or len(self._pending)
+        if size is not None and size >= 0:
+            end = min(end, size)
+        line, self._pending = self._pending[:end], self._pending[end:]
+        return line
+
+    def close(self) -> None:
+        if self._owns_raw and not self.closed:
+            self._raw.close()
+        super().close()
+
+    def _read_block(self) -> str:
+        block = self._raw.read(self._block_size)
+        final = not block
+        self._bytes_read += len(block)
+        if final:
+            self._eof = True
+        return self._decode(block, final)
+
+    def _decode(self, data: bytes, final: bool) -> str:
+        try:
+            return self._decoder.decode(data, final)
+        except UnicodeDecodeError as e:
+            if not self._fallbacks:
+                raise
+            # e.object is the decoder's buffered bytes followed by `data`
+            offset = self._bytes_read - len(e.object) + e.start
+            decoded = e.object[:e.start].decode(self._encoding)
+            new_encoding = self._fallbacks.pop(0)
+            self.switches.append({
+                'byte_offset': offset,
+                'from': self._encoding,
+                'to': new_encoding
+            })
+            self._encoding = new_encoding
+            self._decoder = codecs.getincrementaldecoder(new_encoding)()
+            return decoded + self._decode(e.object[e.start:], final)
+
+
+def open_text_stream(file_obj: Any, encoding: str) -> io.TextIOBase:
+    """
+    Open a path or file-like object as a text stream decoded with
+    FallbackDecodingStream. Text streams are returned unchanged.
+    """
+    if is_text_stream(file_obj):
+        return file_obj
+    if isinstance(file_obj, (str, os.PathLike)):
+        return FallbackDecodingStream(open(file_obj, 'rb'), encoding, owns_raw=True)
+    return FallbackDecodingStream(file_obj, encoding)
+
+
+def encoding_metadata(stream: io.TextIOBase, detection_seconds: float) -> Dict[str, Any]:
+    """
+    Build the encoding entries of the reader metadata for a decoded stream.
+    """
+    if not isinstance(stream, FallbackDecodingStream):
+        return {
+            'encoding': getattr(stream, 'encoding', None) or 'text',
+            'encoding_detected': None,
+            'encoding_switches': [],
+            'encoding_detection_seconds': round(detection_seconds, 6)
+        }
+    return {
+        'encoding': stream.encoding,
+        'encoding_detected': stream.detected_encoding,
+        'encoding_switches': list(stream.switches),
+        'encoding_detection_seconds': round(detection_seconds, 6)
+    }
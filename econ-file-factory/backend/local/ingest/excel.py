@@ -0,0 +1,196 @@
+"""
+Streaming Excel Module
+Reads .xlsx worksheets row by row with openpyxl's read-only mode and decodes
+them into bounded-size DataFrame batches, so a large workbook never needs
+all of its cells in memory as Python objects at once.
+"""
+
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+from openpyxl import load_workbook
+
+
+# Maximum number of rows decoded into one batch
+EXCEL_BATCH_ROWS = 50_000
+
+# Workbooks at least this large are read with the streaming reader
+EXCEL_STREAMING_BYTES = 8 * 1024 * 1024
+
+
+def iter_excel_batches(file_path: Any, filename: str,
+                       sheet_name: Optional[str] = None,
+                       batch_rows: int = EXCEL_BATCH_ROWS,
+                       nrows: Optional[int] = None,
+                       columns: Optional[List[Any]] = None) -> Iterator[Tuple[pd.DataFrame, Dict[str, Any]]]:
+    """
+    Stream a worksheet as DataFrame batches of at most `batch_rows` rows.
+
+    The first non-empty row is the header; fully empty rows are skipped, as
+    pd.read_excel does. Cells to the right of the last named header column
+    are ignored.
+
+    Args:
+        file_path: Path to the workbook (or a file-like object)
+        filename: Original filename
+        sheet_name: Sheet to read (default: the first sheet)
+        batch_rows: Maximum number of rows per batch
+        nrows: Stop after this many data rows
+        columns: Columns to keep; cells of other columns are never put into
+            a batch. Names the sheet doesn't have are ignored
+
+    Yields:
+        Tuples of (batch DataFrame, metadata_dict). The metadata has the same
+        keys as read_file for Excel, with 'rows' counting the rows read so
+        far, plus 'chunk_index' and 'chunk_rows'.
+    """
+    try:
+        workbook = load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+    except Exception as e:
+        raise ValueError(f"Error reading Excel file {filename}: {str(e)}")
+
+    try:
+        sheet_names = workbook.sheetnames
+        sheet = sheet_name if sheet_name is not None else sheet_names[0]
+        rows = workbook[sheet].iter_rows(values_only=True)
+
+        header = next((row for row in rows if _has_values(row)), ())
+        column_names = _header_names(header)
+        width = len(column_names)
+        keep = None
+        if columns is not None:
+            wanted = set(columns)
+            keep = [i for i, name in enumerate(column_names) if name in wanted]
+            column_names = [column_names[i] for i in keep]
+
+        metadata = {
+            'filename': filename,
+            'file_type': 'excel',
+            'sheets': sheet_names,
+            'sheet_used': sheet,
+            'streamed': True,
+            'rows': 0,
+            'columns': len(column_names),
+            'column_names': column_names,
+            'chunk_index': 0,
+            'chunk_rows': 0
+        }
+
+        start = time.perf_counter()
+        batch = []
+        total_rows = 0
+        chunk_index = 0
+        for row in rows:
+            if nrows is not None and total_rows + len(batch) >= nrows:
+                break
+            if not _has_values(row):
+                continue
+            if keep is not None:
+                batch.append(tuple(row[i] if i < len(row) else None for i in keep))
+            else:
+                batch.append(row[:width] if len(row) >= width else row + (None,) * (width - len(row)))
+            if len(batch) >= batch_rows:
+                yield _batch_frame(batch, metadata, total_rows, chunk_index, start)
+                total_rows += len(batch)
+                chunk_index += 1
+                batch = []
+                start = time.perf_counter()
+
+        if batch or chunk_index == 0:
+            yield _batch_frame(batch, metadata, total_rows, chunk_index, start)
+    finally:
+        workbook.close()
+
+
+def read_excel_streaming(file_path: Any, filename: str,
+                         sheet_name: Optional[str] = None,
+                         nrows: Optional[int] = None,
+                         batch_rows: int = EXCEL_BATCH_ROWS,
+                         columns: Optional[List[Any]] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Read a worksheet with the streaming reader and concatenate its batches.
+
+    Returns:
+        Tuple of (DataFrame, metadata_dict) with the same keys as the
+        pd.read_excel-based reader, plus 'streamed'
+    """
+    start = time.perf_counter()
+    batches = []
+    metadata = {}
+    for batch, metadata in iter_excel_batches(file_path, filename, sheet_name, batch_rows, nrows, columns):
+        batches.append(batch)
+    if len(batches) > 1:
+        # A column that is empty throughout one batch decodes as object there
+        df = pd.concat(batches, ignore_index=True).infer_objects()
+    else:
+        df = batches[0]
+
+    metadata = {
+        key: value for key, value in metadata.items()
+        if key not in ('chunk_index', 'chunk_rows', 'batch_decode_seconds')
+    }
+    metadata.update({
+        'sheet_parse_seconds': round(time.perf_counter() - start, 6),
+        'batches': len(batches),
+        'rows': len(df)
+    })
+    return df, metadata
+
+
+def should_stream_excel(file_path: Any) -> bool:
+    """
+    Whether a workbook is large enough to be read with the streaming reader.
+    """
+    if isinstance(file_path, (str, os.PathLike)):
+        return os.path.getsize(file_path) >= EXCEL_STREAMING_BYTES
+    if hasattr(file_path, 'seek'):
+        position = file_path.tell()
+        size = file_path.seek(0, os.SEEK_END)
+        file_path.seek(position)
+        return size >= EXCEL_STREAMING_BYTES
+    return False
+
+
+def _batch_frame(batch: List[tuple], metadata: Dict[str, Any], rows_before: int,
+                 chunk_index: int, start: float) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Build one batch DataFrame and its streaming metadata.
+    """
+    df = pd.DataFrame.from_records(batch, columns=metadata['column_names'], nrows=len(batch))
+    batch_metadata = dict(metadata)
+    batch_metadata.update({
+        'rows': rows_before + len(df),
+        'chunk_index': chunk_index,
+        'chunk_rows': len(df),
+        'batch_decode_seconds': round(time.perf_counter() - start, 6)
+    })
+    return df, batch_metadata
+
+
+def _has_values(row: tuple) -> bool:
+    return any(value is not None and value != '' for value in row)
+
+
+def _header_names(header: tuple) -> List[Any]:
+    """
+    Column names from a header row, named and de-duplicated like pd.read_excel:
+    blank cells become 'Unnamed: <position>' and repeats get a '.<n>' suffix.
+    Trailing blank header cells are dropped.
+    """
+    cells = list(header)
+    while cells and (cells[-1] is None or cells[-1] == ''):
+        cells.pop()
+
+    names = []
+    seen = {}
+    for i, cell in enumerate(cells):
+        name = f"Unnamed: {i}" if cell is None or cell == '' else cell
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
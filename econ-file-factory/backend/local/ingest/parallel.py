@@ -0,0 +1,151 @@
+"""
+Parallel Ingestion Module
+Parses the files of an upload batch in a process pool. Parsed frames are
+sent back from the workers as Arrow IPC streams rather than as pickled
+DataFrames, and results keep the order of the uploads.
+"""
+
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - pyarrow is optional
+    pa = None
+
+from local.ingest.readers import read_upload
+
+
+Entry = Tuple[pd.DataFrame, Dict[str, Any], str]
+
+
+def ingest_uploads(files: List[Any], filenames: List[str],
+                   max_workers: Optional[int] = None,
+                   columns: Optional[List[Optional[List[str]]]] = None,
+                   **read_options: Any) -> List[Tuple[List[Entry], Optional[str]]]:
+    """
+    Read every upload with read_upload, in a process pool when more than one
+    worker is requested.
+    
+    Args:
+        files: Paths or file-like objects, one per upload
+        filenames: Original filenames, in the same order
+        max_workers: Process pool size; None or 1 reads the files in turn
+        columns: Columns to read from each upload, in upload order; a None
+            entry (or None overall) reads every column
+        **read_options: Passed through to read_upload
+        
+    Returns:
+        One (entries, error) tuple per upload, in upload order. entries is a
+        list of (DataFrame, metadata_dict, source_name); error is None on
+        success or the error message if the upload could not be read.
+    """
+    file_options = [
+        dict(read_options, columns=file_columns)
+        for file_columns in (columns if columns is not None else [None] * len(files))
+    ]
+    if not max_workers or max_workers <= 1 or len(files) <= 1:
+        return [_read_or_error(file_obj, filename, options)
+                for file_obj, filename, options in zip(files, filenames, file_options)]
+    
+    payloads = [_to_payload(file_obj) for file_obj in files]
+    
+    results = []
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(files))) as executor:
+        # Workbooks are already parsed in a worker process; don't nest pools
+        futures = [
+            executor.submit(_ingest_worker, payload, filename, dict(options, excel_workers=1))
+            for payload, filename, options in zip(payloads, filenames, file_options)
+        ]
+        for future in futures:
+            try:
+                encoded_entries, error = future.result()
+            except Exception as e:
+                results.append(([], str(e)))
+                continue
+            
+            entries = []
+            for encoded_frame, metadata, source in encoded_entries:
+                start = time.perf_counter()
+                df = _decode_frame(encoded_frame)
+                metadata['decode_seconds'] = round(time.perf_counter() - start, 6)
+                entries.append((df, metadata, source))
+            results.append((entries, error))
+    
+    return results
+
+
+def _read_or_error(file_obj: Any, filename: str,
+                   read_options: Dict[str, Any]) -> Tuple[List[Entry], Optional[str]]:
+    """
+    Read one upload in this process, capturing the error instead of raising.
+    """
+    try:
+        return read_upload(file_obj, filename, **read_options), None
+    except Exception as e:
+        return [], str(e)
+
+
+def _to_payload(file_obj: Any) -> Any:
+    """
+    Turn an upload into something a worker process can receive: paths are
+    passed as-is, streams are read into bytes.
+    """
+    if isinstance(file_obj, (str, os.PathLike)):
+        return file_obj
+    if hasattr(file_obj, 'seek'):
+        file_obj.seek(0)
+    data = file_obj.read()
+    return data.encode('utf-8') if isinstance(data, str) else data
+
+
+def _ingest_worker(payload: Any, filename: str,
+                   read_options: Dict[str, Any]) -> Tuple[List[Tuple[Tuple[str, bytes], Dict[str, Any], str]], Optional[str]]:
+    """
+    Process pool worker: parse one upload and encode its frames for transfer.
+    """
+    import io
+    
+    file_obj = io.BytesIO(payload) if isinstance(payload, bytes) else payload
+    entries, error = _read_or_error(file_obj, filename, read_options)
+    
+    encoded = []
+    for df, metadata, source in entries:
+        encoded_frame = _encode_frame(df)
+        metadata['transfer_format'] = encoded_frame[0]
+        metadata['transfer_bytes'] = len(encoded_frame[1])
+        encoded.append((encoded_frame, metadata, source))
+    return encoded, error
+
+
+def _encode_frame(df: pd.DataFrame) -> Tuple[str, bytes]:
+    """
+    Serialize a frame as an Arrow IPC stream. Frames Arrow cannot represent
+    faithfully (non-string or duplicate column names, mixed-type object
+    columns) fall back to pickle.
+    """
+    if pa is not None and df.columns.is_unique and all(isinstance(c, str) for c in df.columns):
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            return 'arrow_ipc', sink.getvalue().to_pybytes()
+        except (pa.ArrowException, TypeError, ValueError):
+            pass
+    return 'pickle', pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _decode_frame(encoded_frame: Tuple[str, bytes]) -> pd.DataFrame:
+    """
+    Rebuild a frame encoded by _encode_frame.
+    """
+    transfer_format, data = encoded_frame
+    if transfer_format == 'arrow_ipc':
+        return pa.ipc.open_stream(pa.py_buffer(data)).read_all().to_pandas()
+    return pickle.loads(data)
@@ -6,56 +6,233 @@ Handles reading different file formats (.csv, .xlsx, .zip) for data ingestion.
 import pandas as pd
 import zipfile
 import os
-from typing import Dict, List, Tuple, Any
+import io
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Tuple, Any, Iterator, Optional, Union, Callable
 from pathlib import Path
 
+from local.ingest.compression import (
+    COMPRESSED_CSV_EXTENSIONS, READABLE_COMPRESSED_CSV_EXTENSIONS, split_compression, open_decompressed
+)
+from local.ingest.columnar import COLUMNAR_EXTENSIONS, read_columnar_file, read_columnar_chunks
+from local.ingest.dtypes import compact_dataframe
+from local.ingest.excel import iter_excel_batches, read_excel_streaming, should_stream_excel
+from local.ingest.encoding import (
+    ENCODING_SAMPLE_BYTES, sniff_encoding, open_text_stream, encoding_metadata, is_text_stream
+)
 
-def read_file(file_path: str, filename: str) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+
+# Default number of rows per chunk for streaming reads
+DEFAULT_CHUNK_ROWS = 50_000
+
+# Default number of rows parsed by the sample-first reader
+DEFAULT_SAMPLE_ROWS = 100
+
+# Workbook formats; only .xlsx can be streamed row by row
+EXCEL_EXTENSIONS = ('.xlsx', '.xls')
+
+# Members of a ZIP archive that are read as data files
+ZIP_DATA_EXTENSIONS = ('.csv',) + EXCEL_EXTENSIONS + READABLE_COMPRESSED_CSV_EXTENSIONS + tuple(COLUMNAR_EXTENSIONS)
+
+
+def read_file(file_path: str, filename: str,
+              columns: Optional[List[str]] = None,
+              nrows: Optional[int] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
     """
     Read a file and return the DataFrame along with metadata.
     
     Args:
         file_path: Path to the file
         filename: Original filename
+        columns: Columns to read; names the file doesn't have are ignored.
+            None reads every column
+        nrows: Preview only the first nrows rows of a CSV or Excel file
         
     Returns:
         Tuple of (DataFrame, metadata_dict)
     """
-    file_extension = Path(filename).suffix.lower()
+    inner_filename, compression = split_compression(filename)
+    file_extension = Path(inner_filename).suffix.lower()
     
-    if file_extension == '.csv':
-        return _read_csv_file(file_path, filename)
-    elif file_extension == '.xlsx':
-        return _read_excel_file(file_path, filename)
+    if compression and file_extension != '.csv':
+        raise ValueError(f"Unsupported file format: {Path(filename).suffix.lower()}")
+    elif file_extension in COLUMNAR_EXTENSIONS:
+        return read_columnar_file(file_path, filename, columns=columns)
+    elif file_extension == '.csv':
+        return _read_csv_file(file_path, filename, nrows=nrows, compression=compression, columns=columns)
+    elif file_extension in EXCEL_EXTENSIONS:
+        return _read_excel_file(file_path, filename, nrows=nrows, columns=columns)
     elif file_extension == '.zip':
-        return _read_zip_file(file_path, filename)
+        return _read_zip_file(file_path, filename, columns=columns)
+    else:
+        raise ValueError(f"Unsupported file format: {file_extension}")
+
+
+def read_file_chunks(file_path: str, filename: str,
+                     chunksize: int = DEFAULT_CHUNK_ROWS) -> Iterator[Tuple[pd.DataFrame, Dict[str, Any]]]:
+    """
+    Read a file as a stream of bounded-size DataFrame chunks.
+    
+    CSV (plain or compressed), Excel and Parquet files are parsed
+    incrementally, so only one chunk is held in memory at a time. Feather and Arrow IPC files are memory-mapped
+    and sliced. ZIP files are read in full and then sliced.
+    
+    Args:
+        file_path: Path to the file (or a file-like object)
+        filename: Original filename
+        chunksize: Maximum number of rows per chunk
+        
+    Yields:
+        Tuples of (chunk DataFrame, metadata_dict). The metadata has the same
+        keys as read_file, with 'rows' counting the rows read so far, plus
+        'chunk_index' and 'chunk_rows'.
+    """
+    inner_filename, compression = split_compression(filename)
+    file_extension = Path(inner_filename).suffix.lower()
+    
+    if compression and file_extension != '.csv':
+        raise ValueError(f"Unsupported file format: {Path(filename).suffix.lower()}")
+    elif file_extension == '.csv':
+        yield from _read_csv_chunks(file_path, filename, chunksize, compression=compression)
+    elif file_extension in COLUMNAR_EXTENSIONS:
+        yield from read_columnar_chunks(file_path, filename, chunksize)
+    elif file_extension == '.xlsx':
+        yield from iter_excel_batches(file_path, filename, batch_rows=chunksize)
+    elif file_extension in ('.xls', '.zip'):
+        df, metadata = read_file(file_path, filename)
+        yield from slice_into_chunks(df, metadata, chunksize)
     else:
         raise ValueError(f"Unsupported file format: {file_extension}")
 
 
-def _read_csv_file(file_path: str, filename: str) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+def _read_csv_chunks(file_path: str, filename: str, chunksize: int,
+                     compression: Optional[str] = None) -> Iterator[Tuple[pd.DataFrame, Dict[str, Any]]]:
+    """
+    Read a CSV file in chunks of at most `chunksize` rows.
+    """
+    metadata = {
+        'filename': filename,
+        'file_type': 'csv',
+        'compression': compression,
+        'rows': 0,
+        'columns': 0,
+        'column_names': [],
+        'chunk_index': 0,
+        'chunk_rows': 0
+    }
+    
+    try:
+        with _open_csv_stream(file_path, compression) as (stream, detection_seconds):
+            with pd.read_csv(stream, chunksize=chunksize) as reader:
+                for chunk_index, chunk in enumerate(reader):
+                    metadata = dict(metadata)
+                    metadata.update(encoding_metadata(stream, detection_seconds))
+                    metadata.update({
+                        'rows': metadata['rows'] + len(chunk),
+                        'columns': len(chunk.columns),
+                        'column_names': list(chunk.columns),
+                        'chunk_index': chunk_index,
+                        'chunk_rows': len(chunk)
+                    })
+                    yield chunk, metadata
+    except (UnicodeDecodeError, pd.errors.ParserError) as e:
+        raise ValueError(f"Error reading CSV file {filename}: {str(e)}")
+
+
+@contextmanager
+def _open_csv_stream(file_path: Any, compression: Optional[str] = None) -> Iterator[Tuple[io.TextIOBase, float]]:
+    """
+    Open a CSV upload as a decoded text stream, decompressing it on the fly
+    if `compression` is set. Yields (stream, encoding detection seconds).
+    """
+    encoding, detection_seconds = _detect_csv_encoding(file_path, compression)
+    raw = open_decompressed(file_path, compression) if compression else file_path
+    try:
+        stream = open_text_stream(raw, encoding)
+        try:
+            yield stream, detection_seconds
+        finally:
+            if stream is not raw:
+                stream.close()
+    finally:
+        if raw is not file_path:
+            raw.close()
+
+
+def _detect_csv_encoding(file_path: Any, compression: Optional[str] = None) -> Tuple[str, float]:
+    """
+    Detect a CSV file's encoding once from a bounded byte sample. For a
+    compressed file the sample is taken from the decompressed bytes.
+    Already-decoded text streams need no detection.
+    """
+    if is_text_stream(file_path):
+        return getattr(file_path, 'encoding', None) or 'text', 0.0
+    if not compression:
+        return sniff_encoding(file_path)
+    
+    position = None if isinstance(file_path, (str, os.PathLike)) else file_path.tell()
+    with open_decompressed(file_path, compression) as raw:
+        sample = raw.read(ENCODING_SAMPLE_BYTES)
+    if position is not None:
+        file_path.seek(position)
+    return sniff_encoding(io.BytesIO(sample))
+
+
+def slice_into_chunks(df: pd.DataFrame, metadata: Dict[str, Any],
+                       chunksize: int) -> Iterator[Tuple[pd.DataFrame, Dict[str, Any]]]:
+    """
+    Slice an already-parsed DataFrame into chunks with streaming metadata.
+    """
+    total_rows = len(df)
+    for chunk_index, start in enumerate(range(0, max(total_rows, 1), chunksize)):
+        chunk = df.iloc[start:start + chunksize]
+        chunk_metadata = dict(metadata)
+        chunk_metadata.update({
+            'rows': start + len(chunk),
+            'chunk_index': chunk_index,
+            'chunk_rows': len(chunk)
+        })
+        yield chunk, chunk_metadata
+
+
+def _column_filter(columns: Optional[List[str]]) -> Optional[Callable[[Any], bool]]:
+    """
+    usecols callable keeping the named columns, so names a file doesn't
+    have are ignored rather than raising. None keeps every column.
+    """
+    if columns is None:
+        return None
+    wanted = set(columns)
+    return lambda name: name in wanted
+
+
+def _read_csv_file(file_path: str, filename: str,
+                   nrows: Optional[int] = None,
+                   compression: Optional[str] = None,
+                   columns: Optional[List[str]] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
     """
     Read a CSV file.
+    
+    The encoding is detected once from a byte sample; if a later byte is
+    invalid in that encoding, decoding switches to a fallback encoding from
+    that point on instead of re-parsing the file. Compressed files are
+    decompressed as a stream straight into the parser. With `columns`, the
+    other columns are skipped by the parser instead of being converted.
     """
     try:
-        # Try different encodings
-        encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
-        df = None
-        
-        for encoding in encodings:
-            try:
-                df = pd.read_csv(file_path, encoding=encoding)
-                break
-            except UnicodeDecodeError:
-                continue
-        
-        if df is None:
-            raise ValueError(f"Could not read CSV file with any encoding: {filename}")
+        with _open_csv_stream(file_path, compression) as (stream, detection_seconds):
+            df = pd.read_csv(stream, nrows=nrows, usecols=_column_filter(columns))
+            encoding_info = encoding_metadata(stream, detection_seconds)
         
         metadata = {
             'filename': filename,
             'file_type': 'csv',
-            'encoding': encoding,
+            'compression': compression,
+            **encoding_info,
             'rows': len(df),
             'columns': len(df.columns),
             'column_names': list(df.columns)
@@ -67,23 +244,34 @@ def _read_csv_file(file_path: str, filename: str) -> Tuple[pd.DataFrame, Dict[st
         raise ValueError(f"Error reading CSV file {filename}: {str(e)}")
 
 
-def _read_excel_file(file_path: str, filename: str) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+def _read_excel_file(file_path: str, filename: str,
+                     nrows: Optional[int] = None,
+                     columns: Optional[List[str]] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
     """
     Read an Excel file.
+    
+    Large workbooks and previews are decoded row by row in bounded batches;
+    smaller workbooks are parsed in one go with pd.read_excel.
     """
+    streamable = filename.lower().endswith('.xlsx')
+    if streamable and (nrows is not None or should_stream_excel(file_path)):
+        return read_excel_streaming(file_path, filename, nrows=nrows, columns=columns)
+    
     try:
-        # Read all sheets
-        excel_file = pd.ExcelFile(file_path)
-        sheet_names = excel_file.sheet_names
-        
-        # Use the first sheet by default
-        df = pd.read_excel(file_path, sheet_name=sheet_names[0])
+        # Open the workbook once and parse the first sheet from that handle
+        with pd.ExcelFile(file_path) as excel_file:
+            sheet_names = excel_file.sheet_names
+            
+            start = time.perf_counter()
+            df = excel_file.parse(sheet_names[0], usecols=_column_filter(columns), nrows=nrows)
+            parse_seconds = time.perf_counter() - start
         
         metadata = {
             'filename': filename,
             'file_type': 'excel',
             'sheets': sheet_names,
             'sheet_used': sheet_names[0],
+            'sheet_parse_seconds': round(parse_seconds, 6),
             'rows': len(df),
             'columns': len(df.columns),
             'column_names': list(df.columns)
@@ -95,48 +283,464 @@ def _read_excel_file(file_path: str, filename: str) -> Tuple[pd.DataFrame, Dict[
         raise ValueError(f"Error reading Excel file {filename}: {str(e)}")
 
 
-def _read_zip_file(file_path: str, filename: str) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+def read_excel_sheets(file_path: Any, filename: str,
+                      sheet_names: Optional[List[str]] = None,
+                      max_workers: Optional[int] = None,
+                      columns: Optional[List[str]] = None) -> List[Tuple[pd.DataFrame, Dict[str, Any]]]:
     """
-    Read a ZIP file containing data files.
+    Read several sheets of an Excel workbook, one DataFrame per sheet.
+    
+    Without a pool the workbook is opened once and the sheets are parsed in
+    turn from that ExcelFile handle. With more than one sheet and more than
+    one worker, the sheets are decoded in a process pool instead, and each
+    task opens the workbook again from its path: an open ExcelFile can't be
+    sent to another process, and opening only reads the workbook's index
+    (the sheets are decoded lazily), which costs little next to decoding a
+    sheet. A stream that isn't backed by a file on disk is copied to a
+    temporary file for the workers.
+    
+    Args:
+        file_path: Path to the workbook (or a file-like object)
+        filename: Original filename
+        sheet_names: Sheets to read, in order (default: all sheets)
+        max_workers: Process pool size (default: one per CPU, capped at the
+            number of sheets; 1 disables the pool)
+        columns: Columns to read from each sheet; None reads every column
+        
+    Returns:
+        List of (DataFrame, metadata_dict) tuples in sheet order. Each
+        metadata dict has the same keys as read_file for Excel files, with
+        'sheet_used' naming the sheet and 'sheet_parse_seconds' its timing.
+        Requested sheets the workbook doesn't have are listed under
+        'sheets_missing'.
+    
+    Raises:
+        ValueError: If the workbook can't be read or has none of the
+            requested sheets
     """
     try:
-        with zipfile.ZipFile(file_path, 'r') as zip_ref:
-            # List all files in the ZIP
-            file_list = zip_ref.namelist()
-            
-            # Find data files (CSV or Excel)
-            data_files = [
-                f for f in file_list 
-                if f.lower().endswith(('.csv', '.xlsx', '.xls'))
-            ]
-            
-            if not data_files:
-                raise ValueError(f"No data files found in ZIP: {filename}")
-            
-            # Use the first data file
-            first_data_file = data_files[0]
-            
-            # Extract and read the file
-            with zip_ref.open(first_data_file) as file:
-                if first_data_file.lower().endswith('.csv'):
-                    df = pd.read_csv(file)
-                else:
-                    df = pd.read_excel(file)
+        start = time.perf_counter()
+        local_path = _local_path(file_path)
+        with pd.ExcelFile(local_path or file_path) as excel_file:
+            all_sheets = excel_file.sheet_names
+            requested = sheet_names or all_sheets
+            selected = [s for s in requested if s in all_sheets]
+            missing = [s for s in requested if s not in all_sheets]
+            if not selected:
+                raise ValueError(f"none of the sheets {missing} are in the workbook")
+            open_seconds = time.perf_counter() - start
             
+            workers = min(max_workers or os.cpu_count() or 1, len(selected))
+            if workers <= 1:
+                results = [_parse_sheet_from(excel_file, sheet, columns) for sheet in selected]
+        
+        if workers > 1:
+            # Workers open the workbook from disk rather than being sent its bytes
+            with _workbook_on_disk(file_path, local_path) as path:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    results = list(executor.map(_parse_sheet, [path] * len(selected), selected,
+                                                [columns] * len(selected)))
+        
+        sheets = []
+        for sheet, (df, parse_seconds) in zip(selected, results):
             metadata = {
                 'filename': filename,
-                'file_type': 'zip',
-                'zip_contents': file_list,
-                'data_file_used': first_data_file,
+                'file_type': 'excel',
+                'sheets': all_sheets,
+                'sheet_used': sheet,
+                'sheet_parse_seconds': round(parse_seconds, 6),
+                'workbook_open_seconds': round(open_seconds, 6),
                 'rows': len(df),
                 'columns': len(df.columns),
                 'column_names': list(df.columns)
             }
+            if missing:
+                metadata['sheets_missing'] = missing
+            sheets.append((df, metadata))
+        
+        return sheets
+        
+    except Exception as e:
+        raise ValueError(f"Error reading Excel file {filename}: {str(e)}")
+
+
+def _local_path(file_obj: Any) -> Optional[str]:
+    """
+    Path of a file on disk: the path itself, or the file behind an open
+    file object. None for in-memory streams.
+    """
+    if isinstance(file_obj, (str, os.PathLike)):
+        return os.fspath(file_obj)
+    try:
+        name = file_obj.name
+        if isinstance(name, str) and os.path.samestat(os.fstat(file_obj.fileno()), os.stat(name)):
+            return name
+    except (AttributeError, OSError, ValueError):
+        pass
+    return None
+
+
+@contextmanager
+def _workbook_on_disk(file_obj: Any, local_path: Optional[str]) -> Iterator[str]:
+    """
+    Yield a path to the workbook, copying an in-memory stream to a temporary
+    file that is removed afterwards.
+    """
+    if local_path is not None:
+        yield local_path
+        return
+    
+    file_obj.seek(0)
+    with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as tmp:
+        shutil.copyfileobj(file_obj, tmp)
+    try:
+        yield tmp.name
+    finally:
+        os.remove(tmp.name)
+
+
+def _as_excel_source(workbook: Union[str, bytes]) -> Any:
+    """
+    Wrap workbook bytes in a buffer; paths are passed through.
+    """
+    return io.BytesIO(workbook) if isinstance(workbook, bytes) else workbook
+
+
+def _parse_sheet_from(excel_file: pd.ExcelFile, sheet_name: str,
+                      columns: Optional[List[str]] = None) -> Tuple[pd.DataFrame, float]:
+    """
+    Parse one sheet from an open workbook, returning the frame and its timing.
+    """
+    start = time.perf_counter()
+    df = excel_file.parse(sheet_name, usecols=_column_filter(columns))
+    return df, time.perf_counter() - start
+
+
+def _parse_sheet(path: str, sheet_name: str,
+                 columns: Optional[List[str]] = None) -> Tuple[pd.DataFrame, float]:
+    """
+    Process pool worker: open the workbook and parse a single sheet. Only the
+    workbook's index is read on opening; the sheet's cells are decoded here.
+    """
+    with pd.ExcelFile(path) as excel_file:
+        return _parse_sheet_from(excel_file, sheet_name, columns)
+
+
+def _read_zip_file(file_path: str, filename: str,
+                   columns: Optional[List[str]] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Read a ZIP file containing data files.
+    Data members that all have the same columns are stacked into one
+    DataFrame. Members with different columns aren't mixed: only the first
+    is used, and the rest are listed under 'data_files_skipped'. read_upload
+    keeps every member as a separate source instead.
+    """
+    try:
+        with zipfile.ZipFile(file_path, 'r') as zip_ref:
+            file_list = zip_ref.namelist()
+        
+        members = read_zip_members(file_path, filename, columns=columns)
+        if not members:
+            raise ValueError(f"No data files found in ZIP: {filename}")
+        
+        first_columns = list(members[0][0].columns)
+        if any(list(member_df.columns) != first_columns for member_df, _ in members[1:]):
+            skipped = [member_metadata['zip_member'] for _, member_metadata in members[1:]]
+            members = members[:1]
+        else:
+            skipped = []
+        df = pd.concat([member_df for member_df, _ in members], ignore_index=True, sort=False)
+        data_files = [member_metadata['zip_member'] for _, member_metadata in members]
+        
+        metadata = {
+            'filename': filename,
+            'file_type': 'zip',
+            'zip_contents': file_list,
+            'data_file_used': data_files[0],
+            'data_files_used': data_files,
+            'data_files_skipped': skipped,
+            'members': [member_metadata for _, member_metadata in members],
+            'rows': len(df),
+            'columns': len(df.columns),
+            'column_names': list(df.columns)
+        }
+        
+        return df, metadata
             
+    except Exception as e:
+        raise ValueError(f"Error reading ZIP file {filename}: {str(e)}")
+
+
+def is_data_file(filename: str) -> bool:
+    """
+    Whether a file, on its own or as a ZIP member, is one the readers parse.
+    """
+    return filename.lower().endswith(ZIP_DATA_EXTENSIONS)
+
+
+def zip_data_members(zip_ref: zipfile.ZipFile) -> List[str]:
+    """
+    List the data members of an open archive, skipping directories and
+    macOS resource-fork entries.
+    """
+    return [
+        info.filename for info in zip_ref.infolist()
+        if not info.is_dir()
+        and not info.filename.startswith('__MACOSX/')
+        and is_data_file(info.filename)
+    ]
+
+
+def _open_member(zip_ref: zipfile.ZipFile, name: str) -> Any:
+    """
+    Open a member for parsing. CSV members are streamed straight out of the
+    archive; workbooks need random access, so they are decompressed into
+    memory once.
+    """
+    if name.lower().endswith(('.csv',) + COMPRESSED_CSV_EXTENSIONS):
+        return zip_ref.open(name)
+    return io.BytesIO(zip_ref.read(name))
+
+
+@contextmanager
+def _open_zip(file_path: Any) -> Iterator[zipfile.ZipFile]:
+    """
+    Open an archive from a path or a stream, leaving a caller's stream open.
+    """
+    if hasattr(file_path, 'seek'):
+        file_path.seek(0)
+    with zipfile.ZipFile(file_path, 'r') as zip_ref:
+        yield zip_ref
+
+
+def iter_zip_members(file_path: Any) -> Iterator[Tuple[str, Any]]:
+    """
+    Yield (member name, stream) for each data member of a ZIP archive,
+    without writing anything to disk. Each stream is closed when the next
+    member is requested, so consume it before advancing.
+    """
+    with _open_zip(file_path) as zip_ref:
+        for name in zip_data_members(zip_ref):
+            with _open_member(zip_ref, name) as stream:
+                yield name, stream
+
+
+def read_zip_members(file_path: Any, filename: str,
+                     reader: Optional[Callable[[Any, str], Any]] = None,
+                     max_workers: Optional[int] = None,
+                     columns: Optional[List[str]] = None) -> List[Any]:
+    """
+    Parse every data member of a ZIP archive directly from the archive.
+    
+    Members are decompressed and parsed in a thread pool (zlib and the CSV
+    parser release the GIL), sharing one open archive.
+    
+    Args:
+        file_path: Path to the archive (or a file-like object)
+        filename: Original filename of the archive
+        reader: Callable taking (stream, member_name); defaults to read_file
+        max_workers: Thread pool size (default: one per CPU, capped at the
+            number of members; 1 reads members in turn)
+        columns: Columns the default reader reads from each member
+        
+    Returns:
+        Reader results in archive order. With the default reader these are
+        (DataFrame, metadata_dict) tuples whose metadata also records the
+        'archive', 'zip_member' and 'read_seconds'.
+    """
+    with _open_zip(file_path) as zip_ref:
+        members = zip_data_members(zip_ref)
+        
+        def _read_member(name: str) -> Any:
+            start = time.perf_counter()
+            with _open_member(zip_ref, name) as stream:
+                if reader is not None:
+                    return reader(stream, name)
+                df, metadata = read_file(stream, name, columns=columns)
+            metadata.update({
+                'archive': filename,
+                'zip_member': name,
+                'read_seconds': round(time.perf_counter() - start, 6)
+            })
             return df, metadata
+        
+        workers = min(max_workers or os.cpu_count() or 1, len(members))
+        if workers <= 1:
+            return [_read_member(name) for name in members]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(_read_member, members))
+
+
+def read_upload(file_obj: Any, filename: str,
+                excel_sheets: Union[str, List[str]] = 'first',
+                excel_workers: Optional[int] = None,
+                zip_workers: Optional[int] = None,
+                compact_dtypes: bool = False,
+                columns: Optional[List[str]] = None) -> List[Tuple[pd.DataFrame, Dict[str, Any], str]]:
+    """
+    Read one uploaded file into (DataFrame, metadata, source) entries.
+    
+    ZIP archives give one entry per data member, named after the member.
+    Workbooks read in multi-sheet mode give one entry per sheet, named
+    '<filename>::<sheet>'. Every entry's metadata records 'parse_seconds'.
+    With compact_dtypes, each frame is converted to the dtypes chosen by
+    plan_dtypes and the memory saved is recorded in its metadata.
+    With columns, only those columns are parsed from each source and
+    'columns_projected' is set in its metadata.
+    
+    Args:
+        file_obj: Path to the file (or a file-like object)
+        filename: Original filename
+        excel_sheets: 'first', 'all', or a list of sheet names to read
+        excel_workers: Process pool size for multi-sheet workbooks
+        zip_workers: Thread pool size for ZIP members
+        compact_dtypes: Whether to convert frames to compact dtypes
+        columns: Columns to read from every source; names a source doesn't
+            have are ignored. None reads every column
+        
+    Returns:
+        List of (DataFrame, metadata_dict, source_name) tuples
+    """
+    if filename.lower().endswith('.zip'):
+        def _read_member(stream: Any, name: str) -> List[Tuple[pd.DataFrame, Dict[str, Any], str]]:
+            return read_upload(stream, name, excel_sheets=excel_sheets,
+                               excel_workers=excel_workers, compact_dtypes=compact_dtypes,
+                               columns=columns)
+        
+        members = read_zip_members(file_obj, filename, reader=_read_member, max_workers=zip_workers)
+        entries = [entry for member_entries in members for entry in member_entries]
+        for _, metadata, _ in entries:
+            metadata['archive'] = filename
+        return entries
+    
+    if filename.lower().endswith(EXCEL_EXTENSIONS) and excel_sheets != 'first':
+        sheet_names = None if excel_sheets == 'all' else list(excel_sheets)
+        sheets = read_excel_sheets(file_obj, filename, sheet_names=sheet_names,
+                                   max_workers=excel_workers, columns=columns)
+        for _, metadata in sheets:
+            metadata['parse_seconds'] = metadata['sheet_parse_seconds']
+        entries = [
+            (df, metadata, f"{filename}::{metadata['sheet_used']}")
+            for df, metadata in sheets
+        ]
+    else:
+        start = time.perf_counter()
+        df, metadata = read_file(file_obj, filename, columns=columns)
+        metadata['parse_seconds'] = round(time.perf_counter() - start, 6)
+        entries = [(df, metadata, filename)]
+    
+    for _, metadata, _ in entries:
+        metadata['columns_projected'] = columns is not None
+    
+    if compact_dtypes:
+        for i, (df, metadata, source) in enumerate(entries):
+            df, dtype_report = compact_dataframe(df)
+            metadata.update(dtype_report)
+            entries[i] = (df, metadata, source)
+    return entries
+
+
+def read_upload_sample(file_obj: Any, filename: str, nrows: int = DEFAULT_SAMPLE_ROWS,
+                       excel_sheets: Union[str, List[str]] = 'first') -> List[Tuple[pd.DataFrame, Dict[str, Any], str]]:
+    """
+    Parse only the header and first `nrows` rows of an upload.
+    
+    Entries and source names match read_upload, so shape detection and
+    column harmonization can run on the sample while the full parse is still
+    in progress. A file-like object is left at the position it was read from.
+    
+    Args:
+        file_obj: Path to the file (or a file-like object)
+        filename: Original filename
+        nrows: Number of data rows to parse
+        excel_sheets: 'first', 'all', or a list of sheet names to read
+        
+    Returns:
+        List of (sample DataFrame, metadata_dict, source_name) tuples
+    """
+    start = time.perf_counter()
+    inner_filename, compression = split_compression(filename)
+    file_extension = Path(inner_filename).suffix.lower()
+    position = file_obj.tell() if hasattr(file_obj, 'tell') else None
+    try:
+        if compression and file_extension != '.csv':
+            raise ValueError(f"Unsupported file format: {Path(filename).suffix.lower()}")
+        elif file_extension == '.zip':
+            def _sample_member(stream: Any, name: str) -> List[Tuple[pd.DataFrame, Dict[str, Any], str]]:
+                return read_upload_sample(stream, name, nrows=nrows, excel_sheets=excel_sheets)
             
+            members = read_zip_members(file_obj, filename, reader=_sample_member, max_workers=1)
+            entries = [entry for member_entries in members for entry in member_entries]
+            for _, metadata, _ in entries:
+                metadata['archive'] = filename
+            return entries
+        elif file_extension == '.csv':
+            entries = [_read_csv_sample(file_obj, filename, nrows, compression=compression)]
+        elif file_extension in EXCEL_EXTENSIONS:
+            entries = _read_excel_sample(file_obj, filename, nrows, excel_sheets)
+        elif file_extension in COLUMNAR_EXTENSIONS:
+            chunks = read_columnar_chunks(file_obj, filename, nrows)
+            df, metadata = next(chunks, (pd.DataFrame(), {'filename': filename}))
+            chunks.close()
+            entries = [(df, metadata, filename)]
+        else:
+            raise ValueError(f"Unsupported file format: {file_extension}")
+    finally:
+        if position is not None:
+            file_obj.seek(position)
+    
+    for df, metadata, _ in entries:
+        metadata.update({
+            'rows': len(df),
+            'columns': len(df.columns),
+            'column_names': list(df.columns),
+            'sample': True,
+            'sample_seconds': round(time.perf_counter() - start, 6)
+        })
+    return entries
+
+
+def _read_csv_sample(file_path: Any, filename: str, nrows: int,
+                     compression: Optional[str] = None) -> Tuple[pd.DataFrame, Dict[str, Any], str]:
+    """
+    Parse the header and first `nrows` rows of a CSV file.
+    """
+    try:
+        with _open_csv_stream(file_path, compression) as (stream, detection_seconds):
+            df = pd.read_csv(stream, nrows=nrows)
+            metadata = {'filename': filename, 'file_type': 'csv', 'compression': compression}
+            metadata.update(encoding_metadata(stream, detection_seconds))
+    except (UnicodeDecodeError, pd.errors.ParserError) as e:
+        raise ValueError(f"Error reading CSV file {filename}: {str(e)}")
+    return df, metadata, filename
+
+
+def _read_excel_sample(file_path: Any, filename: str, nrows: int,
+                       excel_sheets: Union[str, List[str]]) -> List[Tuple[pd.DataFrame, Dict[str, Any], str]]:
+    """
+    Parse the header and first `nrows` rows of the sheets read_upload would read.
+    """
+    try:
+        with pd.ExcelFile(_as_excel_source(file_path)) as excel_file:
+            sheet_names = excel_file.sheet_names
+            if excel_sheets == 'first':
+                wanted = sheet_names[:1]
+            elif excel_sheets == 'all':
+                wanted = sheet_names
+            else:
+                wanted = [sheet for sheet in excel_sheets if sheet in sheet_names]
+            samples = {sheet: excel_file.parse(sheet, nrows=nrows) for sheet in wanted}
     except Exception as e:
-        raise ValueError(f"Error reading ZIP file {filename}: {str(e)}")
+        raise ValueError(f"Error reading Excel file {filename}: {str(e)}")
+    
+    return [
+        (
+            df,
+            {'filename': filename, 'file_type': 'excel', 'sheets': sheet_names, 'sheet_used': sheet},
+            filename if excel_sheets == 'first' else f"{filename}::{sheet}"
+        )
+        for sheet, df in samples.items()
+    ]
 
 
 def extract_sample_for_ai(df: pd.DataFrame, sample_size: int = 5) -> pd.DataFrame:
@@ -1,18 +1,36 @@
 import pandas as pd
+import numpy as np
 import csv
 import chardet
-from typing import Tuple
+import io
+from itertools import islice
+from typing import Tuple, List
 from io import BytesIO, StringIO
 
 
-def detect_encoding(sample: bytes) -> str:
+def detect_encoding(sample: bytes, default: str = "utf-8", min_confidence: float = 0.0) -> str:
     result = chardet.detect(sample)
-    return result.get("encoding", "utf-8")
+    if not result.get("encoding") or (result.get("confidence") or 0.0) < min_confidence:
+        return default
+    return result["encoding"]
 
 
-def safe_read_csv(path_or_buf, **kwargs) -> Tuple[pd.DataFrame, dict]:
+# Parsers tried in order by safe_read_csv, fastest first
+PARSER_TIERS = ("pyarrow", "c", "python")
+
+# Rows parsed and repaired per batch by the manual fallback
+REPAIR_BATCH_ROWS = 50_000
+
+_THOUSANDS_NUMBER = r"^-?\d{1,3}(?:,\d{3})+(?:\.\d+)?$|^-?\d+(?:\.\d+)?$"
+
+
+def safe_read_csv(path_or_buf, tiers=PARSER_TIERS, **kwargs) -> Tuple[pd.DataFrame, dict]:
     """Read a CSV file with auto-detection of delimiter, encoding, quoting.
-    Returns (DataFrame, diagnostics_dict)
+    Parsers are tried fastest first (multithreaded pyarrow, then the C engine,
+    then the python engine); the manual ragged-row repair only runs when all
+    of them fail or the sample has ragged rows.
+    Returns (DataFrame, diagnostics_dict); diagnostics["parser_tier"] names
+    the tier that produced the frame.
     """
     diagnostics = {}
     # Read first 32k to guess delimiter & encoding
@@ -39,57 +57,209 @@ def safe_read_csv(path_or_buf, **kwargs) -> Tuple[pd.DataFrame, dict]:
         delimiter = ","
     diagnostics["delimiter"] = delimiter
 
-    # quick ragged-row detection: if any line in sample has more delimiters than header -> use manual
-    header_delims = sample_str.splitlines()[0].count(delimiter)
-    if any(line.count(delimiter) > header_delims for line in sample_str.splitlines()[1:]):
-        raise ValueError("ragged rows detected; use manual parser")
+    # quick ragged-row detection: if any row in sample has more fields than header -> use manual
+    if _sample_is_ragged(sample_str, delimiter, truncated=len(sample_bytes) == 32768):
+        diagnostics["ragged_rows"] = True
+        tiers = ()
 
-    # Read with pandas
-    try:
-        df = pd.read_csv(
-            path_or_buf,
-            encoding=encoding,
-            sep=delimiter,
-            engine="python",
-            thousands="," ,
-            **kwargs,
-        )
-        return df, diagnostics
-    except Exception as e:
-        # fallback: manual CSV parsing with row-repair for ragged lines
-        diagnostics["fallback"] = str(e)
+    # Read with pandas, fastest parser first
+    for tier in tiers:
+        try:
+            df = _read_with_tier(tier, path_or_buf, encoding, delimiter, **kwargs)
+            diagnostics["parser_tier"] = tier
+            return df, diagnostics
+        except Exception as e:
+            diagnostics.setdefault("tier_errors", {})[tier] = str(e)
+            diagnostics["fallback"] = str(e)
+            if not isinstance(path_or_buf, (str, bytes)):
+                path_or_buf.seek(0)
+
+    # fallback: manual CSV parsing with row-repair for ragged lines
+    diagnostics["parser_tier"] = "manual"
+    return _manual_read(path_or_buf, encoding, delimiter, diagnostics)
+
+
+def _read_with_tier(tier: str, path_or_buf, encoding: str, delimiter: str, **kwargs) -> pd.DataFrame:
+    """Parse with one pandas engine. The pyarrow engine has no `thousands`
+    option, so thousands-separated columns are converted after the parse,
+    and it infers dates and times, which are read again as text."""
+    if tier == "pyarrow":
+        df = pd.read_csv(path_or_buf, encoding=encoding, sep=delimiter, engine="pyarrow", **kwargs)
+        df = _restore_temporal_text(df, path_or_buf, encoding, delimiter)
+        return _apply_thousands(df)
+    return pd.read_csv(
+        path_or_buf,
+        encoding=encoding,
+        sep=delimiter,
+        engine=tier,
+        thousands=",",
+        **kwargs,
+    )
+
+
+def _restore_temporal_text(df: pd.DataFrame, path_or_buf, encoding: str, delimiter: str) -> pd.DataFrame:
+    """Replace the date, time and timestamp columns pyarrow inferred with
+    their text as written, which is what the other engines return. Only those
+    columns are parsed again, and the nulls of the first parse are kept."""
+    temporal = [col for col in df.columns if _is_temporal(df[col])]
+    if not temporal:
+        return df
+
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    if not isinstance(path_or_buf, (str, bytes)):
         path_or_buf.seek(0)
-        text = path_or_buf.read() if isinstance(path_or_buf, BytesIO) else path_or_buf.read()
-        if isinstance(text, bytes):
-            text = text.decode(encoding, errors="ignore")
+    table = pa_csv.read_csv(
+        path_or_buf,
+        read_options=pa_csv.ReadOptions(encoding=encoding),
+        parse_options=pa_csv.ParseOptions(delimiter=delimiter),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=temporal,
+            column_types={col: pa.string() for col in temporal},
+            null_values=[],
+            strings_can_be_null=False,
+        ),
+    )
+    text = table.to_pandas()
+    for col in temporal:
+        df[col] = text[col].where(df[col].notna())
+    return df
+
+
+def _is_temporal(series: pd.Series) -> bool:
+    if pd.api.types.is_datetime64_any_dtype(series) or pd.api.types.is_timedelta64_dtype(series):
+        return True
+    if not pd.api.types.is_object_dtype(series):
+        return False
+    return pd.api.types.infer_dtype(series, skipna=True) in ("date", "time", "datetime")
+
 
-        reader = csv.reader(StringIO(text), delimiter=delimiter)
-        rows = list(reader)
-        if not rows:
+def _apply_thousands(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert text columns whose values are all numbers such as "1,000"
+    to numeric, matching what thousands="," does for the other engines."""
+    for col in df.columns:
+        series = df[col]
+        if not (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)):
+            continue
+        values = series.dropna()
+        if values.empty or pd.api.types.infer_dtype(values, skipna=True) != "string":
+            continue
+        if values.str.contains(",", regex=False).any() and values.str.match(_THOUSANDS_NUMBER).all():
+            df[col] = pd.to_numeric(series.str.replace(",", "", regex=False))
+    return df
+
+
+def _sample_is_ragged(sample_str: str, delimiter: str, truncated: bool) -> bool:
+    """Check in one quote-aware pass whether any sample row has more fields
+    than the header. A truncated sample's last row is ignored."""
+    counts = np.fromiter(
+        (len(row) for row in csv.reader(StringIO(sample_str), delimiter=delimiter)), dtype=np.int64
+    )
+    if truncated:
+        counts = counts[:-1]
+    return len(counts) > 1 and bool((counts[1:] > counts[0]).any())
+
+
+def _manual_read(path_or_buf, encoding: str, delimiter: str, diagnostics: dict,
+                 batch_rows: int = REPAIR_BATCH_ROWS) -> Tuple[pd.DataFrame, dict]:
+    """Parse rows with the csv module, merging thousands-separator splits and
+    padding or truncating ragged rows to the header length.
+    The file is decoded and repaired as a stream, one batch of rows at a time;
+    diagnostics["repair"] counts the rows merged, padded and truncated."""
+    if isinstance(path_or_buf, (str, bytes)):
+        raw = open(path_or_buf, "rb")
+    else:
+        path_or_buf.seek(0)
+        raw = path_or_buf
+
+    if isinstance(raw, io.TextIOBase):
+        text = raw
+    else:
+        text = io.TextIOWrapper(raw, encoding=encoding, errors="ignore", newline="")
+
+    stats = {"rows": 0, "merged_rows": 0, "merged_cells": 0, "padded_rows": 0, "truncated_rows": 0}
+    diagnostics["repair"] = stats
+    try:
+        reader = csv.reader(text, delimiter=delimiter)
+        header = next(reader, None)
+        if header is None:
             return pd.DataFrame(), diagnostics
 
-        header = rows[0]
-        header_len = len(header)
-
-        def _repair_row(row: list[str]) -> list[str]:
-            # Merge consecutive digit cells if concatenation forms a >=1000 number
-            while len(row) > header_len:
-                merged_any = False
-                for i in range(len(row) - 1):
-                    if row[i].isdigit() and row[i + 1].isdigit():
-                        merged = row[i] + row[i + 1]
-                        if int(merged) >= 1000:
-                            row[i:i + 2] = [merged]
-                            merged_any = True
-                            break
-                if not merged_any:
-                    # Cannot repair further; truncate extra cells
-                    row = row[:header_len]
-            # pad missing cells
-            if len(row) < header_len:
-                row += [""] * (header_len - len(row))
-            return row
-
-        fixed_rows = [_repair_row(r) for r in rows[1:]]
-        df = pd.DataFrame(fixed_rows, columns=header)
-        return df, diagnostics 
\ No newline at end of file
+        frames = []
+        while True:
+            batch = list(islice(reader, batch_rows))
+            if not batch:
+                break
+            frames.append(pd.DataFrame(_repair_batch(batch, len(header), stats), columns=header))
+    finally:
+        if text is not raw:
+            text.detach()
+        if raw is not path_or_buf:
+            raw.close()
+
+    if not frames:
+        return pd.DataFrame(columns=header), diagnostics
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    return df.infer_objects(), diagnostics
+
+
+def _repair_batch(batch: List[List[str]], header_len: int, stats: dict) -> np.ndarray:
+    """Fit a batch of parsed rows to the header length.
+    Rows of the right length are copied as one block, short rows are padded
+    as one block per length, and only over-long rows are repaired one by one."""
+    lengths = np.fromiter(map(len, batch), dtype=np.int64, count=len(batch))
+    out = np.full((len(batch), header_len), "", dtype=object)
+
+    exact = np.flatnonzero(lengths == header_len)
+    if len(exact):
+        out[exact] = _as_block([batch[i] for i in exact], header_len)
+
+    short = lengths < header_len
+    for length in np.unique(lengths[short]):
+        idx = np.flatnonzero(lengths == length)
+        if length:
+            out[idx, :length] = _as_block([batch[i] for i in idx], length)
+    stats["padded_rows"] += int(short.sum())
+
+    for i in np.flatnonzero(lengths > header_len):
+        row, merges = _merge_thousands_splits(batch[i], header_len)
+        if merges:
+            stats["merged_rows"] += 1
+            stats["merged_cells"] += merges
+        if len(row) > header_len:
+            stats["truncated_rows"] += 1
+            row = row[:header_len]
+        out[i] = row
+
+    stats["rows"] += len(batch)
+    return out
+
+
+def _as_block(rows: List[List[str]], width: int) -> np.ndarray:
+    """Stack equal-length rows into a 2-D object array."""
+    block = np.empty((len(rows), width), dtype=object)
+    block[:] = rows
+    return block
+
+
+def _merge_thousands_splits(row: List[str], header_len: int) -> Tuple[List[str], int]:
+    """Merge consecutive digit cells whose concatenation forms a >=1000 number,
+    leftmost pair first, until the row fits the header. One pass over the row:
+    earlier pairs have already been checked, so only the pair ending at the
+    newest cell can become mergeable. Returns (row, number of merges)."""
+    excess = len(row) - header_len
+    merged: List[str] = []
+    merges = 0
+    for cell in row:
+        merged.append(cell)
+        while (merges < excess and len(merged) >= 2
+               and _is_digits(merged[-2]) and _is_digits(merged[-1])
+               and len((merged[-2] + merged[-1]).lstrip("0")) >= 4):
+            merged[-2:] = [merged[-2] + merged[-1]]
+            merges += 1
+    return merged, merges
+
+
+def _is_digits(cell: str) -> bool:
+    return cell.isascii() and cell.isdigit()
@@ -0,0 +1,311 @@
+"""
+Upload Sessions Module
+Resumable chunked uploads. A client opens a session, sends numbered chunks
+that are appended to the session's spool file after their SHA-256 is
+checked, and then references the session id when starting a run. Sessions
+that stop receiving chunks are garbage-collected.
+
+Each session is locked on its own with a lock file in its directory, so
+uploads to different sessions never wait on each other and several worker
+processes can share one store.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+
+UPLOAD_SESSION_DIR = Path(tempfile.gettempdir()) / "wrangler-upload-sessions"
+
+# Sessions untouched for this long are removed by collect_garbage
+SESSION_TTL_SECONDS = 24 * 60 * 60
+
+# Seconds between the garbage collections run by the store's own operations
+GC_INTERVAL_SECONDS = 10 * 60
+
+# Largest single chunk accepted
+MAX_CHUNK_BYTES = 64 * 1024 * 1024
+
+# Largest total upload accepted per session
+MAX_SESSION_BYTES = 2 * 1024 * 1024 * 1024
+
+# Block size used when copying a chunk into the spool file
+COPY_BLOCK_BYTES = 1024 * 1024
+
+
+class UploadSessionError(ValueError):
+    """Base class for upload session errors; `status` is the HTTP status to report."""
+    status = 400
+
+
+class SessionNotFound(UploadSessionError):
+    status = 404
+
+
+class ChunkOutOfOrder(UploadSessionError):
+    status = 409
+
+
+class ChunkHashMismatch(UploadSessionError):
+    status = 400
+
+
+class SessionTooLarge(UploadSessionError):
+    status = 413
+
+
+class SessionBusy(UploadSessionError):
+    """Raised when another request is writing to the same session."""
+    status = 409
+
+
+class UploadSessionStore:
+    """
+    On-disk store of upload sessions, one directory per session holding a
+    'data.part' spool file, a 'session.json' manifest and a 'lock' file.
+
+    Abandoned sessions are collected at most every `gc_interval_seconds`
+    by the store's own operations, and whenever collect_garbage is called.
+    """
+
+    def __init__(self, root: Any = UPLOAD_SESSION_DIR,
+                 ttl_seconds: float = SESSION_TTL_SECONDS,
+                 max_chunk_bytes: int = MAX_CHUNK_BYTES,
+                 max_session_bytes: int = MAX_SESSION_BYTES,
+                 gc_interval_seconds: float = GC_INTERVAL_SECONDS):
+        self.root = Path(root)
+        self.ttl_seconds = ttl_seconds
+        self.max_chunk_bytes = max_chunk_bytes
+        self.max_session_bytes = max_session_bytes
+        self.gc_interval_seconds = gc_interval_seconds
+        self._last_collected = 0.0
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def open_session(self, filename: str, total_bytes: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Start a session for one file.
+
+        Args:
+            filename: Name of the file being uploaded
+            total_bytes: Expected size, checked when the session is used
+
+        Returns:
+            The session manifest
+        """
+        self._collect_garbage_if_due()
+        if total_bytes is not None and total_bytes > self.max_session_bytes:
+            raise SessionTooLarge(f"Uploads are limited to {self.max_session_bytes} bytes")
+
+        session_id = uuid.uuid4().hex
+        now = time.time()
+        manifest = {
+            'session_id': session_id,
+            'filename': filename,
+            'total_bytes': total_bytes,
+            'received_bytes': 0,
+            'next_index': 0,
+            'chunks': [],
+            'created': now,
+            'updated': now
+        }
+        self._session_dir(session_id).mkdir()
+        self._data_path(session_id).touch()
+        self._write_manifest(manifest)
+        return manifest
+
+    def append_chunk(self, session_id: str, index: int, stream: Any, sha256: str) -> Dict[str, Any]:
+        """
+        Append chunk `index`, read from `stream`, to a session's spool file.
+
+        Chunks must arrive in order. Re-sending a chunk that was already
+        stored is accepted without writing it again, so a client can retry
+        after a lost response. Only this session is locked while the chunk
+        is written; a second request for it meanwhile gets SessionBusy.
+
+        Args:
+            session_id: Session to append to
+            index: Chunk number, starting at 0
+            stream: Binary stream holding the chunk bytes
+            sha256: Hex SHA-256 of the chunk, as computed by the client
+
+        Returns:
+            The updated session manifest
+        """
+        sha256 = (sha256 or '').lower()
+        self._collect_garbage_if_due()
+        with self._session_lock(session_id):
+            manifest = self.get_session(session_id)
+            if index < manifest['next_index']:
+                stored = manifest['chunks'][index]['sha256']
+                if stored != sha256:
+                    raise ChunkHashMismatch(f"Chunk {index} was already stored with a different hash")
+                return manifest
+            if index > manifest['next_index']:
+                raise ChunkOutOfOrder(f"Expected chunk {manifest['next_index']}, got {index}")
+
+            digest = hashlib.sha256()
+            size = 0
+            data_path = self._data_path(session_id)
+            # 'r+b' rather than 'ab': bytes past received_bytes are left over
+            # from an append that died before its manifest was written, and
+            # the chunk has to overwrite them rather than follow them
+            with open(os.open(data_path, os.O_RDWR | os.O_CREAT, 0o600), 'r+b') as out:
+                out.seek(manifest['received_bytes'])
+                out.truncate()
+                try:
+                    while True:
+                        block = stream.read(COPY_BLOCK_BYTES)
+                        if not block:
+                            break
+                        size += len(block)
+                        if size > self.max_chunk_bytes:
+                            raise SessionTooLarge(f"Chunks are limited to {self.max_chunk_bytes} bytes")
+                        if manifest['received_bytes'] + size > self.max_session_bytes:
+                            raise SessionTooLarge(f"Uploads are limited to {self.max_session_bytes} bytes")
+                        digest.update(block)
+                        out.write(block)
+                    if digest.hexdigest() != sha256:
+                        raise ChunkHashMismatch(f"Chunk {index} failed its SHA-256 check")
+                except Exception:
+                    # Drop the partial chunk so the client can resend it
+                    out.truncate(manifest['received_bytes'])
+                    raise
+
+            manifest['chunks'].append({'offset': manifest['received_bytes'], 'size': size, 'sha256': sha256})
+            manifest['received_bytes'] += size
+            manifest['next_index'] += 1
+            manifest['updated'] = time.time()
+            self._write_manifest(manifest)
+            return manifest
+
+    def get_session(self, session_id: str) -> Dict[str, Any]:
+        """
+        Load a session manifest, raising SessionNotFound for unknown ids.
+        """
+        try:
+            uuid.UUID(hex=session_id)
+            with open(self._manifest_path(session_id)) as fh:
+                return json.load(fh)
+        except (ValueError, OSError):
+            raise SessionNotFound(f"Unknown upload session: {session_id}")
+
+    def completed_file(self, session_id: str) -> Dict[str, Any]:
+        """
+        Return {'path', 'filename'} for a finished session, checking that
+        all expected bytes were received.
+        """
+        self._collect_garbage_if_due()
+        manifest = self.get_session(session_id)
+        if manifest['total_bytes'] is not None and manifest['received_bytes'] != manifest['total_bytes']:
+            raise UploadSessionError(
+                f"Upload session {session_id} is incomplete: "
+                f"{manifest['received_bytes']} of {manifest['total_bytes']} bytes received"
+            )
+        return {'path': str(self._data_path(session_id)), 'filename': manifest['filename']}
+
+    def delete_session(self, session_id: str) -> None:
+        with self._session_lock(session_id):
+            shutil.rmtree(self._session_dir(session_id), ignore_errors=True)
+
+    def collect_garbage(self, now: Optional[float] = None) -> List[str]:
+        """
+        Remove sessions not updated within ttl_seconds. Sessions being
+        written to are left alone.
+
+        Returns:
+            Ids of the sessions removed
+        """
+        now = time.time() if now is None else now
+        self._last_collected = time.time()
+        removed = []
+        for session_dir in self.root.iterdir():
+            if not session_dir.is_dir():
+                continue
+            manifest_path = session_dir / "session.json"
+            try:
+                updated = json.loads(manifest_path.read_text())['updated']
+            except (OSError, ValueError, KeyError):
+                # Half-created session; judge it by the directory's age
+                try:
+                    updated = session_dir.stat().st_mtime
+                except OSError:
+                    continue
+            if now - updated > self.ttl_seconds:
+                try:
+                    with self._session_lock(session_dir.name, check_exists=False):
+                        shutil.rmtree(session_dir, ignore_errors=True)
+                except SessionBusy:
+                    continue
+                removed.append(session_dir.name)
+        return removed
+
+    def _collect_garbage_if_due(self) -> None:
+        if time.time() - self._last_collected >= self.gc_interval_seconds:
+            self.collect_garbage()
+
+    @contextmanager
+    def _session_lock(self, session_id: str, check_exists: bool = True) -> Iterator[None]:
+        """
+        Hold a session's lock file, raising SessionBusy if another thread or
+        process holds it. Uses flock where available, else an O_EXCL file.
+        """
+        if check_exists:
+            self.get_session(session_id)
+        lock_path = self._session_dir(session_id) / "lock"
+        if fcntl is not None:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_WRONLY)
+            except FileNotFoundError:
+                raise SessionNotFound(f"Unknown upload session: {session_id}")
+            try:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    raise SessionBusy(f"Upload session {session_id} is busy with another request")
+                yield
+            finally:
+                os.close(fd)
+            return
+
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            raise SessionBusy(f"Upload session {session_id} is busy with another request")
+        except FileNotFoundError:
+            raise SessionNotFound(f"Unknown upload session: {session_id}")
+        os.close(fd)
+        try:
+            yield
+        finally:
+            try:
+                os.remove(lock_path)
+            except FileNotFoundError:
+                pass
+
+    def _write_manifest(self, manifest: Dict[str, Any]) -> None:
+        path = self._manifest_path(manifest['session_id'])
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as fh:
+            json.dump(manifest, fh)
+        os.replace(tmp_path, path)
+
+    def _session_dir(self, session_id: str) -> Path:
+        return self.root / session_id
+
+    def _manifest_path(self, session_id: str) -> Path:
+        return self._session_dir(session_id) / "session.json"
+
+    def _data_path(self, session_id: str) -> Path:
+        return self._session_dir(session_id) / "data.part"
@@ -0,0 +1,198 @@
+"""
+Upload Spooling Module
+Writes uploaded files, and the data members of uploaded ZIP archives, into a
+per-request scratch directory in bounded blocks. Small files stay in memory;
+anything larger is written to disk and handed on as a path, so readers can
+memory-map it instead of holding the whole upload in a buffer. Used as the
+request's stream factory, the spool receives uploads straight from the form
+parser, so each one is written to disk once.
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+
+
+# Files up to this size are kept in memory instead of being written to disk
+SPOOL_MEMORY_BYTES = 4 * 1024 * 1024
+
+# Total bytes one request may write to its scratch directory
+SPOOL_DISK_BYTES = 2 * 1024 * 1024 * 1024
+
+# Block size used when copying streams
+SPOOL_BLOCK_BYTES = 1024 * 1024
+
+
+class UploadTooLarge(ValueError):
+    """Raised when a request's uploads exceed the spool's disk limit."""
+
+
+class SpooledUpload:
+    """
+    Container the form parser writes one uploaded file into: an in-memory
+    buffer until it grows past the spool's memory_bytes, then a file in the
+    spool's scratch directory. `path` is set once it is on disk.
+    """
+
+    def __init__(self, spool: 'UploadSpool', filename: str):
+        self.spool = spool
+        self.filename = filename
+        self.path: Optional[Path] = None
+        self._file: Any = io.BytesIO()
+
+    def write(self, data: bytes) -> int:
+        if self.path is None and self._file.tell() + len(data) > self.spool.memory_bytes:
+            self._rollover()
+        if self.path is not None:
+            self.spool._reserve_disk(len(data))
+        return self._file.write(data)
+
+    def _rollover(self) -> None:
+        buffered = self._file.getvalue()
+        self.path = self.spool._scratch_path(self.filename)
+        self._file = open(self.path, 'w+b')
+        self.spool._reserve_disk(len(buffered))
+        self._file.write(buffered)
+
+    def release(self) -> Any:
+        """
+        Hand on what was written: the path once on disk, else the buffer.
+        """
+        if self.path is None:
+            self._file.seek(0)
+            return self._file
+        self._file.close()
+        return str(self.path)
+
+    def __getattr__(self, name: str) -> Any:
+        # read, seek, tell, close... go to the buffer or file underneath
+        return getattr(self._file, name)
+
+
+class UploadSpool:
+    """
+    Per-request scratch space for uploads.
+
+    Use as a context manager; the scratch directory and everything in it is
+    removed on exit. `files` and `filenames` are ready to pass to
+    DataHarmonizationPipeline.run: each file is either a path on disk or,
+    for files no larger than `memory_bytes`, an in-memory buffer.
+    """
+
+    def __init__(self, scratch_root: Optional[str] = None,
+                 memory_bytes: int = SPOOL_MEMORY_BYTES,
+                 disk_bytes: int = SPOOL_DISK_BYTES):
+        self.scratch_root = scratch_root
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.directory = None
+        self.files: List[Any] = []
+        self.filenames: List[str] = []
+        self.bytes_in_memory = 0
+        self.bytes_on_disk = 0
+        self._scratch_files = 0
+
+    def __enter__(self) -> 'UploadSpool':
+        if self.scratch_root:
+            os.makedirs(self.scratch_root, exist_ok=True)
+        self.directory = Path(tempfile.mkdtemp(prefix='upload-', dir=self.scratch_root))
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.files = []
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def stream_factory(self, total_content_length: Optional[int], content_type: Optional[str],
+                       filename: Optional[str] = None,
+                       content_length: Optional[int] = None) -> SpooledUpload:
+        """
+        Werkzeug stream factory: the form parser writes each uploaded file
+        into a SpooledUpload of this spool rather than a temporary file of
+        its own. The parser hides errors raised while it writes, so callers
+        run check_limit() once the form has been parsed.
+        """
+        return SpooledUpload(self, filename or '')
+
+    def check_limit(self) -> None:
+        """
+        Raise UploadTooLarge if the request has written more than disk_bytes.
+        """
+        if self.bytes_on_disk > self.disk_bytes:
+            raise UploadTooLarge(
+                f"Uploads exceed the {self.disk_bytes // (1024 * 1024)} MB limit per request"
+            )
+
+    def add(self, stream: Any, filename: str) -> None:
+        """
+        Spool one uploaded file, read from its current position. Files the
+        form parser already wrote into this spool are added without a copy.
+        """
+        if isinstance(stream, SpooledUpload) and stream.spool is self:
+            file_obj = stream.release()
+            if not isinstance(file_obj, str):
+                self.bytes_in_memory += file_obj.getbuffer().nbytes
+        else:
+            file_obj = self._spool(stream, filename)
+        self.files.append(file_obj)
+        self.filenames.append(filename)
+
+    def add_path(self, path: str, filename: str) -> None:
+        """
+        Add a file that is already on disk, such as a finished upload
+        session, without copying it.
+        """
+        self.files.append(path)
+        self.filenames.append(filename)
+
+    def add_zip_members(self, stream: Any, is_allowed: Callable[[str], bool]) -> None:
+        """
+        Spool each allowed member of a ZIP archive, decompressing it block by
+        block. Members keep their archive names as filenames; directories and
+        macOS resource-fork entries are skipped.
+        """
+        with zipfile.ZipFile(stream) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or info.filename.startswith('__MACOSX/') or not is_allowed(info.filename):
+                    continue
+                with archive.open(info) as member:
+                    self.add(member, info.filename)
+
+    def _spool(self, stream: Any, filename: str) -> Any:
+        """
+        Copy a stream into memory, switching to a file in the scratch
+        directory once it grows past memory_bytes.
+        """
+        buffer = io.BytesIO()
+        while buffer.tell() <= self.memory_bytes:
+            block = stream.read(SPOOL_BLOCK_BYTES)
+            if not block:
+                buffer.seek(0)
+                self.bytes_in_memory += buffer.getbuffer().nbytes
+                return buffer
+            buffer.write(block)
+
+        path = self._scratch_path(filename)
+        with open(path, 'wb') as out:
+            block = buffer.getvalue()
+            buffer = None
+            while block:
+                self._reserve_disk(len(block))
+                out.write(block)
+                block = stream.read(SPOOL_BLOCK_BYTES)
+        return str(path)
+
+    def _scratch_path(self, filename: str) -> Path:
+        """
+        Name a new file in the scratch directory; the numbered name avoids
+        trusting upload and archive paths.
+        """
+        self._scratch_files += 1
+        return self.directory / f"{self._scratch_files:04d}{Path(filename).suffix.lower()}"
+
+    def _reserve_disk(self, nbytes: int) -> None:
+        self.bytes_on_disk += nbytes
+        self.check_limit()
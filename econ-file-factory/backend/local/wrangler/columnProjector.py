@@ -0,0 +1,68 @@
+"""
+Column Projector Module
+Maps a set of wanted canonical columns back to the raw columns of each source
+through the harmonization mapping, so ingestion and reshaping can skip the
+columns nobody asked for.
+"""
+
+import pandas as pd
+from typing import Dict, List, Optional, Iterable
+
+from .reShaper import PROJECTABLE_SHAPES, extract_var_period_dynamic, long_id_columns, panel_id_columns
+
+
+def resolve_raw_columns(sample_df: pd.DataFrame, shape_type: str,
+                        mapping: Dict[str, str], wanted: Iterable[str]) -> Optional[List[str]]:
+    """
+    Work out which raw columns of a source are needed for the wanted columns.
+
+    Identifier columns are always kept. For wide files these are the headers
+    without a period; for long files they are the columns up to and including
+    the period column, found by name.
+
+    Args:
+        sample_df: Sample of the raw source, with its full header
+        shape_type: Shape detected for the source
+        mapping: Harmonization mapping of reshaped column -> canonical name
+        wanted: Canonical column names to keep
+
+    Returns:
+        Raw column names in file order, or None if the source has to be read
+        in full because its shape can't be projected or its identifiers
+        can't be told from its header
+    """
+    shape_type = (shape_type or '').lower()
+    if shape_type not in PROJECTABLE_SHAPES or sample_df.empty:
+        return None
+
+    wanted = set(wanted)
+
+    def _is_wanted(name: str) -> bool:
+        return name in wanted or mapping.get(name, name) in wanted
+
+    if shape_type == 'wide':
+        keep = []
+        for col in sample_df.columns:
+            variable, period = extract_var_period_dynamic(str(col))
+            if period is None or _is_wanted(variable):
+                keep.append(col)
+        return keep
+
+    id_columns = long_id_columns(sample_df.columns)
+    if id_columns is None:
+        return None
+    return [col for col in sample_df.columns if str(col) in id_columns or _is_wanted(col)]
+
+
+def select_wanted_columns(df: pd.DataFrame, wanted: Iterable[str]) -> pd.DataFrame:
+    """
+    Drop the columns of a harmonized panel that are neither wanted nor
+    identifiers. Used for sources that couldn't be projected at read time.
+    The identifiers are the ones the reshaper recorded; a panel without them
+    is kept whole.
+    """
+    id_columns = panel_id_columns(df)
+    if df.empty or id_columns is None:
+        return df
+    wanted = set(wanted) | set(id_columns)
+    return df[[col for col in df.columns if col in wanted]]
@@ -4,17 +4,20 @@ Handles removal of true duplicates based on unique identifier variables.
 """
 
 import pandas as pd
-from typing import List, Tuple, Dict, Any, cast
+from typing import List, Optional, Tuple, Dict, Any, cast
 from .reShaper import extract_var_period_dynamic
 
 
-def remove_duplicates(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+def remove_duplicates(df: pd.DataFrame,
+                      id_columns: Optional[List[str]] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
     Remove true duplicates by unique identifier variables and time keys.
     Keep the first occurrence; move extras to a "Duplicate Records" block.
     
     Args:
         df: DataFrame to deduplicate
+        id_columns: Identifier columns (period included) known from reshaping;
+            found from the first row's values when not given
         
     Returns:
         Tuple of (clean_dataframe, duplicate_records_dataframe)
@@ -23,7 +26,10 @@ def remove_duplicates(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
         return df, pd.DataFrame()
     
     # Identify unique identifier variables and time columns
-    id_columns, time_columns = _identify_id_columns(df)
+    if id_columns is not None:
+        id_columns, time_columns = [col for col in id_columns if col in df.columns], []
+    else:
+        id_columns, time_columns = _identify_id_columns(df)
     
     if not id_columns:
         # No ID columns found, return original data
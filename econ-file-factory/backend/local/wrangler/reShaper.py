@@ -5,29 +5,51 @@ Handles reshaping data into tidy long format based on detected shape type.
 
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List, Tuple, Optional
+from functools import lru_cache
+from typing import Dict, Any, Iterable, List, NamedTuple, Tuple, Optional
 import re
 import logging
 
 logging.basicConfig(level=logging.INFO)
 
-def reshape_to_panel_format(df: pd.DataFrame, shape_type: str, filename: str) -> pd.DataFrame:
+# Shapes whose reshaping only looks at one row at a time, so a file can be
+# reshaped chunk by chunk and the results combined (combine_reshaped_chunks).
+# In the same shapes each raw header names a reshaped variable, so unwanted
+# variables can be dropped as raw columns before reshaping.
+CHUNK_SAFE_SHAPES = frozenset({'wide', 'stacked_multi_time_long'})
+PROJECTABLE_SHAPES = CHUNK_SAFE_SHAPES
+
+# Names of long-format columns that hold the period
+PERIOD_COLUMN_NAMES = ('period', 'year', 'date', 'time', 'quarter', 'month', 'fiscal_year')
+
+# DataFrame.attrs key under which a reshaped panel lists its identifier
+# columns (entity, static and period columns), as opposed to its variables
+ID_COLUMNS_ATTR = 'id_columns'
+
+def reshape_to_panel_format(df: pd.DataFrame, shape_type: str, filename: str,
+                            columns: Optional[List[str]] = None,
+                            periods: Optional[Tuple[Optional[int], Optional[int]]] = None) -> pd.DataFrame:
     """
     Main entry: reshape any supported shape type to panel format (one row per entity-period, one column per variable).
+    For shapes in PROJECTABLE_SHAPES, `columns` limits the raw columns that are reshaped.
+    Shapes with periods in their headers skip header columns outside the (start, end) years in `periods`.
     """
     if df.empty:
         return df
     shape_type = (shape_type or '').lower()
+    if columns is not None and shape_type in PROJECTABLE_SHAPES:
+        keep = set(columns)
+        df = df[[col for col in df.columns if col in keep]]
     if shape_type == 'wide':
-        return _reshape_wide_to_panel(df, filename)
+        return _reshape_wide_to_panel(df, filename, periods)
     elif shape_type == 'two_row_header':
-        return _reshape_two_row_header_to_panel(df, filename)
+        return _reshape_two_row_header_to_panel(df, filename, periods)
     elif shape_type == 'key_value':
         return _reshape_key_value_to_panel(df, filename)
     elif shape_type == 'cross_tab':
-        return _reshape_cross_tab_to_panel(df, filename)
+        return _reshape_cross_tab_to_panel(df, filename, periods)
     elif shape_type == 'fully_transposed':
-        return _reshape_fully_transposed_to_panel(df, filename)
+        return _reshape_fully_transposed_to_panel(df, filename, periods)
     elif shape_type == 'stacked_multi_time_long':
         return _reshape_stacked_multi_time_long_to_panel(df, filename)
     elif shape_type == 'pivoted_by_variable':
@@ -36,48 +58,189 @@ def reshape_to_panel_format(df: pd.DataFrame, shape_type: str, filename: str) ->
         logging.warning(f"Unknown or unsupported shape_type '{shape_type}', returning DataFrame as-is.")
         return df
 
+
+def panel_id_columns(df: pd.DataFrame) -> Optional[List[str]]:
+    """
+    The identifier columns the reshaper recorded for a panel, or None if it
+    couldn't tell them from the variables.
+    """
+    id_columns = df.attrs.get(ID_COLUMNS_ATTR)
+    return None if id_columns is None else list(id_columns)
+
+
+def long_id_columns(columns: Iterable[Any]) -> Optional[List[str]]:
+    """
+    Identifier columns of a long file, judged from its header: every column up
+    to and including the first one named like a period column, or None if no
+    column is.
+    """
+    columns = [str(col) for col in columns]
+    for i, col in enumerate(columns):
+        if col.lower() in PERIOD_COLUMN_NAMES:
+            return columns[:i + 1]
+    return None
+
+
+def combine_reshaped_chunks(chunks: List[pd.DataFrame], shape_type: str) -> pd.DataFrame:
+    """
+    Concatenate the panels reshaped from consecutive chunks of one file.
+    Reshaping a wide file keeps the first value of each entity-period key,
+    so keys that recur in a later chunk are merged the same way, as one
+    reshape of the whole file would.
+    """
+    panel = pd.concat(chunks, ignore_index=True, sort=False)
+    id_columns = panel_id_columns(chunks[0])
+    if (shape_type or '').lower() != 'wide' or len(chunks) < 2 or not id_columns:
+        return panel
+    if not panel.duplicated(subset=id_columns).any():
+        return panel
+    merged = panel.groupby(id_columns, sort=True).first().reset_index()
+    return _with_id_columns(merged, id_columns)
+
+
+def _with_id_columns(panel: pd.DataFrame, id_columns: Iterable[Any]) -> pd.DataFrame:
+    panel.attrs[ID_COLUMNS_ATTR] = [col for col in id_columns if col in panel.columns]
+    return panel
+
+# A 4-digit year (including negative), 2-4 digit year, Q+digit, or month name anywhere in a header
+PERIOD_PATTERN = re.compile(
+    r'(?:-?\d{4}Q\d|Q\d-?\d{4}|-?\d{4}|-?\d{2,4}|jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec'
+    r'|january|february|march|april|may|june|july|august|september|october|november|december)',
+    re.IGNORECASE
+)
+_QUARTER = re.compile(r'Q([1-4])', re.IGNORECASE)
+_FOUR_DIGITS = re.compile(r'\d{4}')
+_MONTHS = {name: number for number, name in enumerate(
+    ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'], start=1)}
+
+# Distinct headers and values remembered by parse_period_header
+PERIOD_CACHE_SIZE = 65536
+
+
+class PeriodInfo(NamedTuple):
+    """
+    A header split into its variable and period. `token` is the period text
+    as found (None if there is none); year, quarter and month are parsed from
+    it where present.
+    """
+    variable: str
+    token: Optional[str]
+    year: Optional[int] = None
+    quarter: Optional[int] = None
+    month: Optional[int] = None
+
+
+@lru_cache(maxsize=PERIOD_CACHE_SIZE)
+def parse_period_header(col: str) -> PeriodInfo:
+    """
+    Split a header such as 'revenue_2020', 'gdp_2019Q3' or 'sales_mar' into
+    its variable and period. Results are memoised, as the same headers are
+    parsed for every file, chunk and melted row.
+    """
+    m = PERIOD_PATTERN.search(col)
+    if not m:
+        return PeriodInfo(col, None)
+    token = m.group(0)
+    variable = (col[:m.start()] + col[m.end():]).strip("_- ")
+    year = _FOUR_DIGITS.search(token)
+    quarter = _QUARTER.search(token)
+    return PeriodInfo(
+        variable,
+        token,
+        year=int(year.group(0)) if year else None,
+        quarter=int(quarter.group(1)) if quarter else None,
+        month=_MONTHS.get(token[:3].lower())
+    )
+
+
+def parse_period_headers(columns: Iterable[str]) -> List[PeriodInfo]:
+    """
+    parse_period_header over many headers, parsing each distinct one once.
+    """
+    columns = list(columns)
+    parsed = {col: parse_period_header(col) for col in dict.fromkeys(columns)}
+    return [parsed[col] for col in columns]
+
+
+def period_years(values: pd.Series) -> pd.Series:
+    """
+    Year of each period value (NaN where it has none), parsing each distinct
+    value once.
+    """
+    codes, uniques = pd.factorize(values.astype(str))
+    # Missing values get code -1, which picks the NaN appended last
+    years = np.array([parse_period_header(value).year for value in uniques] + [None], dtype=float)
+    return pd.Series(years.take(codes), index=values.index)
+
+
 def extract_var_period_dynamic(col):
-    logging.info(f"[Reshaper] Extracting variable and period from column name: {col}")
-    # Look for a 4-digit year (including negative), 2-4 digit year, Q+digit, or month name anywhere in the string
-    period_regex = r'(?:-?\d{4}Q\d|Q\d-?\d{4}|-?\d{4}|-?\d{2,4}|jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec|january|february|march|april|may|june|july|august|september|october|november|december)'
-    m = re.search(period_regex, col, re.IGNORECASE)
-    if m:
-        period = m.group(0)
-        prefix = col[:m.start()] + col[m.end():]
-        prefix = prefix.strip("_- ")
-        return prefix, period
-        
-    return col, None
+    """
+    (variable, period token) for a header; the token is None if the header
+    has no period.
+    """
+    info = parse_period_header(col)
+    return info.variable, info.token
 
 
+def period_in_range(period: Any, bounds: Optional[Tuple[Optional[int], Optional[int]]]) -> bool:
+    """
+    Whether a period token such as '2015', '2015Q3' or 'Q1-2020' falls within
+    the bounds. Periods without a recognisable year are kept.
+    """
+    if bounds is None:
+        return True
+    year = parse_period_header(str(period)).year
+    if year is None:
+        return True
+    start, end = bounds
+    return (start is None or year >= start) and (end is None or year <= end)
 
-def _reshape_wide_to_panel(df: pd.DataFrame, filename: str) -> pd.DataFrame:
+
+
+def _reshape_wide_to_panel(df: pd.DataFrame, filename: str,
+                           periods: Optional[Tuple[Optional[int], Optional[int]]] = None) -> pd.DataFrame:
     """
     Fully dynamic wide-to-tidy-panel function:
     - Identifies static columns (those for which extract_var_period_dynamic returns period=None)
+    - Drops period columns outside `periods`, before anything is melted
     - Melts all other columns
-    - Extracts variable and period from each column name
+    - Extracts variable and period from each column name, once per column
     - Pivots to tidy panel format (one row per entity-period, one column per variable)
     """
     logging.info(f"[Reshaper] Processing wide format from: {filename}")
     if df.empty:
         return df
-    static_cols = [col for col in df.columns if extract_var_period_dynamic(col)[1] is None]
-    value_cols = [col for col in df.columns if col not in static_cols]
+    headers = dict(zip(df.columns, parse_period_headers(df.columns)))
+    static_cols = [col for col, info in headers.items() if info.token is None]
+    value_cols = [col for col, info in headers.items() if info.token is not None
+                  and period_in_range(info.token, periods)]
     long_df = df.melt(id_vars=static_cols, value_vars=value_cols, var_name='orig_col', value_name='value')
-    long_df[['variable', 'period']] = long_df['orig_col'].apply(lambda x: pd.Series(extract_var_period_dynamic(x)))
+    long_df['variable'], long_df['period'] = _split_melted_headers(long_df['orig_col'])
     index_cols = [col for col in static_cols if col != 'period'] + ['period']
     panel = long_df.pivot_table(index=index_cols, columns='variable', values='value', aggfunc='first').reset_index()
     panel.columns.name = None
-    return panel
+    return _with_id_columns(panel, index_cols)
 
-def _reshape_two_row_header_to_panel(df: pd.DataFrame, filename: str) -> pd.DataFrame:
+def _split_melted_headers(headers: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Variable and period for every row of a melted header column. Each
+    distinct header is parsed once and the results are spread over the rows
+    through the header's categorical code.
+    """
+    codes, uniques = pd.factorize(headers)
+    parsed = parse_period_headers(uniques)
+    variables = np.array([info.variable for info in parsed], dtype=object)
+    periods = np.array([info.token for info in parsed], dtype=object)
+    return variables.take(codes), periods.take(codes)
+
+def _reshape_two_row_header_to_panel(df: pd.DataFrame, filename: str,
+                                     periods: Optional[Tuple[Optional[int], Optional[int]]] = None) -> pd.DataFrame:
     # Assume first two rows are headers
     logging.info(f"[Reshaper] Processing two_row_header format from: {filename}")
     new_cols = [f"{str(df.iloc[1, i])}_{str(df.iloc[0, i])}" for i in range(df.shape[1])]
     df2 = df.iloc[2:].copy()
     df2.columns = new_cols
-    return _reshape_wide_to_panel(df2, filename)
+    return _reshape_wide_to_panel(df2, filename, periods)
 
     
 def _reshape_key_value_to_panel(df: pd.DataFrame, filename: str, variable_candidates=None, value_candidates=None) -> pd.DataFrame:
@@ -100,7 +263,7 @@ def _reshape_key_value_to_panel(df: pd.DataFrame, filename: str, variable_candid
             aggfunc='first'
         ).reset_index()
         panel.columns.name = None
-        return panel
+        return _with_id_columns(panel, id_cols)
     elif len(df.columns) >= 3:
         id_cols = list(df.columns[:-2])
         key_col, value_col = df.columns[-2:]
@@ -112,35 +275,39 @@ def _reshape_key_value_to_panel(df: pd.DataFrame, filename: str, variable_candid
             aggfunc='first'
         ).reset_index()
         panel.columns.name = None
-        return panel
+        return _with_id_columns(panel, id_cols)
     else:
         logging.warning("Key-value fallback: not enough columns to reshape.")
         return df
 
-def _reshape_cross_tab_to_panel(df: pd.DataFrame, filename: str) -> pd.DataFrame:
+def _reshape_cross_tab_to_panel(df: pd.DataFrame, filename: str,
+                                periods: Optional[Tuple[Optional[int], Optional[int]]] = None) -> pd.DataFrame:
     # Assume first column is row variable, columns are col variable
     logging.info(f"[Reshaper] Processing cross_tab format from: {filename}")
     row_var = df.columns[0]
-    col_vars = df.columns[1:]
+    col_vars = [col for col in df.columns[1:] if period_in_range(extract_var_period_dynamic(col)[1], periods)]
     long_df = df.melt(id_vars=[row_var], value_vars=col_vars, var_name='col_var', value_name='value')
     # Try to extract period from col_var
-    long_df[['variable', 'period']] = long_df['col_var'].apply(lambda x: pd.Series(extract_var_period_dynamic(x)))
+    long_df['variable'], long_df['period'] = _split_melted_headers(long_df['col_var'])
     # Pivot to panel
     panel = long_df.pivot_table(index=[row_var, 'period'], columns='variable', values='value', aggfunc='first').reset_index()
     panel.columns.name = None
-    return panel
+    return _with_id_columns(panel, [row_var, 'period'])
 
-def _reshape_fully_transposed_to_panel(df: pd.DataFrame, filename: str) -> pd.DataFrame:
+def _reshape_fully_transposed_to_panel(df: pd.DataFrame, filename: str,
+                                       periods: Optional[Tuple[Optional[int], Optional[int]]] = None) -> pd.DataFrame:
     # Transpose, then treat as wide
     logging.info(f"[Reshaper] Processing fully_transposed format from: {filename}")
     df2 = df.set_index(df.columns[0]).T.reset_index()
     df2.columns = [str(c) for c in df2.columns]
-    return _reshape_wide_to_panel(df2, filename)
+    return _reshape_wide_to_panel(df2, filename, periods)
 
 def _reshape_stacked_multi_time_long_to_panel(df: pd.DataFrame, filename: str) -> pd.DataFrame:
     # Already in panel format: just return as is
     logging.info(f"[Reshaper] Processing stacked_multi_time_long format from: {filename}")
-    return df.copy()
+    panel = df.copy()
+    id_columns = long_id_columns(panel.columns)
+    return panel if id_columns is None else _with_id_columns(panel, id_columns)
 
 
 
@@ -174,13 +341,10 @@ def _reshape_pivoted_by_variable_to_panel(df: pd.DataFrame, filename: str) -> pd
         dims = re.split(delimiter_regex, prefix) if prefix else []
         return dims, period
 
-    # first pass: how many dimension tokens at most?
-    max_dims = 0
-    dims_period = []
-    for h in long_df["orig_header"]:
-        dims, per = _split_header(h)
-        dims_period.append((dims, per))
-        max_dims = max(max_dims, len(dims))
+    # first pass: how many dimension tokens at most? Each distinct header is split once
+    split_headers = {h: _split_header(h) for h in long_df["orig_header"].unique()}
+    dims_period = [split_headers[h] for h in long_df["orig_header"]]
+    max_dims = max((len(dims) for dims, _ in split_headers.values()), default=0)
 
     # Check if any periods were found
     periods_found = any(per is not None for dims, per in dims_period)
@@ -224,4 +388,4 @@ def _reshape_pivoted_by_variable_to_panel(df: pd.DataFrame, filename: str) -> pd
         .reset_index()
     )
     panel.columns.name = None
-    return panel
\ No newline at end of file
+    return _with_id_columns(panel, index_cols)
\ No newline at end of file
@@ -0,0 +1,139 @@
+"""
+Row Filter Module
+Applies a run's row filter (period range, entity allow-list and simple column
+predicates) to raw frames, wide headers and reshaped panels, so rows outside
+the filter are dropped as early as possible.
+
+A filter spec is a dict with any of:
+    period_start, period_end: Inclusive year bounds
+    entities: Values of the entity column to keep
+    entity_column: Column holding the entity (default: the first column
+        that isn't a period column)
+    where: List of [column, op, value] predicates, op being one of
+        ==, !=, <, <=, >, >=, in, not in
+"""
+
+import operator
+import pandas as pd
+from typing import Dict, Any, List, Optional, Tuple
+
+from .reShaper import PERIOD_COLUMN_NAMES, period_in_range, period_years
+
+_COMPARISONS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+
+
+def validate_filter_spec(spec: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Check a filter spec, raising ValueError for unknown keys or operators.
+
+    Returns:
+        A copy of the spec with 'where' normalised to [column, op, value] lists,
+        or None if the spec is empty
+    """
+    if not spec:
+        return None
+    unknown = set(spec) - {'period_start', 'period_end', 'entities', 'entity_column', 'where'}
+    if unknown:
+        raise ValueError(f"Unknown filter keys: {sorted(unknown)}")
+
+    spec = dict(spec)
+    for bound in ('period_start', 'period_end'):
+        if spec.get(bound) is not None:
+            spec[bound] = int(spec[bound])
+
+    predicates = []
+    for predicate in spec.get('where') or []:
+        if len(predicate) != 3:
+            raise ValueError(f"Filter predicates are [column, op, value], got {predicate!r}")
+        column, op, value = predicate
+        if op not in _COMPARISONS and op not in ('in', 'not in'):
+            raise ValueError(f"Unsupported filter operator: {op}")
+        if op in ('in', 'not in') and not isinstance(value, (list, tuple, set)):
+            raise ValueError(f"Filter operator '{op}' needs a list of values")
+        predicates.append([column, op, value])
+    spec['where'] = predicates
+    return spec
+
+
+def period_range(spec: Optional[Dict[str, Any]]) -> Optional[Tuple[Optional[int], Optional[int]]]:
+    """
+    The spec's (start, end) year bounds, or None if it doesn't limit periods.
+    """
+    if not spec or (spec.get('period_start') is None and spec.get('period_end') is None):
+        return None
+    return spec.get('period_start'), spec.get('period_end')
+
+
+def filter_rows(df: pd.DataFrame, spec: Optional[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Keep the rows of an observation-per-row frame that pass the filter.
+
+    Each part of the spec is only applied if the columns it needs are present,
+    so the same spec can be applied to raw and to harmonized frames.
+    """
+    if not spec or df.empty:
+        return df
+
+    mask = pd.Series(True, index=df.index)
+
+    bounds = period_range(spec)
+    period_column = next((col for col in df.columns if str(col).lower() in PERIOD_COLUMN_NAMES), None)
+    if bounds is not None and period_column is not None:
+        years = period_years(df[period_column])
+        start, end = bounds
+        in_range = pd.Series(True, index=df.index)
+        if start is not None:
+            in_range &= years >= start
+        if end is not None:
+            in_range &= years <= end
+        # Periods without a recognisable year are kept
+        mask &= in_range | years.isna()
+
+    if spec.get('entities') is not None:
+        entity_column = spec.get('entity_column') or next(
+            (col for col in df.columns if str(col).lower() not in PERIOD_COLUMN_NAMES), None
+        )
+        if entity_column in df.columns:
+            allowed = {str(entity) for entity in spec['entities']}
+            mask &= df[entity_column].astype(str).isin(allowed)
+
+    for column, op, value in spec.get('where') or []:
+        if column in df.columns:
+            mask &= _evaluate(df[column], op, value)
+
+    return df if mask.all() else df[mask]
+
+
+def filter_columns(spec: Optional[Dict[str, Any]]) -> List[str]:
+    """
+    Columns a filter reads, which must survive column projection.
+    """
+    if not spec:
+        return []
+    columns = [column for column, _, _ in spec.get('where') or []]
+    if spec.get('entity_column'):
+        columns.append(spec['entity_column'])
+    return columns
+
+
+def _evaluate(series: pd.Series, op: str, value: Any) -> pd.Series:
+    """
+    Evaluate one predicate. Numeric operands compare against the column's
+    numeric values; entries that aren't numbers fail the comparison.
+    """
+    if op == 'in':
+        return series.isin(value)
+    if op == 'not in':
+        return ~series.isin(value)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        series = pd.to_numeric(series, errors='coerce')
+    result = _COMPARISONS[op](series, value)
+    return result.fillna(False).astype(bool)
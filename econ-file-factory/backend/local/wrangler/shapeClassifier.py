@@ -0,0 +1,163 @@
+"""
+Shape Classifier Module
+Local shape detection. Scores every shape the reshaper supports from header
+and value features of a sample, computed column-wise rather than cell by cell,
+and reports how clearly the best shape beats the runner-up so callers can
+decide when a second opinion from the AI is worth asking for.
+"""
+
+import re
+import numpy as np
+import pandas as pd
+from typing import Dict, Any
+
+from .rowFilter import PERIOD_COLUMN_NAMES
+
+# Shapes reshape_to_panel_format knows how to reshape
+SHAPE_TYPES = (
+    'wide', 'two_row_header', 'key_value', 'cross_tab',
+    'fully_transposed', 'stacked_multi_time_long', 'pivoted_by_variable'
+)
+
+# Below this confidence the AI is asked for the shape
+DEFAULT_CONFIDENCE_THRESHOLD = 0.3
+
+# Best scores below this are reported as 'unknown'
+MIN_SHAPE_SCORE = 0.2
+
+# Rows of the sample looked at for value features
+CLASSIFIER_ROWS = 20
+
+# Column names used by the key_value and pivoted_by_variable reshapers
+VARIABLE_COLUMN_NAMES = ('variable', 'var', 'name', 'attribute', 'feature', 'measure', 'indicator', 'item')
+VALUE_COLUMN_NAMES = ('value', 'val', 'amount')
+
+_ID_HINTS = re.compile(r'id|code|firm|company|country|entity|region|iso')
+
+# A year, quarter or month somewhere in a header
+_PERIOD_IN_HEADER = re.compile(
+    r'(?<!\d)(?:18|19|20|21)\d{2}(?!\d)|(?<![a-z])q[1-4](?![a-z])'
+    r'|(?<![a-z])(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*(?![a-z])'
+)
+# A header that is only a period, allowing pandas' '.1' suffix for repeated headers
+_PERIOD_HEADER = re.compile(
+    r'(?:(?:18|19|20|21)\d{2}(?:[_\-\s]?q[1-4]|[_\-/]\d{1,2})?|q[1-4][_\-\s]?(?:18|19|20|21)\d{2}'
+    r'|(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*)(?:\.\d+)?'
+)
+
+
+def classify_shape(sample_df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Classify the shape of a sample.
+
+    Args:
+        sample_df: Sample DataFrame (headers + a few rows)
+
+    Returns:
+        Dictionary with the best 'shape', its 'confidence' (best score minus
+        the runner-up's, between 0 and 1) and the 'scores' of every shape.
+        The shape is 'unknown', with confidence 0, if no shape scores at
+        least MIN_SHAPE_SCORE.
+    """
+    scores = score_shapes(sample_df)
+    ranked = sorted(scores.values(), reverse=True)
+    shape = max(scores, key=scores.get)
+    if ranked[0] < MIN_SHAPE_SCORE:
+        return {'shape': 'unknown', 'confidence': 0.0, 'scores': scores}
+    return {'shape': shape, 'confidence': round(ranked[0] - ranked[1], 3), 'scores': scores}
+
+
+def score_shapes(sample_df: pd.DataFrame) -> Dict[str, float]:
+    """
+    Score each of SHAPE_TYPES between 0 and 1 for a sample.
+
+    Each score is the strength of the evidence the shape can't do without
+    (periods in headers, a period column, a variable/value pair, ...) times
+    the share of its supporting features that hold.
+    """
+    f = _features(sample_df)
+    no_period_column = 1 - f['period_column']
+    no_key_value = 1 - f['key_value']
+
+    scores = {
+        'wide': max(f['prefixed_period_headers'], f['pure_period_headers'] * f['first_id_named'])
+        * np.mean([no_period_column, 1 - f['first_variable_named'], no_key_value,
+                   max(f['first_id_named'], f['first_codes'])]),
+        'two_row_header': f['row0_years'] * np.mean([f['row1_text'], f['rest_numeric']]),
+        'key_value': f['key_value'] * np.mean([f['variable_text'], 1 - f['period_headers']]),
+        'cross_tab': f['first_text'] * f['rest_numeric'] * (1 - f['period_headers'])
+        * no_period_column * no_key_value * (1 - f['row0_years']),
+        'fully_transposed': f['pure_period_headers']
+        * np.mean([f['first_text'], 1 - f['first_id_named'], 1 - f['first_codes'], no_period_column]),
+        'stacked_multi_time_long': f['period_column'] * no_key_value * (1 - f['period_headers']),
+        'pivoted_by_variable': f['prefixed_period_headers']
+        * np.mean([f['first_variable_named'], 1 - f['first_codes'], 1 - f['first_id_named'], no_period_column]),
+    }
+    return {shape: round(float(score), 3) for shape, score in scores.items()}
+
+
+def _features(sample_df: pd.DataFrame) -> Dict[str, float]:
+    """
+    Header and value features of a sample, each between 0 and 1.
+    """
+    headers = pd.Index([str(col).strip().lower() for col in sample_df.columns])
+    if len(headers) == 0:
+        return dict.fromkeys([
+            'period_headers', 'pure_period_headers', 'prefixed_period_headers', 'period_column',
+            'key_value', 'variable_text', 'first_text', 'first_codes', 'first_id_named', 'first_variable_named',
+            'rest_numeric', 'row0_years', 'row1_text'
+        ], 0.0)
+
+    # Headers after the first, which holds the row labels in most shapes
+    rest = headers[1:] if len(headers) > 1 else headers
+    has_period = rest.str.contains(_PERIOD_IN_HEADER)
+    is_period = rest.str.fullmatch(_PERIOD_HEADER)
+
+    # Value features from one numeric conversion of the whole sample
+    sample = sample_df.iloc[:CLASSIFIER_ROWS]
+    cells = pd.Series(sample.to_numpy(dtype=object).ravel())
+    present = (cells.notna() & (cells.astype(str).str.strip() != '')).to_numpy().reshape(sample.shape)
+    numbers = pd.to_numeric(cells, errors='coerce').to_numpy(dtype=float).reshape(sample.shape)
+    numeric = ~np.isnan(numbers)
+    years = numeric & (np.nan_to_num(numbers) % 1 == 0) & (numbers >= 1800) & (numbers <= 2100)
+    filled = present.sum(axis=0)
+    numeric_share = np.divide(numeric.sum(axis=0), filled, out=np.zeros(len(headers)), where=filled > 0)
+    year_share = np.divide(years.sum(axis=0), filled, out=np.zeros(len(headers)), where=filled > 0)
+
+    # A period column is named like one, or holds nothing but years
+    all_years = (year_share == 1) & (filled > 0) & ~headers.str.contains(_PERIOD_IN_HEADER)
+    period_columns = headers.isin(PERIOD_COLUMN_NAMES) | all_years
+    variable_columns = headers.isin(VARIABLE_COLUMN_NAMES)
+    value_columns = headers.isin(VALUE_COLUMN_NAMES)
+    key_value = 1.0 if variable_columns.any() and value_columns.any() else 0.0
+    variable_text = float(1 - numeric_share[variable_columns].mean()) if key_value else 0.0
+
+    # Identifiers such as 'A001' carry digits; variable names rarely do
+    first_values = cells.iloc[::len(headers)].dropna().astype(str)
+    first_codes = float(first_values.str.contains(r'\d').mean()) if len(first_values) else 0.0
+
+    row0_years = row1_text = 0.0
+    if len(sample) >= 2 and len(headers) > 1:
+        row0_years = float(years[0, 1:].sum() / max(present[0, 1:].sum(), 1))
+        row1_text = float(((~numeric[1, 1:]) & present[1, 1:]).sum() / max(present[1, 1:].sum(), 1))
+    rest_numeric = float(numeric_share[1:].mean()) if len(headers) > 1 else 0.0
+    if len(sample) > 2 and len(headers) > 1:
+        # For two-row headers the data starts on the third row
+        below = numeric[2:, 1:].sum() / max(present[2:, 1:].sum(), 1)
+        rest_numeric = max(rest_numeric, float(below)) if row0_years else rest_numeric
+
+    return {
+        'period_headers': float(has_period.mean()),
+        'pure_period_headers': float(is_period.mean()),
+        'prefixed_period_headers': float((has_period & ~is_period).mean()),
+        'period_column': 1.0 if period_columns.any() else 0.0,
+        'key_value': key_value,
+        'variable_text': variable_text,
+        'first_text': float(filled[0] > 0 and numeric_share[0] < 0.5),
+        'first_codes': first_codes,
+        'first_id_named': 1.0 if _ID_HINTS.search(headers[0]) else 0.0,
+        'first_variable_named': 1.0 if headers[0] in VARIABLE_COLUMN_NAMES else 0.0,
+        'rest_numeric': rest_numeric,
+        'row0_years': row0_years,
+        'row1_text': row1_text,
+    }
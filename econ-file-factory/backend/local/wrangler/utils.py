@@ -16,20 +16,23 @@ def fuzzy_match_columns(input_columns, standard_columns):
 
 # --- OpenAI API semantic matching to a fixed schema ---
 
-def openai_semantic_match_columns(input_columns, standard_columns, api_key=None, model="gpt-4-turbo"):
+def openai_semantic_match_columns(input_columns, standard_columns, api_key=None, model="gpt-4-turbo", governor=None):
     """
     Uses OpenAI's API to semantically match input_columns to standard_columns.
     Returns a dict mapping input_column -> best_match (or 'unknown').
     Requires openai package and an API key (set OPENAI_API_KEY env var or pass as argument).
+    The call is made under `governor` (an AICallGovernor), or a governor of its own.
     """
     import os
     from openai import OpenAI
+    from ai.callGovernor import AICallGovernor
     if api_key is None:
         api_key = os.getenv("OPENAI_API_KEY")
     if api_key is None:
         raise ValueError("OpenAI API key must be set as OPENAI_API_KEY or passed as api_key argument.")
 
-    client = OpenAI(api_key=api_key)
+    client = OpenAI(api_key=api_key, max_retries=0)
+    governor = governor or AICallGovernor()
     mapping = {}
     # Batch all columns in one prompt for efficiency
     prompt = (
@@ -38,11 +41,12 @@ def openai_semantic_match_columns(input_columns, standard_columns, api_key=None,
         "Input columns: " + ', '.join(input_columns) + ".\n"
         "Respond as a JSON object: {input_column: best_match, ...}"
     )
-    response = client.chat.completions.create(
+    response = governor.call(lambda timeout: client.chat.completions.create(
         model=model,
         messages=[{"role": "user", "content": prompt}],
-        response_format={"type": "json_object"}
-    )
+        response_format={"type": "json_object"},
+        timeout=timeout
+    ))
     import json
     content = response.choices[0].message.content
     try:
@@ -54,21 +58,24 @@ def openai_semantic_match_columns(input_columns, standard_columns, api_key=None,
 
 # --- OpenAI API dynamic canonicalization ---
 
-def openai_dynamic_canonicalize_columns(input_columns, api_key=None, model="gpt-4-turbo", batch_size=20):
+def openai_dynamic_canonicalize_columns(input_columns, api_key=None, model="gpt-4-turbo", batch_size=20, governor=None):
     """
     Uses OpenAI's API to suggest canonical column names for each input column, dynamically (no predefined schema).
     Returns a dict mapping original column names to canonical names.
     Batches requests for efficiency. Requires openai package and API key.
+    The calls are made under `governor` (an AICallGovernor), or a governor of their own.
     """
     import os
     from openai import OpenAI
     import json
+    from ai.callGovernor import AICallGovernor
     if api_key is None:
         api_key = os.getenv("OPENAI_API_KEY")
     if api_key is None:
         raise ValueError("OpenAI API key must be set as OPENAI_API_KEY or passed as api_key argument.")
     
-    client = OpenAI(api_key=api_key)
+    client = OpenAI(api_key=api_key, max_retries=0)
+    governor = governor or AICallGovernor()
     mapping = {}
     for i in range(0, len(input_columns), batch_size):
         batch = input_columns[i:i+batch_size]
@@ -79,11 +86,12 @@ def openai_dynamic_canonicalize_columns(input_columns, api_key=None, model="gpt-
             f"Columns: {', '.join(batch)}.\n"
             "Respond as: {original_column: canonical_column, ...}"
         )
-        response = client.chat.completions.create(
+        response = governor.call(lambda timeout: client.chat.completions.create(
             model=model,
             messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"}
-        )
+            response_format={"type": "json_object"},
+            timeout=timeout
+        ))
         content = response.choices[0].message.content
         try:
             batch_mapping = json.loads(content)
@@ -93,31 +101,35 @@ def openai_dynamic_canonicalize_columns(input_columns, api_key=None, model="gpt-
     return mapping
 
 # --- OpenAI API: Infer likely ID and time columns ---
-def infer_id_and_time_columns(columns, api_key=None, model="gpt-4-turbo"):
+def infer_id_and_time_columns(columns, api_key=None, model="gpt-4-turbo", governor=None):
     """
     Use OpenAI to infer which columns are likely to be unique entity identifiers and which are time variables.
     Returns: (list_of_id_columns, list_of_time_columns)
+    The call is made under `governor` (an AICallGovernor), or a governor of its own.
     """
     import os
     from openai import OpenAI
     import json
+    from ai.callGovernor import AICallGovernor
     if api_key is None:
         api_key = os.getenv("OPENAI_API_KEY")
     if api_key is None:
         raise ValueError("OpenAI API key must be set as OPENAI_API_KEY or passed as api_key argument.")
     
-    client = OpenAI(api_key=api_key)
+    client = OpenAI(api_key=api_key, max_retries=0)
+    governor = governor or AICallGovernor()
     prompt = (
         f"Given the following column names from a dataset: {', '.join(columns)}.\n"
         "Which columns are most likely to be unique entity identifiers (e.g., firm, company, country, region, etc.)?\n"
         "Which columns are most likely to be time variables (e.g., year, month, quarter, date, period, etc.)?\n"
         'Respond as JSON: {"id_columns": [..], "time_columns": [..]}'
     )
-    response = client.chat.completions.create(
+    response = governor.call(lambda timeout: client.chat.completions.create(
         model=model,
         messages=[{"role": "user", "content": prompt}],
-        response_format={"type": "json_object"}
-    )
+        response_format={"type": "json_object"},
+        timeout=timeout
+    ))
     content = response.choices[0].message.content
     try:
         result = json.loads(content)
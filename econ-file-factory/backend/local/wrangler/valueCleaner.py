@@ -7,7 +7,7 @@ import pandas as pd
 import numpy as np
 import re
 import os
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Tuple, Optional
 
 def _transform_abbreviated_numbers(value: str) -> str:
     """
@@ -111,13 +111,17 @@ def _load_mappings_from_file() -> Tuple[Dict[str, str], List[Tuple[str, str]]]:
     return direct_mappings, pattern_mappings
 
 
-def clean_master_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+def clean_master_dataframe(df: pd.DataFrame, chunk_rows: Optional[int] = None) -> pd.DataFrame:
     """
     Clean the merged master DataFrame by applying value mapping rules,
     standardizing codes, handling metadata, and inferring data types.
     
     Args:
         df: Merged master DataFrame to clean
+        chunk_rows: If set, clean the frame in blocks of this many rows, so
+            the temporary copies each cleaning step makes are block-sized.
+            The cleaned blocks are joined into one frame, so the result is
+            still a full copy of the input
         
     Returns:
         Cleaned DataFrame with standardized values and types
@@ -125,6 +129,12 @@ def clean_master_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     if df.empty:
         return df
     
+    if chunk_rows and len(df) > chunk_rows:
+        return pd.concat(
+            [clean_master_dataframe(df.iloc[start:start + chunk_rows])
+             for start in range(0, len(df), chunk_rows)]
+        )
+    
     cleaned_df = df.copy()
     
    
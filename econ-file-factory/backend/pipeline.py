@@ -5,32 +5,105 @@ Implements the complete Data Harmonization Flow with 11 steps.
 import sys
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Tuple, Optional, Union, Iterator
 import os
 import io
-import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from werkzeug.utils import secure_filename
-import tempfile
 import shutil
 
 # Import modular components
-from ai.shapeDetection import detect_data_shape
+from ai.shapeDetection import detect_data_shapes, DEFAULT_SHAPE_CONCURRENCY, DEFAULT_SHAPE_TIMEOUT
+from ai.shapeCache import ShapeCache
+from ai.callGovernor import AICallGovernor, CircuitBreaker, DEFAULT_AI_BUDGET_SECONDS
 from ai.columnHarmionisation.ai_harmonizer import harmonize_columns
 from ai.columnHarmionisation.fuzzyMatching import fuzzy_match_columns, get_synonym_dictionary
-from local.ingest.readers import read_file, extract_sample_for_ai
-from local.wrangler.reShaper import reshape_to_panel_format
+from local.ingest.readers import (
+    read_file_chunks, read_upload, read_upload_sample, iter_zip_members, slice_into_chunks,
+    extract_sample_for_ai, DEFAULT_SAMPLE_ROWS, EXCEL_EXTENSIONS
+)
+from local.ingest.parallel import ingest_uploads
+from local.ingest.cache import IngestCache
+from local.wrangler.reShaper import (
+    reshape_to_panel_format, combine_reshaped_chunks, panel_id_columns, CHUNK_SAFE_SHAPES, ID_COLUMNS_ATTR
+)
+from local.wrangler.columnProjector import resolve_raw_columns, select_wanted_columns
+from local.wrangler.shapeClassifier import classify_shape, DEFAULT_CONFIDENCE_THRESHOLD
+from local.wrangler.rowFilter import validate_filter_spec, filter_rows, filter_columns, period_range
 from local.wrangler.valueCleaner import clean_master_dataframe
 from local.wrangler.deDuplicater import remove_duplicates, get_duplicate_summary
 from local.wrangler.auditReporter import generate_audit_report, export_audit_report_to_csv
 
+# File the harmonized dataset and its audit summary are written to
+DEFAULT_OUTPUT_PATH = 'uploads/MASTER.csv'
+
 class DataHarmonizationPipeline:
     """
     Main orchestrator for the Data Harmonization Flow.
     Implements all 11 steps of the harmonization process.
     """
-    def __init__(self, api_key: Optional[str] = None, use_openai: bool = True):
+    def __init__(self, api_key: Optional[str] = None, use_openai: bool = True,
+                 chunk_size: Optional[int] = None,
+                 excel_sheets: Union[str, List[str]] = 'first',
+                 excel_workers: Optional[int] = None,
+                 zip_workers: Optional[int] = None,
+                 ingest_workers: Optional[int] = None,
+                 compact_dtypes: bool = False,
+                 ingest_cache: Optional[IngestCache] = None,
+                 sample_rows: Optional[int] = None,
+                 wanted_columns: Optional[List[str]] = None,
+                 shape_cache: Optional[ShapeCache] = None,
+                 shape_concurrency: int = DEFAULT_SHAPE_CONCURRENCY,
+                 shape_timeout: float = DEFAULT_SHAPE_TIMEOUT,
+                 api_base_url: Optional[str] = None,
+                 batch_shape_detection: bool = False,
+                 shape_confidence_threshold: Optional[float] = DEFAULT_CONFIDENCE_THRESHOLD,
+                 ai_budget_seconds: Optional[float] = DEFAULT_AI_BUDGET_SECONDS,
+                 ai_breaker: Optional[CircuitBreaker] = None,
+                 output_path: str = DEFAULT_OUTPUT_PATH):
         self.use_openai = use_openai
+        # When set, files are parsed and reshaped in chunks of this many rows,
+        # so only one raw chunk per file is held at a time; the reshaped
+        # panels and the master frame are still built whole
+        self.chunk_size = chunk_size
+        # 'first', 'all', or a list of sheet names; each sheet becomes a source
+        self.excel_sheets = excel_sheets
+        self.excel_workers = excel_workers
+        # Threads used to decompress and parse ZIP members in parallel
+        self.zip_workers = zip_workers
+        # Processes used to parse the files of an upload batch in parallel
+        self.ingest_workers = ingest_workers
+        # Convert ingested frames to compact dtypes (categoricals, small ints)
+        self.compact_dtypes = compact_dtypes
+        # On-disk cache of parsed uploads, keyed by content hash
+        self.ingest_cache = ingest_cache
+        # When set, shapes and column mappings are worked out from a sample of
+        # this many rows while the full parse runs in the background
+        self.sample_rows = sample_rows
+        # Canonical columns to keep; raw columns that don't map to one of
+        # them (or to an identifier) are not parsed
+        self.wanted_columns = wanted_columns
+        # Row filter spec for the current run (see local.wrangler.rowFilter)
+        self.filters = None
+        # Persistent cache of AI shape detections, keyed by layout fingerprint
+        self.shape_cache = shape_cache
+        # Shape detection requests in flight at once, and seconds allowed for each
+        self.shape_concurrency = shape_concurrency
+        self.shape_timeout = shape_timeout
+        # Classify several files per shape detection request
+        self.batch_shape_detection = batch_shape_detection
+        # Files the local classifier is at least this confident about are not
+        # sent to the AI; None sends every file
+        self.shape_confidence_threshold = shape_confidence_threshold
+        # Seconds each run may spend on AI calls; every call of a run goes
+        # through one governor, and runs share its circuit breaker
+        self.ai_budget_seconds = ai_budget_seconds
+        self.ai_governor = AICallGovernor(ai_budget_seconds, breaker=ai_breaker)
+        # OpenAI-compatible endpoint for shape detection (default: the OpenAI API)
+        self.api_base_url = api_base_url
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        # Where export_results writes MASTER.csv
+        self.output_path = output_path
         self.processing_stats = {
             'total_files_processed': 0,
             'total_records_processed': 0,
@@ -46,29 +119,56 @@ class DataHarmonizationPipeline:
             'issues_flagged': []
         }
 
-    def run(self, files: List[Any], filenames: List[str]) -> Dict[str, Any]:
+    def run(self, files: List[Any], filenames: List[str],
+            filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Run the full flow on a batch of uploads.
+        
+        Args:
+            files: Paths or file-like objects, one per upload
+            filenames: Original filenames, in the same order
+            filters: Optional row filter with period_start/period_end,
+                entities/entity_column and 'where' predicates. Rows outside
+                it are dropped before reshaping where the shape allows, and
+                again once columns have their harmonized names.
+        """
         try:
-            # 1. File Upload & Ingestion
-            dataframes, sources = self.ingest_files(files, filenames)
-            # 2. Shape Detection (AI)
-            shapes = self.detect_shapes(dataframes, sources)
-           
-           
-            # 3. Local Reshaping
-            reshaped_dfs = self.reshape_data(dataframes, shapes, sources)
+            self.filters = validate_filter_spec(filters)
+            # A fresh budget for this run, under the same circuit breaker
+            self.ai_governor = AICallGovernor(self.ai_budget_seconds, breaker=self.ai_governor.breaker)
+            harmonization_mapping = None
+            if self.chunk_size:
+                # 1-3. Streamed Ingestion, Shape Detection and Reshaping
+                reshaped_dfs, sources = self.ingest_and_reshape_chunked(files, filenames)
+            elif self.sample_rows or self.wanted_columns:
+                # 1-4. Shape Detection and Harmonization on a sample, overlapped with Ingestion
+                reshaped_dfs, sources, harmonization_mapping = self.ingest_with_sample_first(files, filenames)
+            else:
+                # 1. File Upload & Ingestion
+                dataframes, sources = self.ingest_files(files, filenames)
+                # 2. Shape Detection (AI)
+                shapes = self.detect_shapes(dataframes, sources)
+                # 3. Local Reshaping
+                reshaped_dfs = self.reshape_data(dataframes, shapes, sources)
          
             # 4. Column Harmonization (AI + Fallback)
-            harmonization_mapping = self.harmonize_columns(reshaped_dfs, sources)
+            if harmonization_mapping is None:
+                harmonization_mapping = self.harmonize_columns(reshaped_dfs, sources)
             # 5. Apply Harmonized Names
             harmonized_dfs = self.apply_harmonized_names(reshaped_dfs, harmonization_mapping)
+            if self.filters:
+                harmonized_dfs = [self._filter_rows(df, 'after_reshape') for df in harmonized_dfs]
+            if self.wanted_columns:
+                harmonized_dfs = [select_wanted_columns(df, self.wanted_columns) for df in harmonized_dfs]
             # 6. Add Source Column
             source_dfs = self.add_source_columns(harmonized_dfs, sources)
+            id_columns = self._known_id_columns(source_dfs)
             # 7. Merge All DataFrames
             merged_df = self.merge_dataframes(source_dfs)
             # 8. Clean the Merged Master DataFrame
             cleaned_df = self.clean_master_dataframe(merged_df)
             # 9. Remove True Duplicates
-            final_df, duplicates_df = self.remove_duplicates(cleaned_df)
+            final_df, duplicates_df = self.remove_duplicates(cleaned_df, id_columns)
             # 10. Auditing and Reporting
             audit_report = self.generate_comprehensive_audit(final_df, duplicates_df, harmonization_mapping)
             # 11. Export Results
@@ -87,74 +187,402 @@ class DataHarmonizationPipeline:
                 'audit_trail': self.audit_trail
             }
 
-    def ingest_files(self, files: List[Any], filenames: List[str]) -> Tuple[List[pd.DataFrame], List[str]]:
+    def ingest_files(self, files: List[Any], filenames: List[str],
+                     columns: Optional[List[Optional[List[str]]]] = None) -> Tuple[List[pd.DataFrame], List[str]]:
         dataframes = []
         sources = []
+        metadatas = []
+        
+        # ZIP members and workbook sheets each become their own source
+        results = self._read_uploads(files, filenames, columns)
+        for filename, (entries, error) in zip(filenames, results):
+            if error is not None:
+                print(f"[Pipeline] Error reading file {filename}: {error}")
+                continue
+            for df, metadata, source in entries:
+                dataframes.append(df)
+                sources.append(source)
+                metadatas.append(metadata)
+        
+        # Update audit trail
+        self.audit_trail['files_processed'] = [
+            self._file_audit_entry(df, src, metadata)
+            for df, src, metadata in zip(dataframes, sources, metadatas)
+        ]
+        
+        return dataframes, sources
+    
+    def _read_uploads(self, files: List[Any], filenames: List[str],
+                      columns: Optional[List[Optional[List[str]]]] = None) -> List[Tuple[List[Tuple[pd.DataFrame, Dict[str, Any], str]], Optional[str]]]:
+        """
+        Read every upload, serving unchanged files from the ingest cache and
+        storing newly parsed ones in it. `columns` optionally gives the
+        columns to read from each upload.
+        """
+        if self.ingest_cache is None:
+            return ingest_uploads(files, filenames, max_workers=self.ingest_workers,
+                                  columns=columns, **self._read_options())
+        
+        # The cache may be shared with concurrent runs, so this run counts its own lookups
+        tally = dict.fromkeys(self.ingest_cache.counters, 0)
+        columns = columns if columns is not None else [None] * len(files)
+        # Worker counts don't change the parsed result, so they stay out of the key
+        keys = [
+            self.ingest_cache.key_for(file_obj, filename, {
+                'excel_sheets': self.excel_sheets,
+                'compact_dtypes': self.compact_dtypes,
+                'columns': sorted(map(str, file_columns)) if file_columns is not None else None
+            })
+            for file_obj, filename, file_columns in zip(files, filenames, columns)
+        ]
+        results = [self.ingest_cache.get(key, filename, tally=tally) for key, filename in zip(keys, filenames)]
+        results = [(entries, None) if entries is not None else None for entries in results]
+        
+        pending = [i for i, result in enumerate(results) if result is None]
+        parsed = ingest_uploads([files[i] for i in pending], [filenames[i] for i in pending],
+                                max_workers=self.ingest_workers,
+                                columns=[columns[i] for i in pending], **self._read_options())
+        for i, (entries, error) in zip(pending, parsed):
+            results[i] = (entries, error)
+            if error is None:
+                for _, metadata, _ in entries:
+                    metadata['ingest_cache'] = 'miss'
+                self.ingest_cache.put(keys[i], entries, filenames[i], tally=tally)
+        
+        stats = self.ingest_cache.stats()
+        self.processing_stats['ingest_cache'] = {
+            **tally,
+            'entries': stats['entries'],
+            'bytes': stats['bytes']
+        }
+        return results
+    
+    def _read_options(self) -> Dict[str, Any]:
+        """
+        Reader options shared by every upload in a run.
+        """
+        return {
+            'excel_sheets': self.excel_sheets,
+            'excel_workers': self.excel_workers,
+            'zip_workers': self.zip_workers,
+            'compact_dtypes': self.compact_dtypes
+        }
+    
+    def _file_audit_entry(self, df: pd.DataFrame, source: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build the audit trail entry for one ingested source.
+        """
+        entry = {
+            'filename': source,
+            'rows': len(df),
+            'columns': len(df.columns),
+            'parse_seconds': metadata.get('parse_seconds')
+        }
+        if 'sheet_used' in metadata:
+            entry['sheet'] = metadata['sheet_used']
+            entry['sheet_parse_seconds'] = metadata.get('sheet_parse_seconds')
+        if metadata.get('sheets_missing'):
+            entry['sheets_missing'] = metadata['sheets_missing']
+        if 'memory_saved_bytes' in metadata:
+            entry['memory_bytes'] = metadata['memory_bytes_after']
+            entry['memory_saved_bytes'] = metadata['memory_saved_bytes']
+        if 'ingest_cache' in metadata:
+            entry['ingest_cache'] = metadata['ingest_cache']
+        if 'transfer_format' in metadata:
+            entry['transfer_format'] = metadata['transfer_format']
+        if metadata.get('columns_projected'):
+            entry['columns_projected'] = True
+        return entry
+    
+    def ingest_and_reshape_chunked(self, files: List[Any], filenames: List[str]) -> Tuple[List[pd.DataFrame], List[str]]:
+        """
+        Steps 1-3 in streaming mode.
+        Read each file in chunks of `chunk_size` rows, detect its shape from the
+        first chunk and reshape chunk by chunk, so only one raw chunk per file
+        is held in memory. Shapes that need the whole table are reshaped once
+        all chunks have been read. Memory is bounded while parsing only: the
+        reshaped chunks of each source are kept and joined.
+        """
+        reshaped_dfs = []
+        sources = []
+        self.audit_trail['files_processed'] = []
         
         for file_obj, filename in zip(files, filenames):
             try:
-                # Extract files if it's a ZIP
                 if filename.endswith('.zip'):
-                    extracted_files = self._extract_zip_files(file_obj)
-                    for extracted_name, extracted_stream in extracted_files:
-                        # Write BytesIO to a temporary file
-                        with tempfile.NamedTemporaryFile(delete=False, suffix=extracted_name[-4:]) as tmp_file:
-                            tmp_file.write(extracted_stream.read())
-                            tmp_file_path = tmp_file.name
-                        try:
-                            df, metadata = read_file(tmp_file_path, extracted_name)
-                            if df is not None:
-                                dataframes.append(df)
-                                sources.append(extracted_name)
-                        finally:
-                            # Clean up temp file
-                            os.remove(tmp_file_path)
+                    targets = iter_zip_members(file_obj)
                 else:
-                    # Single file
-                    df, metadata = read_file(file_obj, filename)
-                    if df is not None:
-                        dataframes.append(df)
-                        sources.append(filename)
-                        
+                    targets = [(filename, file_obj)]
+                
+                for name, stream in targets:
+                    if name.lower().endswith(EXCEL_EXTENSIONS) and self.excel_sheets != 'first':
+                        # Sheets are parsed whole, then sliced into chunks
+                        streams = [
+                            (source, slice_into_chunks(df, metadata, self.chunk_size))
+                            for df, metadata, source in read_upload(stream, name, **self._read_options())
+                        ]
+                    else:
+                        streams = [(name, read_file_chunks(stream, name, self.chunk_size))]
+                    
+                    for source, chunks in streams:
+                        reshaped_df, file_stats = self._stream_source(chunks, source)
+                        reshaped_dfs.append(reshaped_df)
+                        sources.append(source)
+                        self.audit_trail['files_processed'].append(file_stats)
+                    
             except Exception as e:
                 print(f"[Pipeline] Error reading file {filename}: {e}")
                 continue
         
-        # Update audit trail
-        self.audit_trail['files_processed'] = [
-            {'filename': src, 'rows': len(df), 'columns': len(df.columns)}
-            for df, src in zip(dataframes, sources)
-        ]
+        return reshaped_dfs, sources
+    
+    def ingest_with_sample_first(self, files: List[Any], filenames: List[str]) -> Tuple[List[pd.DataFrame], List[str], Dict[str, str]]:
+        """
+        Steps 1-4 with the full parse off the critical path.
+        Parse the header and first `sample_rows` rows of each upload, then run
+        shape detection and column harmonization on those samples while the
+        full parse runs in a background thread. Shapes are applied to the full
+        frames once they arrive; columns the samples didn't show are
+        harmonized again from the full data.
+        
+        With `wanted_columns`, the full parse instead waits for the sample's
+        mapping, so it can read only the raw columns behind the wanted ones.
+        """
+        sample_files, full_files = zip(*[self._independent_handles(f) for f in files]) if files else ((), ())
         
-        return dataframes, sources
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            if not self.wanted_columns:
+                full_read = executor.submit(self.ingest_files, list(full_files), filenames)
+            
+            sample_dfs, sample_sources, sample_uploads = [], [], []
+            for file_obj, filename in zip(sample_files, filenames):
+                try:
+                    for df, _, source in read_upload_sample(file_obj, filename,
+                                                            nrows=self.sample_rows or DEFAULT_SAMPLE_ROWS,
+                                                            excel_sheets=self.excel_sheets):
+                        sample_dfs.append(df)
+                        sample_sources.append(source)
+                        sample_uploads.append(filename)
+                except Exception as e:
+                    print(f"[Pipeline] Error sampling file {filename}: {e}")
+            
+            sample_shapes = dict(zip(sample_sources, self.detect_shapes(sample_dfs, sample_sources)))
+            reshaped_samples = []
+            for df, source in zip(sample_dfs, sample_sources):
+                try:
+                    reshaped_samples.append(reshape_to_panel_format(df, sample_shapes[source], source))
+                except Exception as e:
+                    print(f"[Pipeline] Error reshaping sample of {source}: {e}")
+                    reshaped_samples.append(df)
+            harmonization_mapping = self.harmonize_columns(reshaped_samples, sample_sources)
+            
+            source_columns = {}
+            if self.wanted_columns:
+                columns, source_columns = self._project_uploads(
+                    filenames, sample_dfs, sample_sources, sample_uploads,
+                    [sample_shapes[source] for source in sample_sources], harmonization_mapping
+                )
+                full_read = executor.submit(self.ingest_files, list(full_files), filenames, columns)
+            dataframes, sources = full_read.result()
+        
+        # Sources the sampler couldn't read are detected from the full frames
+        missing = [i for i, source in enumerate(sources) if source not in sample_shapes]
+        if missing:
+            detected = self.detect_shapes([dataframes[i] for i in missing], [sources[i] for i in missing])
+            sample_shapes.update(zip([sources[i] for i in missing], detected))
+        shapes = [sample_shapes[source] for source in sources]
+        reshaped_dfs = self.reshape_data(dataframes, shapes, sources,
+                                         [source_columns.get(source) for source in sources])
+        
+        unmapped = {col for df in reshaped_dfs for col in df.columns} - set(harmonization_mapping)
+        if unmapped:
+            print(f"[Pipeline] {len(unmapped)} columns not seen in the samples; harmonizing full data")
+            harmonization_mapping = self.harmonize_columns(reshaped_dfs, sources)
+        
+        return reshaped_dfs, sources, harmonization_mapping
+    
+    def _project_uploads(self, filenames: List[str], sample_dfs: List[pd.DataFrame],
+                         sample_sources: List[str], sample_uploads: List[str],
+                         shapes: List[str], mapping: Dict[str, str]) -> Tuple[List[Optional[List[str]]], Dict[str, List[str]]]:
+        """
+        Map `wanted_columns` back to the raw columns to read from each upload,
+        using the sample's shapes and harmonization mapping. An upload is read
+        in full if any of its sources can't be projected or wasn't sampled.
+        
+        Returns:
+            Tuple of (columns to read per upload, raw columns per projected source)
+        """
+        # Columns the row filter reads have to be parsed too
+        wanted = list(self.wanted_columns) + filter_columns(self.filters)
+        source_columns = {}
+        for df, source, shape in zip(sample_dfs, sample_sources, shapes):
+            raw_columns = resolve_raw_columns(df, shape, mapping, wanted)
+            if raw_columns is not None:
+                source_columns[source] = raw_columns
+        
+        columns = []
+        projection_stats = {}
+        for filename in filenames:
+            upload_sources = [i for i, upload in enumerate(sample_uploads) if upload == filename]
+            if not upload_sources or any(sample_sources[i] not in source_columns for i in upload_sources):
+                columns.append(None)
+                projection_stats[filename] = None
+                continue
+            
+            upload_columns = list(dict.fromkeys(
+                col for i in upload_sources for col in source_columns[sample_sources[i]]
+            ))
+            columns.append(upload_columns)
+            projection_stats[filename] = {
+                'columns_read': len(upload_columns),
+                'columns_available': len({col for i in upload_sources for col in sample_dfs[i].columns})
+            }
+        
+        self.processing_stats['column_projection'] = {
+            'wanted_columns': list(self.wanted_columns),
+            'uploads': projection_stats
+        }
+        return columns, source_columns
+    
+    def _filter_rows(self, df: pd.DataFrame, stage: str) -> pd.DataFrame:
+        """
+        Apply the run's row filter, counting the rows removed at each stage
+        in processing_stats['row_filter'].
+        """
+        filtered = filter_rows(df, self.filters)
+        stats = self.processing_stats.setdefault('row_filter', {
+            'rows_removed_before_reshape': 0,
+            'rows_removed_after_reshape': 0
+        })
+        stats[f"rows_removed_{stage}"] += len(df) - len(filtered)
+        return filtered
+    
+    def _independent_handles(self, file_obj: Any) -> Tuple[Any, Any]:
+        """
+        Give the sampler and the background parse their own handle on an
+        upload. Paths are shared; streams are read once into bytes, which
+        both buffers share without copying.
+        """
+        if isinstance(file_obj, (str, os.PathLike)):
+            return file_obj, file_obj
+        if hasattr(file_obj, 'seek'):
+            file_obj.seek(0)
+        data = file_obj.read()
+        if isinstance(data, str):
+            return io.StringIO(data), io.StringIO(data)
+        return io.BytesIO(data), io.BytesIO(data)
+    
+    def _stream_source(self, chunks: Iterator[Tuple[pd.DataFrame, Dict[str, Any]]],
+                       source: str) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """
+        Shape-detect and reshape a single source chunk by chunk.
+        """
+        shape = None
+        reshaped_chunks = []
+        pending_chunks = []  # Raw chunks for shapes that are not chunk-safe
+        metadata = {}
+        
+        for chunk, metadata in chunks:
+            if shape is None:
+                shape = self.detect_shapes([chunk], [source])[0]
+            
+            if shape in CHUNK_SAFE_SHAPES:
+                if self.filters:
+                    # Each row is an observation, so the filter applies before reshaping
+                    chunk = self._filter_rows(chunk, 'before_reshape')
+                    if chunk.empty:
+                        continue
+                try:
+                    reshaped_chunks.append(reshape_to_panel_format(chunk, shape, source,
+                                                                   periods=period_range(self.filters)))
+                except Exception as e:
+                    print(f"[Pipeline] Error reshaping chunk {metadata['chunk_index']} of {source}: {e}")
+                    reshaped_chunks.append(chunk)
+            else:
+                pending_chunks.append(chunk)
+        
+        if pending_chunks:
+            df = pd.concat(pending_chunks, ignore_index=True)
+            pending_chunks = []
+            try:
+                reshaped_chunks.append(reshape_to_panel_format(df, shape or 'unknown', source,
+                                                               periods=period_range(self.filters)))
+            except Exception as e:
+                print(f"[Pipeline] Error reshaping {source}: {e}")
+                reshaped_chunks.append(df)
+        
+        if reshaped_chunks:
+            reshaped_df = combine_reshaped_chunks(reshaped_chunks, shape)
+        else:
+            reshaped_df = pd.DataFrame()
+        
+        print(f"[Pipeline] Streamed {source}: {metadata.get('rows', 0)} rows in "
+              f"{metadata.get('chunk_index', -1) + 1} chunk(s), reshaped to {reshaped_df.shape}")
+        
+        file_stats = {
+            'filename': source,
+            'rows': metadata.get('rows', 0),
+            'columns': metadata.get('columns', 0),
+            'chunks': metadata.get('chunk_index', -1) + 1
+        }
+        return reshaped_df, file_stats
     
     def detect_shapes(self, dataframes: List[pd.DataFrame], sources: List[str]) -> List[str]:
         """
         Step 2: Shape Detection (AI)
-        Extract sample and send to OpenAI for format detection.
+        Extract a sample of each file and classify it locally. Files the
+        local classifier isn't confident about are sent to OpenAI for format
+        detection concurrently, results in source order.
         """
-        shapes = []
+        # Extract samples (headers + a few rows)
+        samples = [df.head(5) for df in dataframes]  # First 5 rows for context
         
-        for df, source in zip(dataframes, sources):
+        ask_ai = self._ai_enabled()
+        if ask_ai:
+            # Send to AI for shape detection, except layouts already cached
             try:
-                # Extract sample (headers + a few rows)
-                sample_df = df.head(5)  # First 5 rows for context
-                
-                if self.use_openai and self.api_key:
-                    # Send to AI for shape detection
-                    shape = detect_data_shape(sample_df, self.api_key)
-                else:
+                detections = detect_data_shapes(samples, self.api_key, cache=self.shape_cache,
+                                                max_concurrency=self.shape_concurrency,
+                                                timeout=self.shape_timeout,
+                                                base_url=self.api_base_url,
+                                                batched=self.batch_shape_detection,
+                                                confidence_threshold=self.shape_confidence_threshold,
+                                                governor=self.ai_governor)
+            except Exception as e:
+                print(f"[Pipeline] Error detecting shapes: {e}")
+                detections = [None] * len(samples)
+        else:
+            detections = [None] * len(samples)
+        self._record_ai_stats()
+        
+        shapes = []
+        for sample_df, source, detection in zip(samples, sources, detections):
+            try:
+                if detection is None:
                     # Fallback to local detection
-                    shape = self._local_shape_detection(sample_df)
-                
+                    classification = classify_shape(sample_df)
+                    detection = {'shape': classification['shape'], 'detected_by': 'local',
+                                 'confidence': classification['confidence']}
+                shape = detection['shape']
                 shapes.append(shape)
                 
                 # Update audit trail
-                self.audit_trail['shape_detections'].append({
+                audit_entry = {
                     'source': source,
                     'detected_shape': shape,
+                    'detected_by': detection['detected_by'],
+                    'local_confidence': detection['confidence'],
                     'sample_rows': len(sample_df)
-                })
+                }
+                stats = self.processing_stats.setdefault('shape_detection', {'local': 0, 'cache': 0, 'ai': 0})
+                stats[detection['detected_by']] += 1
+                # Only files the local classifier wasn't sure of were looked up
+                escalated = (self.shape_confidence_threshold is None
+                             or detection['confidence'] < self.shape_confidence_threshold)
+                if self.shape_cache is not None and ask_ai and escalated:
+                    audit_entry['shape_cache'] = 'hit' if detection['detected_by'] == 'cache' else 'miss'
+                    self._record_shape_cache(audit_entry['shape_cache'])
+                self.audit_trail['shape_detections'].append(audit_entry)
                 
             except Exception as e:
                 print(f"[Pipeline] Error detecting shape for {source}: {e}")
@@ -162,16 +590,53 @@ class DataHarmonizationPipeline:
         
         return shapes
     
-    def reshape_data(self, dataframes: List[pd.DataFrame], shapes: List[str], sources: List[str]) -> List[pd.DataFrame]:
+    def _ai_enabled(self) -> bool:
+        """
+        Whether this step should call the AI: it's configured, and the
+        run's governor has budget left and a closed (or half-open) circuit.
+        """
+        if not (self.use_openai and self.api_key):
+            return False
+        if not self.ai_governor.available():
+            print(f"[Pipeline] Skipping AI, using local fallbacks (circuit {self.ai_governor.breaker.state}, "
+                  f"budget left {self.ai_governor.remaining()}s)")
+            return False
+        return True
+    
+    def _record_ai_stats(self) -> None:
+        """
+        Copy the governor's counters, including seconds spent waiting on the
+        AI, into processing_stats['ai_calls'].
+        """
+        self.processing_stats['ai_calls'] = self.ai_governor.stats()
+    
+    def _record_shape_cache(self, outcome: str) -> None:
+        """
+        Count a shape cache lookup in processing_stats['shape_cache'].
+        """
+        stats = self.processing_stats.setdefault('shape_cache', {'hits': 0, 'misses': 0, 'hit_rate': 0.0})
+        stats['hits' if outcome == 'hit' else 'misses'] += 1
+        stats['hit_rate'] = round(stats['hits'] / (stats['hits'] + stats['misses']), 4)
+        stats['entries'] = self.shape_cache.stats()['entries']
+    
+    def reshape_data(self, dataframes: List[pd.DataFrame], shapes: List[str], sources: List[str],
+                     columns: Optional[List[Optional[List[str]]]] = None) -> List[pd.DataFrame]:
         """
         Step 3: Local Reshaping
-        Use detected type to reshape data into panel format.
+        Use detected type to reshape data into panel format, optionally
+        limited to the given raw columns of each source. With a row filter,
+        files whose rows are observations are filtered first and wide
+        headers outside the period range are never melted.
         """
         reshaped_dfs = []
-        for df, shape, source in zip(dataframes, shapes, sources):
+        columns = columns if columns is not None else [None] * len(dataframes)
+        for df, shape, source, source_columns in zip(dataframes, shapes, sources, columns):
             try:
+                if self.filters and shape in CHUNK_SAFE_SHAPES:
+                    df = self._filter_rows(df, 'before_reshape')
                 # Reshape based on detected format
-                reshaped_df = reshape_to_panel_format(df, shape, source)
+                reshaped_df = reshape_to_panel_format(df, shape, source, columns=source_columns,
+                                                      periods=period_range(self.filters))
                 reshaped_dfs.append(reshaped_df)
                 
                 # Detailed printing for testing
@@ -229,13 +694,15 @@ class DataHarmonizationPipeline:
         
         # 4.1. Context-Aware Harmonization (AI)
         ai_mappings = {}
-        if self.use_openai and self.api_key:
+        if self._ai_enabled():
             try:
                 context = f"economic/business/econometric and financial data from multiple sources."
-                ai_mappings = harmonize_columns(all_columns, context=context, api_key=self.api_key, sample_data=sample_data)
+                ai_mappings = harmonize_columns(all_columns, context=context, api_key=self.api_key, sample_data=sample_data,
+                                                governor=self.ai_governor)
                 print(f"[Pipeline] AI harmonization completed for {len(ai_mappings)} columns")
             except Exception as e:
                 print(f"[Pipeline] AI harmonization failed: {e}")
+        self._record_ai_stats()
         
         # 4.2. Receive AI mappings with confidence scores
         final_mapping = {}
@@ -293,8 +760,11 @@ class DataHarmonizationPipeline:
             # Create mapping for columns that exist in this DataFrame
             df_mapping = {col: mapping.get(col, col) for col in df.columns}
             
-            # Rename columns
+            # Rename columns, and the identifiers the reshaper recorded with them
             harmonized_df = df.rename(columns=df_mapping)
+            id_columns = panel_id_columns(df)
+            if id_columns is not None:
+                harmonized_df.attrs[ID_COLUMNS_ATTR] = [df_mapping.get(col, col) for col in id_columns]
             harmonized_dfs.append(harmonized_df)
         
         return harmonized_dfs
@@ -314,6 +784,22 @@ class DataHarmonizationPipeline:
         
         return source_dfs
     
+    def _known_id_columns(self, dataframes: List[pd.DataFrame]) -> Optional[List[str]]:
+        """
+        Identifier columns of the merged frame: those the reshaper recorded
+        for each source, or None if it couldn't for some source, in which case
+        the deduplicator finds them itself.
+        """
+        id_columns = []
+        for df in dataframes:
+            if df.empty:
+                continue
+            known = panel_id_columns(df)
+            if known is None:
+                return None
+            id_columns.extend(known)
+        return list(dict.fromkeys(id_columns)) or None
+    
     def merge_dataframes(self, dataframes: List[pd.DataFrame]) -> pd.DataFrame:
         """
         Step 7: Merge All DataFrames
@@ -325,6 +811,13 @@ class DataHarmonizationPipeline:
         # Concatenate all DataFrames vertically
         merged_df = pd.concat(dataframes, ignore_index=True, sort=False)
         
+        # Categorical and nullable columns can't hold the 'NaN' marker;
+        # fall back to object for those that have gaps to fill
+        for col in merged_df.columns[merged_df.isna().any()]:
+            dtype = merged_df[col].dtype
+            if pd.api.types.is_extension_array_dtype(dtype) and not isinstance(dtype, pd.StringDtype):
+                merged_df[col] = merged_df[col].astype(object)
+        
         # Fill missing values with 'NaN'
         merged_df = merged_df.fillna('NaN')
         
@@ -338,7 +831,7 @@ class DataHarmonizationPipeline:
         """
         try:
             print(f"[Pipeline] Starting data cleaning for {len(df)} rows, {len(df.columns)} columns")
-            cleaned_df = clean_master_dataframe(df)
+            cleaned_df = clean_master_dataframe(df, chunk_rows=self.chunk_size)
             print(f"[Pipeline] Data cleaning completed successfully")
             
             # Update audit trail with cleaning actions
@@ -353,14 +846,16 @@ class DataHarmonizationPipeline:
             print(f"[Pipeline] ERROR in clean_master_dataframe: {e}")
             raise e
     
-    def remove_duplicates(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    def remove_duplicates(self, df: pd.DataFrame,
+                          id_columns: Optional[List[str]] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
         """
         Step 9: Remove True Duplicates
-        Identify duplicates by firm_id and time key(s).
+        Identify duplicates by firm_id and time key(s), or by `id_columns`
+        when reshaping recorded them.
         """
         try:
             print(f"[Pipeline] Starting duplicate removal for {len(df)} rows")
-            final_df, duplicates_df = remove_duplicates(df)
+            final_df, duplicates_df = remove_duplicates(df, id_columns)
             print(f"[Pipeline] Duplicate removal completed: {len(final_df)} clean records, {len(duplicates_df)} duplicates")
             
             # Update audit trail
@@ -445,9 +940,9 @@ class DataHarmonizationPipeline:
         """
         try:
             print(f"[Pipeline] Starting results export")
-            output_path = 'uploads/MASTER.csv'
+            output_path = self.output_path
             # Ensure the export directory exists
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
             
             with open(output_path, 'w', newline='', encoding='utf-8') as f:
                 # Write clean dataset
@@ -478,40 +973,3 @@ class DataHarmonizationPipeline:
         except Exception as e:
             print(f"[Pipeline] ERROR in export_results: {e}")
             raise e
-    
-    def _extract_zip_files(self, zip_file) -> List[Tuple[str, io.BytesIO]]:
-        """Extract files from ZIP archive."""
-        extracted_files = []
-        try:
-            with zipfile.ZipFile(zip_file) as z:
-                for name in z.namelist():
-                    if name.endswith(('.csv', '.xlsx')):
-                        file_stream = io.BytesIO(z.read(name))
-                        extracted_files.append((name, file_stream))
-        except Exception as e:
-            print(f"[Pipeline] Error extracting ZIP file: {e}")
-        return extracted_files
-    
-    def _local_shape_detection(self, sample_df: pd.DataFrame) -> str:
-        """Local fallback for shape detection."""
-        # Simple heuristics for shape detection
-        columns = sample_df.columns.tolist()
-        
-        # Check for classic wide format (revenue_2020, emp_2021)
-        if any('_' in col and col.split('_')[-1].isdigit() for col in columns):
-            return 'wide'
-        
-        # Check for wide year prefix (2020_revenue, 2021_emp)
-        if any(col.split('_')[0].isdigit() for col in columns if '_' in col):
-            return 'wide_year_prefix'
-        
-        # Check for key-value format
-        if 'variable' in columns and 'value' in columns:
-            return 'key_value'
-        
-        # Check for stacked multi-year long
-        if 'year' in columns:
-            return 'stacked_multi_year_long'
-        
-        # Default to unknown
-        return 'unknown' 
\ No newline at end of file
@@ -0,0 +1,191 @@
+"""
+Tests for the AI call governor: retries, budget, circuit breaker and the
+pipeline falling back to local detection when the AI is slow or down.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+import pandas as pd
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ai.callGovernor import AICallGovernor, AIUnavailable, CircuitBreaker, BACKOFF_BASE
+from ai.stubServer import StubChatServer
+import pipeline as pipeline_module
+from pipeline import DataHarmonizationPipeline
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class StatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def _failing(times: int, error=None):
+    """A request that fails `times` times, then answers 'ok'."""
+    state = {'attempts': 0, 'timeouts': []}
+
+    def request(timeout):
+        state['attempts'] += 1
+        state['timeouts'].append(timeout)
+        if state['attempts'] <= times:
+            raise error or ConnectionError("upstream unavailable")
+        return 'ok'
+    return request, state
+
+
+def test_retries_with_jittered_backoff():
+    clock = FakeClock()
+    sleeps = []
+    governor = AICallGovernor(budget_seconds=None, max_retries=2, clock=clock,
+                              sleep=lambda seconds: sleeps.append(seconds))
+    request, state = _failing(2)
+    assert governor.call(request) == 'ok'
+
+    assert state['attempts'] == 3
+    assert len(sleeps) == 2 and 0 <= sleeps[0] <= BACKOFF_BASE and 0 <= sleeps[1] <= 2 * BACKOFF_BASE
+    stats = governor.stats()
+    assert (stats['calls'], stats['retries'], stats['failures'], stats['circuit']) == (1, 2, 2, 'closed')
+
+
+def test_client_errors_are_not_retried():
+    governor = AICallGovernor(budget_seconds=None, sleep=lambda seconds: None)
+    request, state = _failing(5, StatusError(401))
+    try:
+        governor.call(request)
+    except StatusError:
+        pass
+    else:
+        raise AssertionError("the 401 should have been raised")
+    assert state['attempts'] == 1
+
+
+def test_budget_limits_timeouts_and_refuses_when_spent():
+    clock = FakeClock()
+    governor = AICallGovernor(budget_seconds=5.0, call_timeout=4.0, clock=clock, sleep=clock.sleep)
+
+    def slow(timeout):
+        clock.now += 3.0
+        return timeout
+
+    assert governor.call(slow) == 4.0
+    # Only two seconds of budget are left for the second call
+    assert governor.call(slow) == 2.0
+    try:
+        governor.call(slow)
+    except AIUnavailable:
+        pass
+    else:
+        raise AssertionError("the third call should have been refused")
+    stats = governor.stats()
+    assert stats['refused'] == 1 and stats['wait_seconds'] == 6.0 and stats['budget_remaining_seconds'] == 0.0
+    assert not governor.available()
+
+
+def test_circuit_opens_and_recovers():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, cooldown_seconds=10.0, clock=clock)
+    governor = AICallGovernor(budget_seconds=None, max_retries=0, breaker=breaker, clock=clock)
+    request, state = _failing(2)
+    for _ in range(2):
+        try:
+            governor.call(request)
+        except ConnectionError:
+            pass
+    assert breaker.state == 'open'
+
+    # Another run under the same breaker doesn't reach the API
+    other_run = AICallGovernor(budget_seconds=None, breaker=breaker, clock=clock)
+    try:
+        other_run.call(request)
+    except AIUnavailable:
+        pass
+    assert state['attempts'] == 2
+
+    clock.now += 10.0
+    assert breaker.state == 'half_open'
+    assert other_run.call(request) == 'ok'
+    assert breaker.state == 'closed'
+
+
+def test_pipeline_falls_back_when_the_ai_is_slow():
+    ambiguous = [pd.DataFrame({'a': ['x', 'y'], 'b': ['p', 'q']}),
+                 pd.DataFrame({'c': ['x', 'y'], 'd': ['p', 'q']})]
+    with StubChatServer(lambda body: 'cross_tab', delay=3.0) as server:
+        pipeline = DataHarmonizationPipeline(api_key='test-key', api_base_url=server.base_url,
+                                             ai_budget_seconds=0.5)
+        started = time.perf_counter()
+        shapes = pipeline.detect_shapes(ambiguous, ['a.csv', 'b.csv'])
+        assert time.perf_counter() - started < 2.0
+
+    assert [d['detected_by'] for d in pipeline.audit_trail['shape_detections']] == ['local', 'local']
+    assert len(shapes) == 2
+    stats = pipeline.processing_stats['ai_calls']
+    assert stats['failures'] >= 1 and stats['wait_seconds'] > 0
+    assert stats['budget_remaining_seconds'] == 0.0
+
+    # With the budget spent, later steps don't call the AI at all
+    pipeline.harmonize_columns([pd.DataFrame({'firm_id': ['A1'], 'revenue': [1]})], ['a.csv'])
+    assert pipeline.processing_stats['ai_calls']['calls'] == stats['calls']
+
+
+def test_local_work_between_calls_is_not_charged():
+    """A slow local step between two AI steps leaves the second one its budget."""
+    files = [b"a,b\nx,p\ny,q\n", b"c,d\nx,p\ny,q\n"]
+    harmonize_columns = pipeline_module.harmonize_columns
+
+    def governed_harmonize(columns, governor=None, **kwargs):
+        # One governed call standing in for the harmonizer's request
+        governor.call(lambda timeout: time.sleep(0.05))
+        return {}
+
+    with StubChatServer(lambda body: 'cross_tab', delay=0.05) as server, \
+            tempfile.TemporaryDirectory() as tmp_dir:
+        pipeline = DataHarmonizationPipeline(api_key='test-key', api_base_url=server.base_url,
+                                             ai_budget_seconds=1.0,
+                                             output_path=os.path.join(tmp_dir, 'MASTER.csv'))
+        reshape_data = pipeline.reshape_data
+        calls_before_reshape = []
+
+        def slow_reshape(*args, **kwargs):
+            calls_before_reshape.append(pipeline.ai_governor.counters['calls'])
+            time.sleep(1.5)
+            return reshape_data(*args, **kwargs)
+
+        pipeline.reshape_data = slow_reshape
+        pipeline_module.harmonize_columns = governed_harmonize
+        try:
+            pipeline.run([BytesIO(data) for data in files], ['a.csv', 'b.csv'])
+        finally:
+            pipeline_module.harmonize_columns = harmonize_columns
+
+    assert len(server.requests) >= 1 and calls_before_reshape[0] >= 1
+    stats = pipeline.processing_stats['ai_calls']
+    assert stats['calls'] == calls_before_reshape[0] + 1 and stats['refused'] == 0
+    assert 0 < stats['budget_remaining_seconds'] < 1.0
+
+
+if __name__ == "__main__":
+    test_retries_with_jittered_backoff()
+    test_client_errors_are_not_retried()
+    test_budget_limits_timeouts_and_refuses_when_spent()
+    test_circuit_opens_and_recovers()
+    test_pipeline_falls_back_when_the_ai_is_slow()
+    test_local_work_between_calls_is_not_charged()
+    print("AI governor tests passed.")
@@ -0,0 +1,112 @@
+"""
+Tests for concurrent and batched shape detection against a local stub of the chat API.
+"""
+
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ai.shapeDetection import detect_data_shapes
+from ai.stubServer import StubChatServer
+
+
+def _sample(index: int) -> pd.DataFrame:
+    # Distinct headers so every sample has its own fingerprint
+    return pd.DataFrame({f"id_{'x' * index}": ['A', 'B'], 'value_2020': [1.0, 2.0]})
+
+
+def _answer_by_header(body) -> str:
+    """Answer 'wide' for samples with an even index and 'cross_tab' for odd ones."""
+    header = body['messages'][-1]['content'].split('id_')[1]
+    return 'cross_tab' if (len(header) - len(header.lstrip('x'))) % 2 else 'wide'
+
+
+def test_results_in_order_and_concurrency_capped():
+    samples = [_sample(i) for i in range(8)]
+    with StubChatServer(_answer_by_header, delay=0.2) as server:
+        started = time.perf_counter()
+        results = detect_data_shapes(samples, api_key='test-key', max_concurrency=4,
+                                     base_url=server.base_url)
+        elapsed = time.perf_counter() - started
+
+        assert len(server.requests) == 8
+        assert 1 < server.max_in_flight <= 4
+
+    expected = ['cross_tab' if i % 2 else 'wide' for i in range(8)]
+    assert [r['shape'] for r in results] == expected
+    assert all(r['detected_by'] == 'ai' for r in results)
+    # Eight 0.2s requests four at a time take about two rounds, not eight
+    assert elapsed < 8 * 0.2
+
+
+def test_identical_layouts_sent_once():
+    samples = [_sample(1), _sample(1), _sample(2)]
+    with StubChatServer(lambda body: 'wide') as server:
+        results = detect_data_shapes(samples, api_key='test-key', base_url=server.base_url)
+        assert len(server.requests) == 2
+    assert [r['shape'] for r in results] == ['wide'] * 3
+
+
+def test_timeout_falls_back_to_local():
+    key_value = pd.DataFrame({'variable': ['x', 'y'], 'value': [1, 2]})
+    with StubChatServer(lambda body: 'wide', delay=2.0) as server:
+        started = time.perf_counter()
+        [result] = detect_data_shapes([key_value], api_key='test-key', timeout=0.3,
+                                      base_url=server.base_url)
+        assert time.perf_counter() - started < 2.0
+
+    assert result['shape'] == 'key_value'
+    assert result['detected_by'] == 'local'
+
+
+def _prompt_tokens(server: StubChatServer) -> int:
+    return sum(len(message['content']) for body in server.requests for message in body['messages']) // 4
+
+
+def test_batched_mode_sends_one_request():
+    samples = [_sample(i) for i in range(6)]
+    with StubChatServer(_answer_by_header) as server:
+        one_by_one = detect_data_shapes(samples, api_key='test-key', base_url=server.base_url)
+        per_file_tokens = _prompt_tokens(server)
+
+    formats = {str(i): 'cross_tab' if i % 2 else 'wide' for i in range(6)}
+    with StubChatServer(lambda body: json.dumps({'formats': formats})) as server:
+        batched = detect_data_shapes(samples, api_key='test-key', base_url=server.base_url, batched=True)
+        assert len(server.requests) == 1
+        assert server.requests[0]['response_format'] == {'type': 'json_object'}
+        # The format descriptions are sent once instead of six times
+        assert _prompt_tokens(server) < per_file_tokens / 3
+
+    assert batched == one_by_one
+
+
+def test_batched_mode_retries_missing_and_invalid_samples():
+    samples = [_sample(i) for i in range(4)]
+
+    def respond(body):
+        if 'formats' in body['messages'][-1]['content']:
+            # Sample 1 is left out and sample 2 gets a made-up format
+            return json.dumps({'formats': {'0': 'wide', '2': 'zigzag', '3': 'Cross_Tab'}})
+        return _answer_by_header(body)
+
+    with StubChatServer(respond) as server:
+        results = detect_data_shapes(samples, api_key='test-key', base_url=server.base_url, batched=True)
+        assert len(server.requests) == 3
+
+    assert [r['shape'] for r in results] == ['wide', 'cross_tab', 'wide', 'cross_tab']
+    assert all(r['detected_by'] == 'ai' for r in results)
+
+
+if __name__ == "__main__":
+    test_results_in_order_and_concurrency_capped()
+    test_identical_layouts_sent_once()
+    test_timeout_falls_back_to_local()
+    test_batched_mode_sends_one_request()
+    test_batched_mode_retries_missing_and_invalid_samples()
+    print("Async shape detection tests passed.")
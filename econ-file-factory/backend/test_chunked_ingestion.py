@@ -0,0 +1,103 @@
+"""
+Tests for chunked (streaming) ingestion and the chunk-aware pipeline path.
+"""
+
+import os
+import sys
+from io import BytesIO
+
+import pandas as pd
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from local.ingest.readers import read_file, read_file_chunks
+from pipeline import DataHarmonizationPipeline
+
+
+def _wide_csv(rows: int) -> bytes:
+    lines = ["firm_id,revenue_2020,revenue_2021,employees_2020,employees_2021"]
+    for i in range(rows):
+        lines.append(f"F{i:04d},{1000 + i},{1100 + i},{50 + i},{55 + i}")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def test_read_file_chunks_bounded():
+    """Chunks never exceed the requested size and add up to the full file."""
+    data = _wide_csv(25)
+    chunks = list(read_file_chunks(BytesIO(data), "wide.csv", chunksize=10))
+
+    assert [len(chunk) for chunk, _ in chunks] == [10, 10, 5]
+    _, last_metadata = chunks[-1]
+    assert last_metadata['rows'] == 25
+    assert last_metadata['chunk_index'] == 2
+    assert last_metadata['file_type'] == 'csv'
+
+    full_df, _ = read_file(BytesIO(data), "wide.csv")
+    streamed_df = pd.concat([chunk for chunk, _ in chunks], ignore_index=True)
+    pd.testing.assert_frame_equal(full_df, streamed_df)
+
+
+def test_encoding_switches_mid_stream():
+    """A non-UTF-8 byte past the detection sample switches encoding without a re-parse."""
+    data = ("name,value\n" + "plain,1\n" * 20000 + "Málaga,2\n").encode("cp1252")
+
+    df, metadata = read_file(BytesIO(data), "late_accent.csv")
+    assert df['name'].iloc[-1] == "Málaga"
+    assert metadata['encoding_detected'] == 'utf-8'
+    assert metadata['encoding'] == 'cp1252'
+    assert metadata['encoding_switches'][0]['byte_offset'] == data.index("á".encode("cp1252"))
+
+    chunks = list(read_file_chunks(BytesIO(data), "late_accent.csv", chunksize=5000))
+    assert chunks[-1][0]['name'].iloc[-1] == "Málaga"
+    assert chunks[-1][1]['encoding_switches'] == metadata['encoding_switches']
+
+
+def test_chunked_pipeline_matches_full_read():
+    """The streaming path produces the same reshaped panel as the full read."""
+    data = _wide_csv(30)
+
+    full = DataHarmonizationPipeline(use_openai=False)
+    dataframes, sources = full.ingest_files([BytesIO(data)], ["wide.csv"])
+    shapes = full.detect_shapes(dataframes, sources)
+    expected = full.reshape_data(dataframes, shapes, sources)[0]
+
+    chunked = DataHarmonizationPipeline(use_openai=False, chunk_size=7)
+    reshaped, chunked_sources = chunked.ingest_and_reshape_chunked([BytesIO(data)], ["wide.csv"])
+
+    assert chunked_sources == ["wide.csv"]
+    assert chunked.audit_trail['files_processed'][0]['chunks'] == 5
+    actual = reshaped[0].sort_values(['firm_id', 'period']).reset_index(drop=True)
+    expected = expected.sort_values(['firm_id', 'period']).reset_index(drop=True)
+    pd.testing.assert_frame_equal(actual, expected[actual.columns])
+
+
+def test_wide_key_repeated_across_chunks():
+    """A firm listed again in a later chunk is merged as the full reshape merges it."""
+    lines = _wide_csv(12).decode().splitlines()
+    # F0002 again in the second chunk, with a revenue_2020 the first row left empty
+    lines[3] = "F0002,,1102,52,57"
+    lines.append("F0002,999,888,77,66")
+    data = ("\n".join(lines) + "\n").encode("utf-8")
+
+    full = DataHarmonizationPipeline(use_openai=False)
+    dataframes, sources = full.ingest_files([BytesIO(data)], ["wide.csv"])
+    expected = full.reshape_data(dataframes, ['wide'], sources)[0]
+
+    chunked = DataHarmonizationPipeline(use_openai=False, chunk_size=7)
+    reshaped, _ = chunked.ingest_and_reshape_chunked([BytesIO(data)], ["wide.csv"])
+
+    assert len(reshaped[0]) == len(expected) == 24
+    actual = reshaped[0].sort_values(['firm_id', 'period']).reset_index(drop=True)
+    expected = expected.sort_values(['firm_id', 'period']).reset_index(drop=True)
+    pd.testing.assert_frame_equal(actual, expected[actual.columns])
+    f0002 = actual[actual['firm_id'] == 'F0002'].set_index('period')
+    assert f0002.loc['2020', 'revenue'] == 999 and f0002.loc['2021', 'revenue'] == 1102
+
+
+if __name__ == "__main__":
+    test_read_file_chunks_bounded()
+    test_encoding_switches_mid_stream()
+    test_chunked_pipeline_matches_full_read()
+    test_wide_key_repeated_across_chunks()
+    print("Chunked ingestion tests passed.")
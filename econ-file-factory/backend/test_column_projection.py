@@ -0,0 +1,110 @@
+"""
+Tests for column projection: reading only the raw columns behind the wanted
+canonical columns.
+"""
+
+import os
+import sys
+import tempfile
+from io import BytesIO
+
+import pandas as pd
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from local.ingest.excel import read_excel_streaming
+from local.ingest.readers import read_upload
+from local.wrangler.columnProjector import resolve_raw_columns
+from pipeline import DataHarmonizationPipeline
+
+
+def _wide_csv(rows: int) -> bytes:
+    lines = ["firm_id,region,revenue_2020,revenue_2021,employees_2020,employees_2021"]
+    for i in range(rows):
+        lines.append(f"F{i:04d},North,{1000 + i},{1100 + i},{50 + i},{55 + i}")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def test_readers_skip_unwanted_columns():
+    """Every format reads just the requested columns; unknown names are ignored."""
+    df = pd.read_csv(BytesIO(_wide_csv(20)))
+    wanted = ['firm_id', 'revenue_2021', 'not_in_file']
+    expected = df[['firm_id', 'revenue_2021']]
+
+    workbook = BytesIO()
+    df.to_excel(workbook, index=False)
+    parquet = BytesIO()
+    df.to_parquet(parquet, index=False)
+    feather = BytesIO()
+    df.to_feather(feather)
+
+    for data, filename in [(_wide_csv(20), "wide.csv"), (workbook.getvalue(), "wide.xlsx"),
+                           (parquet.getvalue(), "wide.parquet"), (feather.getvalue(), "wide.feather")]:
+        [(projected, metadata, _)] = read_upload(BytesIO(data), filename, columns=wanted)
+        assert metadata['columns_projected'] is True
+        pd.testing.assert_frame_equal(projected, expected, check_dtype=False)
+
+    streamed, _ = read_excel_streaming(BytesIO(workbook.getvalue()), "wide.xlsx", columns=wanted)
+    pd.testing.assert_frame_equal(streamed, expected, check_dtype=False)
+
+
+def test_resolve_raw_columns():
+    sample = pd.read_csv(BytesIO(_wide_csv(5)))
+    mapping = {'firm_id': 'firm_id', 'region': 'region', 'revenue': 'sales', 'employees': 'employees'}
+
+    # Headers without a period are identifiers and always kept
+    assert resolve_raw_columns(sample, 'wide', mapping, ['sales']) == [
+        'firm_id', 'region', 'revenue_2020', 'revenue_2021'
+    ]
+    assert resolve_raw_columns(sample, 'cross_tab', mapping, ['sales']) is None
+
+    long_sample = pd.DataFrame({'country': ['IE', 'FR'], 'year': [2020, 2020],
+                                'gdp': [1.0, 2.0], 'cpi': [3.0, 4.0]})
+    assert resolve_raw_columns(long_sample, 'stacked_multi_time_long', {}, ['cpi']) == [
+        'country', 'year', 'cpi'
+    ]
+
+    # Identifiers come from the header, so ids that look like years don't matter
+    firm_sample = pd.DataFrame({'firm_id': ['F0001', 'F0002'], 'region': ['North', 'South'],
+                                'year': [2020, 2020], 'gdp': [1.0, 2.0], 'cpi': [3.0, 4.0]})
+    assert resolve_raw_columns(firm_sample, 'stacked_multi_time_long', {}, ['cpi']) == [
+        'firm_id', 'region', 'year', 'cpi'
+    ]
+    assert resolve_raw_columns(long_sample.rename(columns={'year': 'when'}),
+                               'stacked_multi_time_long', {}, ['cpi']) is None
+
+
+def test_projected_run_matches_full_run():
+    """A projected run parses fewer columns and returns the wanted slice of a full run."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_path = os.path.join(tmp_dir, 'MASTER.csv')
+        full = DataHarmonizationPipeline(use_openai=False, output_path=output_path).run(
+            [BytesIO(_wide_csv(30))], ["wide.csv"])
+
+        pipeline = DataHarmonizationPipeline(use_openai=False, wanted_columns=['revenue'],
+                                             output_path=output_path)
+        projected = pipeline.run([BytesIO(_wide_csv(30))], ["wide.csv"])
+
+    assert projected['success'], projected.get('error')
+    stats = pipeline.processing_stats['column_projection']['uploads']['wide.csv']
+    assert stats == {'columns_read': 4, 'columns_available': 6}
+    assert pipeline.audit_trail['files_processed'][0]['columns_projected'] is True
+    assert 'employees' not in projected['master_df'].columns
+
+    # The period and static columns survive, under their harmonized names,
+    # and every firm keeps one row per year
+    harmonized = {d['original']: d['mapped_to'] for d in pipeline.audit_trail['harmonization_decisions']}
+    assert {'firm_id', 'region', harmonized['period']} <= set(projected['master_df'].columns)
+    assert len(projected['master_df']) == len(full['master_df']) == 60
+
+    expected = full['master_df'][list(projected['master_df'].columns)]
+    pd.testing.assert_frame_equal(projected['master_df'].reset_index(drop=True),
+                                  expected.reset_index(drop=True))
+
+
+if __name__ == "__main__":
+    test_readers_skip_unwanted_columns()
+    test_resolve_raw_columns()
+    test_projected_run_matches_full_run()
+    print("Column projection tests passed.")
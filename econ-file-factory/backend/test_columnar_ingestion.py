@@ -0,0 +1,115 @@
+"""
+Tests for Parquet, Feather and Arrow IPC inputs.
+"""
+
+import os
+import sys
+import tempfile
+import zipfile
+from io import BytesIO
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from local.ingest import columnar
+from local.ingest.readers import read_file, read_file_chunks, read_upload
+from app import allowed_file
+
+
+def _panel() -> pd.DataFrame:
+    return pd.DataFrame({
+        'country': ['IE', 'IE', 'FR', 'FR', 'DE'],
+        'year': [2020, 2021, 2020, 2021, 2020],
+        'gdp': [1.5, 1.7, 2.1, 2.3, 3.9],
+    })
+
+
+def _write_all(directory: str) -> dict:
+    table = pa.Table.from_pandas(_panel(), preserve_index=False)
+    paths = {ext: os.path.join(directory, f"panel.{ext}") for ext in ('parquet', 'feather', 'arrow')}
+    pq.write_table(table, paths['parquet'], row_group_size=2)
+    feather.write_feather(table, paths['feather'])
+    with pa.OSFile(paths['arrow'], 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return paths
+
+
+def test_columnar_formats_read_like_csv():
+    """Each columnar format yields the same frame and metadata keys as a CSV."""
+    csv_df, csv_metadata = read_file(BytesIO(_panel().to_csv(index=False).encode()), "panel.csv")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for ext, path in _write_all(tmp_dir).items():
+            df, metadata = read_file(path, f"panel.{ext}")
+            pd.testing.assert_frame_equal(df, csv_df)
+            assert metadata['file_type'] == ext
+            assert metadata['memory_mapped'] is True
+            assert {'rows', 'columns', 'column_names'} <= set(metadata)
+            assert metadata['column_names'] == csv_metadata['column_names']
+
+            with open(path, 'rb') as fh:
+                projected, metadata = read_file(BytesIO(fh.read()), f"panel.{ext}", columns=['country', 'gdp'])
+            assert list(projected.columns) == ['country', 'gdp']
+            assert metadata['columns_projected'] is True
+
+
+def test_columnar_chunks_and_zip_members():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = _write_all(tmp_dir)
+
+        chunks = list(read_file_chunks(paths['parquet'], "panel.parquet", chunksize=2))
+        assert [len(chunk) for chunk, _ in chunks] == [2, 2, 1]
+        assert chunks[-1][1]['rows'] == 5
+
+        archive = os.path.join(tmp_dir, "bundle.zip")
+        with zipfile.ZipFile(archive, 'w') as zf:
+            zf.write(paths['feather'], "extracts/panel.feather")
+        entries = read_upload(archive, "bundle.zip")
+        assert [source for _, _, source in entries] == ["extracts/panel.feather"]
+        pd.testing.assert_frame_equal(entries[0][0], _panel())
+
+
+def test_memory_maps_are_closed():
+    opened = []
+    open_source = columnar._open_source
+
+    def _recording_open_source(file_path):
+        source, memory_mapped = open_source(file_path)
+        opened.append(source)
+        return source, memory_mapped
+
+    columnar._open_source = _recording_open_source
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for ext, path in _write_all(tmp_dir).items():
+                read_file(path, f"panel.{ext}")
+                assert opened[-1].closed
+
+                # A chunk reader keeps its map open until it is closed
+                chunks = read_file_chunks(path, f"panel.{ext}", chunksize=2)
+                next(chunks)
+                assert not opened[-1].closed
+                chunks.close()
+                assert opened[-1].closed
+    finally:
+        columnar._open_source = open_source
+
+
+def test_allowed_file_accepts_columnar():
+    assert allowed_file("extract.parquet")
+    assert allowed_file("extract.FEATHER")
+    assert allowed_file("extract.arrow")
+    assert not allowed_file("extract.pkl")
+
+
+if __name__ == "__main__":
+    test_columnar_formats_read_like_csv()
+    test_columnar_chunks_and_zip_members()
+    test_memory_maps_are_closed()
+    test_allowed_file_accepts_columnar()
+    print("Columnar ingestion tests passed.")
@@ -0,0 +1,104 @@
+"""
+Tests for compressed single-file CSV inputs.
+"""
+
+import bz2
+import gzip
+import lzma
+import os
+import sys
+import tempfile
+import zipfile
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import allowed_file, app as flask_app
+from local.ingest import compression
+from local.ingest.readers import read_file, read_file_chunks, read_upload, read_upload_sample
+
+COMPRESSORS = {'.gz': gzip.compress, '.bz2': bz2.compress, '.xz': lzma.compress}
+
+
+def _panel_csv(rows: int) -> bytes:
+    lines = ["region,year,gdp"] + [f"Région {i % 3},{2000 + i % 20},{i * 1.5}" for i in range(rows)]
+    return ("\n".join(lines) + "\n").encode("cp1252")
+
+
+@pytest.mark.parametrize("suffix", sorted(COMPRESSORS))
+def test_compressed_csv_matches_plain(suffix):
+    """Compressed CSVs read like the plain file, from a stream or a path, whole or in chunks."""
+    raw = _panel_csv(300)
+    data = COMPRESSORS[suffix](raw)
+    expected, plain_metadata = read_file(BytesIO(raw), "panel.csv")
+
+    df, metadata = read_file(BytesIO(data), f"panel.csv{suffix}")
+    pd.testing.assert_frame_equal(df, expected)
+    assert metadata['encoding'] == plain_metadata['encoding'] == 'cp1252'
+    assert metadata['compression'] == {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz'}[suffix]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, f"panel.csv{suffix}")
+        with open(path, 'wb') as fh:
+            fh.write(data)
+        chunks = list(read_file_chunks(path, f"panel.csv{suffix}", chunksize=128))
+        assert [len(chunk) for chunk, _ in chunks] == [128, 128, 44]
+        pd.testing.assert_frame_equal(pd.concat([chunk for chunk, _ in chunks], ignore_index=True), expected)
+
+    stream = BytesIO(data)
+    (sample, _, _), = read_upload_sample(stream, f"panel.csv{suffix}", nrows=10)
+    pd.testing.assert_frame_equal(sample, expected.head(10))
+    assert stream.tell() == 0
+
+
+def test_encoding_switch_in_compressed_stream():
+    data = gzip.compress(("name,value\n" + "plain,1\n" * 20000 + "Málaga,2\n").encode("cp1252"))
+
+    df, metadata = read_file(BytesIO(data), "late_accent.csv.gz")
+    assert df['name'].iloc[-1] == "Málaga"
+    assert metadata['encoding_detected'] == 'utf-8'
+    assert metadata['encoding'] == 'cp1252'
+
+
+def test_compressed_zip_members_and_allowed_file():
+    archive = BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zf:
+        zf.writestr("extracts/panel.csv.gz", gzip.compress(_panel_csv(20)))
+    entries = read_upload(archive, "bundle.zip")
+    assert [source for _, _, source in entries] == ["extracts/panel.csv.gz"]
+    assert len(entries[0][0]) == 20
+
+    assert allowed_file("panel.csv.gz")
+    assert allowed_file("PANEL.CSV.ZST") == (compression.zstandard is not None)
+    assert not allowed_file("backup.tar.gz")
+
+
+def test_unreadable_codec_is_rejected():
+    if compression.zstandard is not None:
+        pytest.skip("zstandard is installed")
+    data = {'use_openai': 'false', 'files': [(BytesIO(b"\x28\xb5\x2f\xfd"), "panel.csv.zst")]}
+    response = flask_app.test_client().post('/upload', data=data, content_type='multipart/form-data')
+    assert response.status_code == 400
+    assert 'zstd' in response.get_json()['error']
+
+
+def test_zstd_csv():
+    zstandard = pytest.importorskip("zstandard")
+    raw = _panel_csv(50)
+    df, metadata = read_file(BytesIO(zstandard.ZstdCompressor().compress(raw)), "panel.csv.zst")
+    pd.testing.assert_frame_equal(df, read_file(BytesIO(raw), "panel.csv")[0])
+    assert metadata['compression'] == 'zstd'
+
+
+if __name__ == "__main__":
+    for suffix in sorted(COMPRESSORS):
+        test_compressed_csv_matches_plain(suffix)
+    test_encoding_switch_in_compressed_stream()
+    test_compressed_zip_members_and_allowed_file()
+    if compression.zstandard is None:
+        test_unreadable_codec_is_rejected()
+    print("Compressed CSV tests passed.")
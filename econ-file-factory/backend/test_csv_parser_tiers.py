@@ -0,0 +1,58 @@
+"""
+Tests that every parser tier of safe_read_csv returns the same frame.
+"""
+
+import os
+import sys
+import tempfile
+from io import BytesIO
+
+import pandas as pd
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from local.uploads.ingest.readers import safe_read_csv, PARSER_TIERS
+
+CSV = (
+    "firm_id,date,timestamp,time,revenue,employees,note\n"
+    "F1,2020-01-31,2020-01-31 10:00:00,10:00,\"1,200\",5,first\n"
+    "F2,,2021-02-28 11:30:00,11:30,\"3,400\",,\n"
+    "F3,2022-03-31,,,\"56,000\",7,third\n"
+)
+
+
+def _read_all_tiers(source) -> dict:
+    frames = {}
+    for tier in PARSER_TIERS:
+        df, diagnostics = safe_read_csv(source(), tiers=(tier,))
+        assert diagnostics['parser_tier'] == tier
+        frames[tier] = df
+    return frames
+
+
+def test_tiers_return_identical_frames():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'panel.csv')
+        with open(path, 'w') as fh:
+            fh.write(CSV)
+        frames = _read_all_tiers(lambda: path)
+
+    expected = frames['c']
+    assert expected['date'].tolist()[0] == '2020-01-31'
+    assert expected['time'].tolist()[:2] == ['10:00', '11:30']
+    assert expected['revenue'].tolist() == [1200, 3400, 56000]
+    for tier, df in frames.items():
+        pd.testing.assert_frame_equal(df, expected, obj=tier)
+
+
+def test_tiers_return_identical_frames_from_buffer():
+    frames = _read_all_tiers(lambda: BytesIO(CSV.encode()))
+    for tier, df in frames.items():
+        pd.testing.assert_frame_equal(df, frames['c'], obj=tier)
+
+
+if __name__ == "__main__":
+    test_tiers_return_identical_frames()
+    test_tiers_return_identical_frames_from_buffer()
+    print("Parser tier tests passed.")
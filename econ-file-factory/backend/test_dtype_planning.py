@@ -0,0 +1,79 @@
+"""
+Tests for read-time dtype planning and its effect on later pipeline stages.
+"""
+
+import os
+import sys
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from local.ingest.dtypes import plan_dtypes, compact_dataframe
+from local.ingest.parallel import ingest_uploads
+from pipeline import DataHarmonizationPipeline
+
+
+def _firm_panel(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'firm_id': [f"F{i:05d}" for i in range(rows)],
+        'region': rng.choice(['North', 'South', 'East', 'West'], rows),
+        'year': rng.integers(2000, 2024, rows),
+        'employees': rng.integers(1, 5000, rows).astype(float),
+        'revenue': rng.normal(1e6, 2e5, rows).round(2),
+    })
+    df.loc[0, 'employees'] = np.nan
+    return df
+
+
+def test_plan_dtypes():
+    """Low-cardinality text becomes categorical, integers shrink, fractions are kept."""
+    plan = plan_dtypes(_firm_panel(2000))
+
+    assert plan == {'region': 'category', 'year': 'int16', 'employees': 'Int16'}
+
+
+def test_compact_reports_memory_saved():
+    data = _firm_panel(2000).to_csv(index=False).encode("utf-8")
+    (entries, error), = ingest_uploads([BytesIO(data)], ["firms.csv"], compact_dtypes=True)
+
+    df, metadata, _ = entries[0]
+    assert error is None
+    assert isinstance(df['region'].dtype, pd.CategoricalDtype)
+    assert metadata['memory_saved_bytes'] > 0
+    assert metadata['memory_bytes_after'] == df.memory_usage(deep=True).sum()
+
+
+def test_compact_leaves_input_unchanged():
+    original = _firm_panel(200)
+    dtypes_before = original.dtypes.copy()
+    compacted, report = compact_dataframe(original)
+
+    assert report['dtype_plan']
+    assert compacted is not original
+    assert original.dtypes.equals(dtypes_before)
+    assert isinstance(compacted['region'].dtype, pd.CategoricalDtype)
+
+
+def test_merge_fills_compact_columns():
+    """Categorical and nullable integer columns take the 'NaN' marker when merged."""
+    left, _ = compact_dataframe(_firm_panel(50))
+    right = pd.DataFrame({'firm_id': ["X1"], 'sales': [1.0]})
+
+    merged = DataHarmonizationPipeline(use_openai=False).merge_dataframes([left, right])
+
+    assert merged.loc[0, 'employees'] == 'NaN'
+    assert merged.loc[50, 'region'] == 'NaN'
+    assert merged.loc[1, 'region'] in {'North', 'South', 'East', 'West'}
+
+
+if __name__ == "__main__":
+    test_plan_dtypes()
+    test_compact_reports_memory_saved()
+    test_compact_leaves_input_unchanged()
+    test_merge_fills_compact_columns()
+    print("Dtype planning tests passed.")
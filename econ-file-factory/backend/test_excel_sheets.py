@@ -0,0 +1,68 @@
+"""
+Tests for multi-sheet Excel ingestion.
+"""
+
+import io
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from local.ingest.readers import read_excel_sheets, read_upload, _local_path
+
+
+def _workbook(path: str) -> None:
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame({'country': ['IE', 'FR'], 'gdp': [1.0, 2.0]}).to_excel(writer, sheet_name='gdp', index=False)
+        pd.DataFrame({'country': ['IE', 'FR'], 'cpi': [3.0, 4.0]}).to_excel(writer, sheet_name='cpi', index=False)
+
+
+def test_unknown_sheets_recorded_or_rejected():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'book.xlsx')
+        _workbook(path)
+
+        sheets = read_excel_sheets(path, 'book.xlsx', sheet_names=['cpi', 'trade'], max_workers=1)
+        assert [metadata['sheet_used'] for _, metadata in sheets] == ['cpi']
+        assert sheets[0][1]['sheets_missing'] == ['trade']
+
+        try:
+            read_excel_sheets(path, 'book.xlsx', sheet_names=['trade'], max_workers=1)
+        except ValueError as e:
+            assert 'trade' in str(e)
+        else:
+            raise AssertionError("a workbook without any requested sheet should be rejected")
+
+        # read_upload reads sheets the same way
+        entries = read_upload(path, 'book.xlsx', excel_sheets=['gdp', 'trade'], excel_workers=1)
+        assert [source for _, _, source in entries] == ['book.xlsx::gdp']
+
+
+def test_pool_reads_streams_and_files_alike():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'book.xlsx')
+        _workbook(path)
+        expected = read_excel_sheets(path, 'book.xlsx', max_workers=1)
+
+        with open(path, 'rb') as fh:
+            assert _local_path(fh) == path
+            from_file = read_excel_sheets(fh, 'book.xlsx', max_workers=2)
+        with open(path, 'rb') as fh:
+            stream = io.BytesIO(fh.read())
+        assert _local_path(stream) is None
+        from_stream = read_excel_sheets(stream, 'book.xlsx', max_workers=2)
+
+    for sheets in (from_file, from_stream):
+        assert [metadata['sheet_used'] for _, metadata in sheets] == ['gdp', 'cpi']
+        for (df, _), (expected_df, _) in zip(sheets, expected):
+            pd.testing.assert_frame_equal(df, expected_df)
+
+
+if __name__ == "__main__":
+    test_unknown_sheets_recorded_or_rejected()
+    test_pool_reads_streams_and_files_alike()
+    print("Excel sheet tests passed.")
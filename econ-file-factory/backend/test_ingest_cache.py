@@ -0,0 +1,91 @@
+"""
+Tests for the content-hash ingest cache.
+"""
+
+import os
+import sys
+import tempfile
+from io import BytesIO
+
+import pandas as pd
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from local.ingest.cache import IngestCache
+from pipeline import DataHarmonizationPipeline
+
+
+def _csv(country: str) -> bytes:
+    return f"country,year,gdp\n{country},2020,1.5\n{country},2021,1.7\n".encode("utf-8")
+
+
+def test_identical_uploads_are_served_from_cache():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = IngestCache(tmp_dir)
+
+        first = DataHarmonizationPipeline(use_openai=False, ingest_cache=cache)
+        expected, _ = first.ingest_files([BytesIO(_csv("IE"))], ["ireland.csv"])
+        assert first.processing_stats['ingest_cache']['misses'] == 1
+        assert first.processing_stats['ingest_cache']['stores'] == 1
+
+        # Same bytes under a different name still hit
+        second = DataHarmonizationPipeline(use_openai=False, ingest_cache=cache)
+        dataframes, sources = second.ingest_files(
+            [BytesIO(_csv("IE")), BytesIO(_csv("FR"))], ["ie_copy.csv", "france.csv"]
+        )
+        assert sources == ["ie_copy.csv", "france.csv"]
+        pd.testing.assert_frame_equal(dataframes[0], expected[0])
+        assert second.processing_stats['ingest_cache']['hits'] == 1
+        assert second.processing_stats['ingest_cache']['misses'] == 1
+        assert [entry['ingest_cache'] for entry in second.audit_trail['files_processed']] == ['hit', 'miss']
+
+        audit = second.generate_comprehensive_audit(dataframes[0], pd.DataFrame(), {})
+        assert audit['processing_statistics']['ingest_cache']['hits'] == 1
+
+
+class _SharedCache(IngestCache):
+    """A cache another request looks up an unknown upload in during every lookup of this run."""
+
+    def get(self, key, filename=None, tally=None):
+        super().get("other-request", "other.csv")
+        return super().get(key, filename, tally=tally)
+
+
+def test_run_counts_only_its_own_lookups():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = _SharedCache(tmp_dir)
+        DataHarmonizationPipeline(use_openai=False, ingest_cache=cache).ingest_files(
+            [BytesIO(_csv("IE"))], ["ireland.csv"]
+        )
+
+        pipeline = DataHarmonizationPipeline(use_openai=False, ingest_cache=cache)
+        pipeline.ingest_files([BytesIO(_csv("IE")), BytesIO(_csv("FR"))], ["ie.csv", "fr.csv"])
+        stats = pipeline.processing_stats['ingest_cache']
+        assert (stats['hits'], stats['misses'], stats['stores']) == (1, 1, 1)
+        # The shared counters see every request's lookups
+        assert cache.stats()['misses'] == 5
+
+
+def test_lru_eviction_keeps_cache_bounded():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = IngestCache(tmp_dir)
+        entries = [(pd.DataFrame({'x': range(1000)}), {'rows': 1000}, "x.csv")]
+        cache.put("a", entries)
+        cache.max_bytes = cache.stats()['bytes'] * 2
+
+        cache.put("b", entries)
+        cache.get("a")  # "a" is now more recently used than "b"
+        cache.put("c", entries)
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None and cache.get("c") is not None
+        assert cache.stats()['evictions'] == 1
+        assert cache.stats()['bytes'] <= cache.max_bytes
+
+
+if __name__ == "__main__":
+    test_identical_uploads_are_served_from_cache()
+    test_run_counts_only_its_own_lookups()
+    test_lru_eviction_keeps_cache_bounded()
+    print("Ingest cache tests passed.")
@@ -0,0 +1,73 @@
+"""
+Tests for process-pool ingestion of an upload batch.
+"""
+
+import os
+import sys
+import zipfile
+from io import BytesIO
+
+import pandas as pd
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from local.ingest.parallel import ingest_uploads, _encode_frame, _decode_frame
+from pipeline import DataHarmonizationPipeline
+
+
+def _upload_batch():
+    long_csv = b"country,year,gdp\nIE,2020,1.5\nIE,2021,1.7\nFR,2020,2.1\n"
+    wide_csv = b"country,gdp_2020,gdp_2021\nIE,1.5,1.7\nFR,2.1,2.3\n"
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr("data/trade.csv", "country,year,exports\nIE,2020,10\n")
+    files = [BytesIO(long_csv), BytesIO(b"not,a\nvalid"), BytesIO(wide_csv), BytesIO(buffer.getvalue())]
+    filenames = ["long.csv", "broken.txt", "wide.csv", "bundle.zip"]
+    return files, filenames
+
+
+def test_parallel_matches_sequential():
+    """Parallel ingestion returns the same frames, in upload order, as the sequential path."""
+    files, filenames = _upload_batch()
+    sequential = ingest_uploads(files, filenames)
+    files, filenames = _upload_batch()
+    parallel = ingest_uploads(files, filenames, max_workers=2)
+
+    assert len(parallel) == len(filenames)
+    for (seq_entries, seq_error), (par_entries, par_error) in zip(sequential, parallel):
+        assert (seq_error is None) == (par_error is None)
+        assert [src for _, _, src in par_entries] == [src for _, _, src in seq_entries]
+        for (seq_df, _, _), (par_df, metadata, _) in zip(seq_entries, par_entries):
+            pd.testing.assert_frame_equal(par_df, seq_df)
+            assert metadata['transfer_format'] == 'arrow_ipc'
+            assert metadata['parse_seconds'] >= 0
+
+    assert parallel[1][1] is not None
+    assert [src for _, _, src in parallel[3][0]] == ["data/trade.csv"]
+
+
+def test_unsupported_frames_fall_back_to_pickle():
+    """Frames Arrow cannot hold faithfully are pickled instead."""
+    df = pd.DataFrame({'a': [1, 'x', 2.5]}, dtype=object)
+    encoded = _encode_frame(df)
+    assert encoded[0] == 'pickle'
+    pd.testing.assert_frame_equal(_decode_frame(encoded), df)
+
+
+def test_pipeline_records_parse_times():
+    files, filenames = _upload_batch()
+    pipeline = DataHarmonizationPipeline(use_openai=False, ingest_workers=2)
+    dataframes, sources = pipeline.ingest_files(files, filenames)
+
+    assert sources == ["long.csv", "wide.csv", "data/trade.csv"]
+    entries = pipeline.audit_trail['files_processed']
+    assert [entry['filename'] for entry in entries] == sources
+    assert all(entry['parse_seconds'] is not None for entry in entries)
+
+
+if __name__ == "__main__":
+    test_parallel_matches_sequential()
+    test_unsupported_frames_fall_back_to_pickle()
+    test_pipeline_records_parse_times()
+    print("Parallel ingestion tests passed.")
@@ -0,0 +1,76 @@
+"""
+Tests for the memoised period parser used by the reshapers.
+"""
+
+import os
+import re
+import sys
+
+import pandas as pd
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from local.wrangler.reShaper import (
+    PeriodInfo, _reshape_wide_to_panel, _split_melted_headers, extract_var_period_dynamic,
+    parse_period_header, parse_period_headers
+)
+
+HEADERS = ['revenue_2020', 'gdp_2019Q3', 'exports Q1-2021', 'sales_mar', 'Sales_Dec', 'firm_id',
+           'employees-2018', 'var_99', '2020_revenue', 'north_2020', 'sector', 'wages 2017q4']
+
+
+def _reference(col):
+    """The parser as it was before memoisation."""
+    period_regex = r'(?:-?\d{4}Q\d|Q\d-?\d{4}|-?\d{4}|-?\d{2,4}|jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec|january|february|march|april|may|june|july|august|september|october|november|december)'
+    m = re.search(period_regex, col, re.IGNORECASE)
+    if m:
+        return (col[:m.start()] + col[m.end():]).strip("_- "), m.group(0)
+    return col, None
+
+
+def test_same_split_as_before():
+    for col in HEADERS:
+        assert extract_var_period_dynamic(col) == _reference(col), col
+
+
+def test_structured_periods():
+    assert parse_period_header('revenue_2020') == PeriodInfo('revenue', '2020', year=2020)
+    assert parse_period_header('gdp_2019Q3') == PeriodInfo('gdp', '2019Q3', year=2019, quarter=3)
+    assert parse_period_header('exports Q1-2021') == PeriodInfo('exports', 'Q1-2021', year=2021, quarter=1)
+    assert parse_period_header('Sales_Dec') == PeriodInfo('Sales', 'Dec', month=12)
+    assert parse_period_header('var_99') == PeriodInfo('var', '99')
+    assert parse_period_header('sector') == PeriodInfo('sector', None)
+
+
+def test_batch_parses_each_header_once():
+    parse_period_header.cache_clear()
+    columns = HEADERS * 50
+    assert parse_period_headers(columns) == [parse_period_header(col) for col in columns]
+    info = parse_period_header.cache_info()
+    assert info.misses == len(set(HEADERS))
+
+
+def test_melted_split_matches_per_row_split():
+    headers = pd.Series(HEADERS * 3)
+    variables, periods = _split_melted_headers(headers)
+    per_row = headers.apply(lambda x: pd.Series(extract_var_period_dynamic(x)))
+    pd.testing.assert_frame_equal(pd.DataFrame({0: variables, 1: periods}), per_row, check_dtype=False)
+
+
+def test_wide_reshape():
+    df = pd.DataFrame({'firm_id': ['F1', 'F2'], 'revenue_2020': [1.0, 2.0], 'revenue_2021': [3.0, 4.0],
+                       'employees_2020': [5.0, 6.0], 'employees_2021': [7.0, 8.0]})
+    panel = _reshape_wide_to_panel(df, 'wide.csv')
+    assert list(panel.columns) == ['firm_id', 'period', 'employees', 'revenue']
+    assert panel.values.tolist() == [['F1', '2020', 5.0, 1.0], ['F1', '2021', 7.0, 3.0],
+                                     ['F2', '2020', 6.0, 2.0], ['F2', '2021', 8.0, 4.0]]
+
+
+if __name__ == "__main__":
+    test_same_split_as_before()
+    test_structured_periods()
+    test_batch_parses_each_header_once()
+    test_melted_split_matches_per_row_split()
+    test_wide_reshape()
+    print("Period parser tests passed.")
@@ -0,0 +1,111 @@
+"""
+Tests for the ragged-row repair fallback of safe_read_csv: thousands-split
+merges, padding, truncation, batching and the repair counts.
+"""
+
+import csv
+import os
+import sys
+import tempfile
+from io import BytesIO, StringIO
+
+import pandas as pd
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from local.uploads.ingest.readers import _manual_read, _merge_thousands_splits, safe_read_csv
+
+HEADER = "firm,revenue,employees,note\n"
+
+# One ragged row of each kind, and what the repair makes of it
+ROWS = [
+    ("A,1,200,5,ok", ["A", "1200", "5", "ok"]),               # one thousands split
+    ("B,7", ["B", "7", "", ""]),                                # short: padded
+    ("C,1,2,3,4,5", ["C", "1", "2", "3"]),                      # no split forms >= 1000: truncated
+    ("D,12,345,678,9,x", ["D", "12345678", "9", "x"]),          # two merges, leftmost pair first
+    ("", ["", "", "", ""]),                                     # blank line: padded
+    ("E,5,6,ok", ["E", "5", "6", "ok"]),                        # fits already
+    ("F,1,000,7,y", ["F", "1000", "7", "y"]),                   # 1 and 000 make 1000
+    ("G,0,999,1,z", ["G", "0", "9991", "z"]),                   # 0999 is below 1000
+    ('H,3,4,"line one\nline two"', ["H", "3", "4", "line one\nline two"]),
+]
+
+# Repair counts for one pass over ROWS
+COUNTS = {"rows": 9, "merged_rows": 4, "merged_cells": 5, "padded_rows": 2, "truncated_rows": 1}
+
+
+def _csv(repeat: int = 1) -> str:
+    return HEADER + "\n".join(row for row, _ in ROWS * repeat) + "\n"
+
+
+def _old_repair(text: str) -> list:
+    """The row-by-row repair the batched one replaced, kept as a reference."""
+    rows = list(csv.reader(StringIO(text)))
+    header_len = len(rows[0])
+    fixed = []
+    for row in rows[1:]:
+        while len(row) > header_len:
+            merged_any = False
+            for i in range(len(row) - 1):
+                if row[i].isdigit() and row[i + 1].isdigit() and int(row[i] + row[i + 1]) >= 1000:
+                    row[i:i + 2] = [row[i] + row[i + 1]]
+                    merged_any = True
+                    break
+            if not merged_any:
+                row = row[:header_len]
+        fixed.append(row + [""] * (header_len - len(row)))
+    return fixed
+
+
+def test_rows_are_merged_padded_and_truncated():
+    df, diagnostics = _manual_read(BytesIO(_csv().encode()), "utf-8", ",", {})
+    assert list(df.columns) == ["firm", "revenue", "employees", "note"]
+    assert df.values.tolist() == [repaired for _, repaired in ROWS]
+    assert diagnostics["repair"] == COUNTS
+
+
+def test_merge_thousands_splits():
+    assert _merge_thousands_splits(["A", "1", "200", "5"], 3) == (["A", "1200", "5"], 1)
+    # Only as many merges as the row has extra cells
+    assert _merge_thousands_splits(["1", "200", "3", "400"], 3) == (["1200", "3", "400"], 1)
+    assert _merge_thousands_splits(["A", "1", "23"], 2) == (["A", "1", "23"], 0)
+
+
+def test_batches_give_the_same_frame():
+    text = _csv(repeat=5)
+    expected, expected_diagnostics = _manual_read(BytesIO(text.encode()), "utf-8", ",", {})
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "ragged.csv")
+        with open(path, "w", newline="") as fh:
+            fh.write(text)
+        # Batch sizes that don't divide the fixture put every kind of row on a boundary
+        for batch_rows in (1, 2, 4, 7):
+            df, diagnostics = _manual_read(path, "utf-8", ",", {}, batch_rows=batch_rows)
+            pd.testing.assert_frame_equal(df, expected)
+            assert diagnostics["repair"] == expected_diagnostics["repair"]
+
+    assert expected_diagnostics["repair"] == {name: 5 * count for name, count in COUNTS.items()}
+
+
+def test_matches_row_by_row_repair():
+    text = _csv(repeat=3)
+    df, _ = _manual_read(BytesIO(text.encode()), "utf-8", ",", {}, batch_rows=4)
+    assert df.values.tolist() == _old_repair(text)
+
+
+def test_safe_read_csv_reports_repairs():
+    df, diagnostics = safe_read_csv(BytesIO(_csv().encode()))
+    assert diagnostics["ragged_rows"] is True
+    assert diagnostics["parser_tier"] == "manual"
+    assert diagnostics["repair"] == COUNTS
+    assert len(df) == len(ROWS)
+
+
+if __name__ == "__main__":
+    test_rows_are_merged_padded_and_truncated()
+    test_merge_thousands_splits()
+    test_batches_give_the_same_frame()
+    test_matches_row_by_row_repair()
+    test_safe_read_csv_reports_repairs()
+    print("Ragged row repair tests passed.")
@@ -0,0 +1,138 @@
+"""
+Tests for row-filter pushdown: period ranges, entity allow-lists and predicates.
+"""
+
+import os
+import sys
+import tempfile
+from io import BytesIO
+
+import pandas as pd
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from local.wrangler.reShaper import reshape_to_panel_format
+from local.wrangler.rowFilter import filter_rows, validate_filter_spec
+from pipeline import DataHarmonizationPipeline
+
+
+def _wide_csv(rows: int) -> bytes:
+    lines = ["firm_id,revenue_2019,revenue_2020,revenue_2021,employees_2019,employees_2020,employees_2021"]
+    for i in range(rows):
+        lines.append(f"F{i:04d},{900 + i},{1000 + i},{1100 + i},{45 + i},{50 + i},{55 + i}")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _long_csv(rows: int) -> bytes:
+    lines = ["country,year,gdp,cpi"]
+    for i in range(rows):
+        lines.append(f"C{i % 7},{2010 + i % 12},{100 + i},{1.5 + i % 3}")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def test_validate_filter_spec():
+    assert validate_filter_spec(None) is None
+    spec = validate_filter_spec({'period_start': '2015', 'where': [('gdp', '>', 1)]})
+    assert spec == {'period_start': 2015, 'where': [['gdp', '>', 1]]}
+    for bad in [{'periods': 1}, {'where': [['gdp', '~', 1]]}, {'where': [['gdp', 'in', 3]]}]:
+        try:
+            validate_filter_spec(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"{bad} should be rejected")
+
+
+def test_filter_rows_on_long_frame():
+    df = pd.read_csv(BytesIO(_long_csv(60)))
+    spec = validate_filter_spec({'period_start': 2015, 'period_end': 2018,
+                                 'entities': ['C1', 'C2'], 'where': [['gdp', '>=', 120]]})
+    filtered = filter_rows(df, spec)
+
+    expected = df[df['year'].between(2015, 2018) & df['country'].isin(['C1', 'C2']) & (df['gdp'] >= 120)]
+    pd.testing.assert_frame_equal(filtered, expected)
+
+
+def test_wide_reshape_skips_out_of_range_headers():
+    df = pd.read_csv(BytesIO(_wide_csv(5)))
+    full = reshape_to_panel_format(df, 'wide', 'wide.csv')
+    filtered = reshape_to_panel_format(df, 'wide', 'wide.csv', periods=(2020, None))
+
+    assert sorted(filtered['period'].unique()) == ['2020', '2021']
+    expected = full[full['period'].isin(['2020', '2021'])].reset_index(drop=True)
+    pd.testing.assert_frame_equal(filtered.reset_index(drop=True), expected)
+
+
+def test_quarter_periods_filtered_by_year():
+    df = pd.DataFrame({'firm_id': ['F1', 'F2'], 'revenue_Q4-2019': [1, 2],
+                       'revenue_Q1-2020': [3, 4], 'revenue_Q2-2020': [5, 6]})
+    filtered = reshape_to_panel_format(df, 'wide', 'quarters.csv', periods=(2020, None))
+    assert sorted(filtered['period'].unique()) == ['Q1-2020', 'Q2-2020']
+    assert sorted(filtered['revenue']) == [3, 4, 5, 6]
+
+    long_df = pd.DataFrame({'firm_id': ['F1', 'F1', 'F1', 'F1'], 'period': ['Q4-2019', 'Q1-2020', 'Q2-2020', None],
+                            'revenue': [1, 3, 5, 7]})
+    spec = validate_filter_spec({'period_start': 2015, 'period_end': 2020})
+    pd.testing.assert_frame_equal(filter_rows(long_df, spec), long_df)
+    # Rows without a period are kept
+    spec = validate_filter_spec({'period_start': 2020})
+    assert filter_rows(long_df, spec)['revenue'].tolist() == [3, 5, 7]
+
+
+def test_filtered_reshape_matches_filtering_afterwards():
+    """Filtering before and during reshaping gives the rows of the unfiltered panel that pass."""
+    filters = validate_filter_spec({'period_start': 2020, 'entities': ['F0001', 'F0003', 'F0004']})
+    pipeline = DataHarmonizationPipeline(use_openai=False)
+    dataframes, sources = pipeline.ingest_files([BytesIO(_wide_csv(12))], ["wide.csv"])
+    [unfiltered] = pipeline.reshape_data(dataframes, ['wide'], sources)
+    expected = unfiltered[unfiltered['period'].isin(['2020', '2021'])
+                          & unfiltered['firm_id'].isin(filters['entities'])].reset_index(drop=True)
+
+    pipeline = DataHarmonizationPipeline(use_openai=False)
+    pipeline.filters = filters
+    dataframes, sources = pipeline.ingest_files([BytesIO(_wide_csv(12))], ["wide.csv"])
+    [filtered] = pipeline.reshape_data(dataframes, ['wide'], sources)
+    pd.testing.assert_frame_equal(filtered.reset_index(drop=True), expected)
+    assert pipeline.processing_stats['row_filter']['rows_removed_before_reshape'] == 9
+
+    pipeline = DataHarmonizationPipeline(use_openai=False, chunk_size=5)
+    pipeline.filters = filters
+    [streamed], _ = pipeline.ingest_and_reshape_chunked([BytesIO(_wide_csv(12))], ["wide.csv"])
+    pd.testing.assert_frame_equal(streamed, expected)
+
+
+def test_run_with_filters():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_path = os.path.join(tmp_dir, 'MASTER.csv')
+        pipeline = DataHarmonizationPipeline(use_openai=False, output_path=output_path)
+        result = pipeline.run([BytesIO(_wide_csv(12))], ["wide.csv"],
+                              filters={'entities': ['F0002', 'F0005']})
+        assert result['success'], result.get('error')
+        assert set(result['master_df']['firm_id']) == {'F0002', 'F0005'}
+        assert pipeline.processing_stats['row_filter']['rows_removed_before_reshape'] == 10
+
+        result = DataHarmonizationPipeline(use_openai=False, output_path=output_path).run(
+            [BytesIO(_wide_csv(3))], ["wide.csv"], filters={'where': [['gdp', 'like', 1]]})
+        assert not result['success']
+
+
+def test_long_file_filtered_while_streaming():
+    pipeline = DataHarmonizationPipeline(use_openai=False, chunk_size=10)
+    pipeline.filters = validate_filter_spec({'period_end': 2012, 'where': [['cpi', '<', 3]]})
+    [reshaped], _ = pipeline.ingest_and_reshape_chunked([BytesIO(_long_csv(48))], ["long.csv"])
+
+    df = pd.read_csv(BytesIO(_long_csv(48)))
+    expected = df[(df['year'] <= 2012) & (df['cpi'] < 3)].reset_index(drop=True)
+    pd.testing.assert_frame_equal(reshaped, expected)
+    assert pipeline.processing_stats['row_filter']['rows_removed_before_reshape'] == 48 - len(expected)
+
+
+if __name__ == "__main__":
+    test_validate_filter_spec()
+    test_filter_rows_on_long_frame()
+    test_wide_reshape_skips_out_of_range_headers()
+    test_quarter_periods_filtered_by_year()
+    test_filtered_reshape_matches_filtering_afterwards()
+    test_run_with_filters()
+    test_long_file_filtered_while_streaming()
+    print("Row filter tests passed.")
@@ -0,0 +1,77 @@
+"""
+Tests for the sample-first reader and the overlapped ingestion path.
+"""
+
+import os
+import sys
+import zipfile
+from io import BytesIO
+
+import pandas as pd
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from local.ingest.readers import read_upload, read_upload_sample
+from pipeline import DataHarmonizationPipeline
+
+
+def _wide_csv(rows: int) -> bytes:
+    lines = ["firm_id,revenue_2020,revenue_2021,employees_2020,employees_2021"]
+    for i in range(rows):
+        lines.append(f"F{i:04d},{1000 + i},{1100 + i},{50 + i},{55 + i}")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _workbook() -> bytes:
+    buffer = BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        pd.DataFrame({'country': ['IE'] * 30, 'gdp': range(30)}).to_excel(writer, sheet_name='gdp', index=False)
+        pd.DataFrame({'country': ['FR'] * 30, 'cpi': range(30)}).to_excel(writer, sheet_name='cpi', index=False)
+    return buffer.getvalue()
+
+
+def test_sample_matches_head_of_full_read():
+    """Samples have the same sources and first rows as read_upload, and leave streams where they were."""
+    archive = BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zf:
+        zf.writestr("nested/wide.csv", _wide_csv(40))
+        zf.writestr("book.xlsx", _workbook())
+
+    for data, filename, sheets in [(_wide_csv(40), "wide.csv", 'first'),
+                                   (_workbook(), "book.xlsx", 'all'),
+                                   (archive.getvalue(), "bundle.zip", 'all')]:
+        stream = BytesIO(data)
+        samples = read_upload_sample(stream, filename, nrows=10, excel_sheets=sheets)
+        assert stream.tell() == 0
+        full = read_upload(stream, filename, excel_sheets=sheets)
+
+        assert [source for _, _, source in samples] == [source for _, _, source in full]
+        for (sample_df, metadata, _), (full_df, _, _) in zip(samples, full):
+            assert metadata['sample'] is True and len(sample_df) == 10
+            pd.testing.assert_frame_equal(sample_df, full_df.head(10))
+
+
+def test_sample_first_run_matches_full_run():
+    def run(**options):
+        pipeline = DataHarmonizationPipeline(use_openai=False, **options)
+        dataframes, sources = pipeline.ingest_files([BytesIO(_wide_csv(30))], ["wide.csv"])
+        shapes = pipeline.detect_shapes(dataframes, sources)
+        reshaped = pipeline.reshape_data(dataframes, shapes, sources)
+        return reshaped, sources, pipeline.harmonize_columns(reshaped, sources)
+
+    expected = run()
+    pipeline = DataHarmonizationPipeline(use_openai=False, sample_rows=5)
+    reshaped, sources, mapping = pipeline.ingest_with_sample_first([BytesIO(_wide_csv(30))], ["wide.csv"])
+
+    assert sources == expected[1]
+    assert mapping == expected[2]
+    pd.testing.assert_frame_equal(reshaped[0], expected[0][0])
+    assert pipeline.audit_trail['shape_detections'][0]['detected_shape'] == 'wide'
+    assert pipeline.audit_trail['files_processed'][0]['rows'] == 30
+
+
+if __name__ == "__main__":
+    test_sample_matches_head_of_full_read()
+    test_sample_first_run_matches_full_run()
+    print("Sample-first tests passed.")
@@ -0,0 +1,84 @@
+"""
+Tests for the persistent shape detection cache.
+"""
+
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ai.shapeCache import ShapeCache, shape_fingerprint
+from ai.stubServer import StubChatServer
+from pipeline import DataHarmonizationPipeline
+
+
+def _wide(years) -> pd.DataFrame:
+    data = {'Firm ID': ['F1', 'F2', 'F3']}
+    for variable in ('revenue', 'employees'):
+        for year in years:
+            data[f"{variable}_{year}"] = [1.5, 2.5, 3.5]
+    return pd.DataFrame(data)
+
+
+def test_fingerprint_ignores_year_count_but_not_layout():
+    assert shape_fingerprint(_wide([2020, 2021])) == shape_fingerprint(_wide([2019, 2020, 2021]))
+    # Case and separators don't matter
+    renamed = _wide([2020, 2021]).rename(columns={'Firm ID': 'firm_id'})
+    assert shape_fingerprint(renamed) == shape_fingerprint(_wide([2020, 2021]))
+
+    assert shape_fingerprint(_wide([2020])) != shape_fingerprint(_wide([2020]).rename(columns={'Firm ID': 'country'}))
+    text_values = _wide([2020]).assign(revenue_2020=['a', 'b', 'c'])
+    assert shape_fingerprint(text_values) != shape_fingerprint(_wide([2020]))
+
+
+def test_ttl_and_eviction():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = ShapeCache(os.path.join(tmp_dir, 'shapes.sqlite'), ttl_seconds=100, max_entries=2)
+        cache.put('a', 'wide', now=0)
+        cache.put('b', 'cross_tab', now=10)
+        assert cache.get('a', now=50) == 'wide'
+        assert cache.get('a', now=101) is None
+        assert cache.counters['expired'] == 1
+
+        cache.put('c', 'key_value', now=20)
+        cache.put('d', 'wide', now=30)
+        # 'b' was used least recently
+        assert cache.get('b', now=40) is None
+        assert cache.stats()['entries'] == 2
+        assert cache.counters['evictions'] == 1
+
+        # Entries persist across instances
+        assert ShapeCache(os.path.join(tmp_dir, 'shapes.sqlite')).get('d', now=40) == 'wide'
+
+
+def test_detect_shapes_uses_cache_before_ai():
+    # The first layout asked about is wide; anything after gets an invalid answer
+    answers = iter(['wide'])
+    with StubChatServer(lambda body: next(answers, 'no idea')) as server, \
+            tempfile.TemporaryDirectory() as tmp_dir:
+        cache = ShapeCache(os.path.join(tmp_dir, 'shapes.sqlite'))
+        # Ask the AI about every file, however confident the local classifier is
+        pipeline = DataHarmonizationPipeline(api_key='test-key', shape_cache=cache, shape_concurrency=1,
+                                             api_base_url=server.base_url, shape_confidence_threshold=None)
+        key_value = pd.DataFrame({'variable': ['x'], 'value': [1]})
+        assert pipeline.detect_shapes([_wide([2020, 2021]), key_value], ['a.csv', 'c.csv']) == ['wide', 'key_value']
+        # b.csv has a.csv's layout; c.csv fell back to local detection and wasn't stored
+        assert pipeline.detect_shapes([_wide([2018, 2019, 2020]), key_value], ['b.csv', 'c.csv']) == ['wide', 'key_value']
+
+        assert len(server.requests) == 3
+        assert [d['shape_cache'] for d in pipeline.audit_trail['shape_detections']] == ['miss', 'miss', 'hit', 'miss']
+        assert [d['detected_by'] for d in pipeline.audit_trail['shape_detections']] == ['ai', 'local', 'cache', 'local']
+        assert pipeline.processing_stats['shape_cache'] == {
+            'hits': 1, 'misses': 3, 'hit_rate': 0.25, 'entries': 1
+        }
+
+
+if __name__ == "__main__":
+    test_fingerprint_ignores_year_count_but_not_layout()
+    test_ttl_and_eviction()
+    test_detect_shapes_uses_cache_before_ai()
+    print("Shape cache tests passed.")
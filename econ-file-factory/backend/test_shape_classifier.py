@@ -0,0 +1,64 @@
+"""
+Tests for the local shape classifier and confidence-gated AI escalation.
+"""
+
+import os
+import sys
+from io import StringIO
+
+import pandas as pd
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ai.stubServer import StubChatServer
+from local.wrangler.shapeClassifier import classify_shape, SHAPE_TYPES
+from pipeline import DataHarmonizationPipeline
+
+
+EXAMPLES = {
+    'wide': "firm_id,revenue_2020,revenue_2021,employees_2020,employees_2021\nA001,10,11,5,6\nA002,20,21,7,8\n",
+    'two_row_header': ",,,\nfirm,2020,2020,2021\nid,revenue,employees,revenue\nA001,1,2,3\nA002,4,5,6\n",
+    'key_value': "firm_id,year,variable,value\nA020,2020,revenue,10\nA020,2020,employees,33\n",
+    'cross_tab': "region,agriculture,industry,services\nNorth,1,2,3\nSouth,5,6,7\n",
+    'fully_transposed': "variable,2020,2021,2022\nrevenue,1,2,3\nemployees,5,6,7\n",
+    'stacked_multi_time_long': "FirmCode,Year,Income,StaffTotal\nA010,2020,15000,25\nA010,2021,15000,26\n",
+    'pivoted_by_variable': "indicator,north_2020,north_2021,south_2020\nrevenue,1,2,3\nemployees,5,6,7\n",
+}
+
+
+def _sample(csv: str) -> pd.DataFrame:
+    return pd.read_csv(StringIO(csv)).head(5)
+
+
+def test_classifies_each_supported_shape():
+    assert set(EXAMPLES) == set(SHAPE_TYPES)
+    for shape, csv in EXAMPLES.items():
+        result = classify_shape(_sample(csv))
+        assert result['shape'] == shape, (shape, result)
+        assert result['confidence'] >= 0.3, (shape, result)
+        assert set(result['scores']) == set(SHAPE_TYPES)
+
+
+def test_featureless_sample_is_unknown():
+    result = classify_shape(pd.DataFrame({'a': [None], 'b': [None]}))
+    assert result == {'shape': 'unknown', 'confidence': 0.0, 'scores': result['scores']}
+
+
+def test_only_uncertain_files_go_to_the_ai():
+    ambiguous = pd.DataFrame({'a': ['x', 'y'], 'b': ['p', 'q']})
+    with StubChatServer(lambda body: 'pivoted_by_variable') as server:
+        pipeline = DataHarmonizationPipeline(api_key='test-key', api_base_url=server.base_url)
+        shapes = pipeline.detect_shapes([_sample(EXAMPLES['wide']), ambiguous], ['wide.csv', 'odd.csv'])
+        assert len(server.requests) == 1
+
+    assert shapes == ['wide', 'pivoted_by_variable']
+    assert [d['detected_by'] for d in pipeline.audit_trail['shape_detections']] == ['local', 'ai']
+    assert pipeline.processing_stats['shape_detection'] == {'local': 1, 'cache': 0, 'ai': 1}
+
+
+if __name__ == "__main__":
+    test_classifies_each_supported_shape()
+    test_featureless_sample_is_unknown()
+    test_only_uncertain_files_go_to_the_ai()
+    print("Shape classifier tests passed.")
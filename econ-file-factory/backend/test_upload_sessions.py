@@ -0,0 +1,229 @@
+"""
+Tests for resumable chunked upload sessions.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from io import BytesIO
+
+import pytest
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import app as app_module
+from local.uploads.sessions import (
+    UploadSessionStore, ChunkHashMismatch, ChunkOutOfOrder, SessionBusy, SessionNotFound, UploadSessionError
+)
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _csv(rows: int) -> bytes:
+    lines = ["country,year,gdp"] + [f"C{i},{2000 + i % 20},{i * 1.5}" for i in range(rows)]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def test_chunks_are_verified_and_appended_in_order():
+    data = _csv(200)
+    chunks = [data[i:i + 1000] for i in range(0, len(data), 1000)]
+
+    with tempfile.TemporaryDirectory() as root:
+        store = UploadSessionStore(root)
+        session_id = store.open_session("panel.csv", total_bytes=len(data))['session_id']
+
+        store.append_chunk(session_id, 0, BytesIO(chunks[0]), _sha256(chunks[0]))
+        with pytest.raises(ChunkOutOfOrder):
+            store.append_chunk(session_id, 2, BytesIO(chunks[2]), _sha256(chunks[2]))
+        with pytest.raises(ChunkHashMismatch):
+            store.append_chunk(session_id, 1, BytesIO(chunks[1][:-1]), _sha256(chunks[1]))
+        with pytest.raises(UploadSessionError):
+            store.completed_file(session_id)
+
+        # A retried chunk 0 is accepted without being written twice
+        store.append_chunk(session_id, 0, BytesIO(chunks[0]), _sha256(chunks[0]))
+        for index, chunk in enumerate(chunks[1:], start=1):
+            manifest = store.append_chunk(session_id, index, BytesIO(chunk), _sha256(chunk))
+
+        assert manifest['received_bytes'] == len(data)
+        with open(store.completed_file(session_id)['path'], 'rb') as fh:
+            assert fh.read() == data
+
+
+def _killed(manifest):
+    raise OSError("killed before the manifest was written")
+
+
+def test_chunk_retried_after_interrupted_append():
+    data = _csv(200)
+    chunks = [data[i:i + 1000] for i in range(0, len(data), 1000)]
+
+    with tempfile.TemporaryDirectory() as root:
+        store = UploadSessionStore(root)
+        session_id = store.open_session("panel.csv", total_bytes=len(data))['session_id']
+        store.append_chunk(session_id, 0, BytesIO(chunks[0]), _sha256(chunks[0]))
+
+        # The chunk reaches the data file, then the process dies before the manifest is written
+        store._write_manifest = _killed
+        with pytest.raises(OSError):
+            store.append_chunk(session_id, 1, BytesIO(chunks[1]), _sha256(chunks[1]))
+        del store._write_manifest
+        data_path = store._data_path(session_id)
+        assert os.path.getsize(data_path) == len(chunks[0]) + len(chunks[1])
+
+        # The retry overwrites the orphaned bytes instead of following them
+        for index, chunk in enumerate(chunks[1:], start=1):
+            manifest = store.append_chunk(session_id, index, BytesIO(chunk), _sha256(chunk))
+        assert manifest['received_bytes'] == len(data)
+        with open(store.completed_file(session_id)['path'], 'rb') as fh:
+            assert fh.read() == data
+
+
+def test_missing_data_file_is_recreated():
+    chunk = _csv(10)
+    with tempfile.TemporaryDirectory() as root:
+        store = UploadSessionStore(root)
+        session_id = store.open_session("panel.csv", total_bytes=len(chunk))['session_id']
+        os.remove(store._data_path(session_id))
+        store.append_chunk(session_id, 0, BytesIO(chunk), _sha256(chunk))
+        with open(store.completed_file(session_id)['path'], 'rb') as fh:
+            assert fh.read() == chunk
+
+
+def test_abandoned_sessions_are_collected():
+    with tempfile.TemporaryDirectory() as root:
+        store = UploadSessionStore(root, ttl_seconds=60)
+        stale = store.open_session("old.csv")['session_id']
+        fresh = store.open_session("new.csv")['session_id']
+
+        assert store.collect_garbage(now=time.time() + 30) == []
+        store.append_chunk(fresh, 0, BytesIO(b"a,b\n"), _sha256(b"a,b\n"))
+        manifest = store.get_session(fresh)
+        assert store.collect_garbage(now=manifest['updated'] + 59) == []
+        assert sorted(store.collect_garbage(now=manifest['updated'] + 61)) == sorted([stale, fresh])
+        with pytest.raises(SessionNotFound):
+            store.get_session(stale)
+
+
+class _HeldStream:
+    """A chunk body that is sent only once `release` is set."""
+
+    def __init__(self, data: bytes):
+        self.data = BytesIO(data)
+        self.reading = threading.Event()
+        self.release = threading.Event()
+
+    def read(self, size=-1):
+        self.reading.set()
+        self.release.wait(5)
+        return self.data.read(size)
+
+
+def test_sessions_are_locked_one_at_a_time():
+    with tempfile.TemporaryDirectory() as root:
+        store = UploadSessionStore(root)
+        slow = store.open_session("slow.csv")['session_id']
+        fast = store.open_session("fast.csv")['session_id']
+
+        stream = _HeldStream(b"a,b\n")
+        writer = threading.Thread(target=store.append_chunk, args=(slow, 0, stream, _sha256(b"a,b\n")))
+        writer.start()
+        try:
+            assert stream.reading.wait(5)
+            # Other sessions don't wait for the chunk being written
+            store.append_chunk(fast, 0, BytesIO(b"c,d\n"), _sha256(b"c,d\n"))
+            with pytest.raises(SessionBusy):
+                store.append_chunk(slow, 0, BytesIO(b"a,b\n"), _sha256(b"a,b\n"))
+        finally:
+            stream.release.set()
+            writer.join()
+
+        assert store.get_session(slow)['received_bytes'] == 4
+        assert store.get_session(fast)['received_bytes'] == 4
+
+
+def test_garbage_is_collected_while_chunks_arrive():
+    with tempfile.TemporaryDirectory() as root:
+        store = UploadSessionStore(root, ttl_seconds=60, gc_interval_seconds=0)
+        stale = store.open_session("old.csv")['session_id']
+        fresh = store.open_session("new.csv")['session_id']
+
+        manifest_path = os.path.join(root, stale, "session.json")
+        with open(manifest_path) as fh:
+            manifest = json.load(fh)
+        manifest['updated'] -= 120
+        with open(manifest_path, 'w') as fh:
+            json.dump(manifest, fh)
+
+        store.append_chunk(fresh, 0, BytesIO(b"a,b\n"), _sha256(b"a,b\n"))
+        with pytest.raises(SessionNotFound):
+            store.get_session(stale)
+
+
+@pytest.mark.usefixtures("scratch_app")
+def test_session_upload_endpoints():
+    client = app_module.app.test_client()
+    data = _csv(300)
+
+    response = client.post('/upload/sessions', json={'filename': 'panel.csv', 'total_bytes': len(data)})
+    assert response.status_code == 201
+    session_id = response.get_json()['session_id']
+
+    half = len(data) // 2
+    response = client.put(f'/upload/sessions/{session_id}/chunks/0', data=data[:half],
+                          headers={'X-Chunk-SHA256': _sha256(b"tampered")})
+    assert response.status_code == 400
+    for index, chunk in enumerate([data[:half], data[half:]]):
+        response = client.put(f'/upload/sessions/{session_id}/chunks/{index}', data=chunk,
+                              headers={'X-Chunk-SHA256': _sha256(chunk)})
+        assert response.status_code == 200
+    assert client.get(f'/upload/sessions/{session_id}').get_json()['received_bytes'] == len(data)
+
+    response = client.post('/upload', data={'use_openai': 'false', 'session_id': session_id},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert b"# Audit Report" in response.data
+    assert client.get(f'/upload/sessions/{session_id}').status_code == 404
+
+
+@pytest.mark.usefixtures("scratch_app")
+def test_sessions_kept_when_run_fails():
+    client = app_module.app.test_client()
+    data = _csv(20)
+    session_id = client.post('/upload/sessions', json={'filename': 'panel.csv'}).get_json()['session_id']
+    client.put(f'/upload/sessions/{session_id}/chunks/0', data=data, headers={'X-Chunk-SHA256': _sha256(data)})
+
+    run = app_module.DataHarmonizationPipeline.run
+    app_module.DataHarmonizationPipeline.run = lambda self, *args, **kwargs: {'success': False, 'error': 'failed'}
+    try:
+        response = client.post('/upload', data={'use_openai': 'false', 'session_id': session_id},
+                               content_type='multipart/form-data')
+    finally:
+        app_module.DataHarmonizationPipeline.run = run
+    assert response.status_code == 500
+    assert client.get(f'/upload/sessions/{session_id}').status_code == 200
+
+    # The retry uses the same session without re-uploading
+    response = client.post('/upload', data={'use_openai': 'false', 'session_id': session_id},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert client.get(f'/upload/sessions/{session_id}').status_code == 404
+
+
+if __name__ == "__main__":
+    test_chunks_are_verified_and_appended_in_order()
+    test_chunk_retried_after_interrupted_append()
+    test_missing_data_file_is_recreated()
+    test_abandoned_sessions_are_collected()
+    test_sessions_are_locked_one_at_a_time()
+    test_garbage_is_collected_while_chunks_arrive()
+    test_session_upload_endpoints()
+    test_sessions_kept_when_run_fails()
+    print("Upload session tests passed.")
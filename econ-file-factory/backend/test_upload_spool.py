@@ -0,0 +1,129 @@
+"""
+Tests for disk-spooled upload handling.
+"""
+
+import os
+import sys
+import tempfile
+import zipfile
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import app as app_module
+from local.ingest.readers import is_data_file
+from local.uploads.spool import UploadSpool, UploadTooLarge
+
+
+def _csv(rows: int) -> bytes:
+    lines = ["country,year,gdp"] + [f"C{i},{2000 + i % 20},{i * 1.5}" for i in range(rows)]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _zip(members: dict) -> bytes:
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def test_spool_keeps_small_files_in_memory_and_large_on_disk():
+    with tempfile.TemporaryDirectory() as scratch_root:
+        with UploadSpool(scratch_root, memory_bytes=1024) as spool:
+            spool.add(BytesIO(_csv(5)), "small.csv")
+            spool.add_zip_members(BytesIO(_zip({
+                "data/large.csv": _csv(500),
+                "__MACOSX/data/._large.csv": b"junk",
+                "notes.txt": b"ignored",
+            })), is_data_file)
+
+            assert spool.filenames == ["small.csv", "data/large.csv"]
+            small, large = spool.files
+            assert isinstance(small, BytesIO)
+            assert isinstance(large, str) and os.path.dirname(large) == str(spool.directory)
+            pd.testing.assert_frame_equal(pd.read_csv(large), pd.read_csv(BytesIO(_csv(500))))
+            assert spool.bytes_on_disk == len(_csv(500))
+
+        assert os.listdir(scratch_root) == []
+
+
+def test_spool_enforces_disk_limit():
+    with UploadSpool(memory_bytes=1024, disk_bytes=4096) as spool:
+        with pytest.raises(UploadTooLarge):
+            spool.add(BytesIO(_csv(1000)), "huge.csv")
+
+
+def test_parsed_uploads_are_added_without_a_copy():
+    data = _csv(500)
+    with UploadSpool(memory_bytes=1024) as spool:
+        small = spool.stream_factory(None, "text/csv", "small.csv")
+        large = spool.stream_factory(None, "text/csv", "big.csv")
+        small.write(_csv(5))
+        for start in range(0, len(data), 700):
+            large.write(data[start:start + 700])
+        spool.add(small, "small.csv")
+        spool.add(large, "big.csv")
+
+        small, large = spool.files
+        assert isinstance(small, BytesIO) and small.getvalue() == _csv(5)
+        assert isinstance(large, str) and os.path.dirname(large) == str(spool.directory)
+        with open(large, 'rb') as fh:
+            assert fh.read() == data
+        # Written once, by the form parser
+        assert spool.bytes_on_disk == len(data)
+
+
+@pytest.mark.usefixtures("scratch_app")
+def test_upload_endpoint_writes_files_into_the_spool(monkeypatch):
+    def no_copy(self, stream, filename):
+        raise AssertionError(f"{filename} was copied into the spool")
+
+    received = []
+    run = app_module.DataHarmonizationPipeline.run
+
+    def record_files(self, files, filenames, **kwargs):
+        received.extend(files)
+        return run(self, files, filenames, **kwargs)
+
+    monkeypatch.setattr(UploadSpool, '_spool', no_copy)
+    monkeypatch.setattr(app_module.DataHarmonizationPipeline, 'run', record_files)
+    monkeypatch.setattr(app_module, 'UPLOAD_MEMORY_BYTES', 1024)
+    client = app_module.app.test_client()
+    data = {'use_openai': 'false', 'files': [(BytesIO(_csv(500)), "big.csv")]}
+    response = client.post('/upload', data=data, content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert len(received) == 1 and isinstance(received[0], str)
+
+
+@pytest.mark.usefixtures("scratch_app")
+def test_upload_endpoint_spools_zip_members():
+    client = app_module.app.test_client()
+    data = {
+        'use_openai': 'false',
+        'files': [(BytesIO(_zip({"panel.csv": _csv(50)})), "bundle.zip")],
+    }
+    response = client.post('/upload', data=data, content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert b"# Audit Report" in response.data
+
+    limits = app_module.UPLOAD_MEMORY_BYTES, app_module.UPLOAD_DISK_BYTES
+    app_module.UPLOAD_MEMORY_BYTES, app_module.UPLOAD_DISK_BYTES = 1024, 4096
+    try:
+        data = {'use_openai': 'false', 'files': [(BytesIO(_csv(5000)), "big.csv")]}
+        response = client.post('/upload', data=data, content_type='multipart/form-data')
+    finally:
+        app_module.UPLOAD_MEMORY_BYTES, app_module.UPLOAD_DISK_BYTES = limits
+    assert response.status_code == 413
+
+
+if __name__ == "__main__":
+    test_spool_keeps_small_files_in_memory_and_large_on_disk()
+    test_spool_enforces_disk_limit()
+    test_parsed_uploads_are_added_without_a_copy()
+    test_upload_endpoint_spools_zip_members()
+    print("Upload spool tests passed.")
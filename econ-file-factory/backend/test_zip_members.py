@@ -0,0 +1,74 @@
+"""
+Tests for reading data members of ZIP uploads.
+"""
+
+import io
+import os
+import sys
+import zipfile
+
+import pandas as pd
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import allowed_file
+from local.ingest.readers import is_data_file, read_file, read_upload, zip_data_members
+from local.uploads.spool import UploadSpool
+
+
+def _archive(members: dict) -> io.BytesIO:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+def test_members_with_the_same_columns_are_stacked():
+    archive = _archive({'2020.csv': "firm,revenue\nA,1\n", '2021.csv': "firm,revenue\nB,2\n"})
+    df, metadata = read_file(archive, 'panel.zip')
+    assert df.values.tolist() == [['A', 1], ['B', 2]]
+    assert metadata['data_files_used'] == ['2020.csv', '2021.csv']
+    assert metadata['data_files_skipped'] == []
+
+
+def test_members_with_different_columns_are_not_mixed():
+    archive = _archive({'firms.csv': "firm,revenue\nA,1\n", 'prices.csv': "country,cpi\nIE,3\n"})
+    df, metadata = read_file(archive, 'mixed.zip')
+    assert list(df.columns) == ['firm', 'revenue']
+    assert metadata['data_files_used'] == ['firms.csv']
+    assert metadata['data_files_skipped'] == ['prices.csv']
+
+    # read_upload keeps each member as its own source
+    entries = read_upload(archive, 'mixed.zip', zip_workers=1)
+    assert [source for _, _, source in entries] == ['firms.csv', 'prices.csv']
+
+
+def test_xls_members_are_data_files():
+    archive = _archive({'a.csv': "x\n1\n", 'b.xls': b'', 'c.xlsx': b'', 'notes.txt': "", '__MACOSX/a.csv': ""})
+    with zipfile.ZipFile(archive) as zip_ref:
+        assert zip_data_members(zip_ref) == ['a.csv', 'b.xls', 'c.xlsx']
+
+
+def test_app_accepts_what_the_readers_read():
+    assert allowed_file('panel.xls') and allowed_file('PANEL.XLSX') and allowed_file('bundle.zip')
+    assert not allowed_file('notes.txt')
+
+    # The upload spool keeps the same archive members the readers parse
+    archive = _archive({'a.csv': "x\n1\n", 'b.xls': b'', 'c.xlsx': b'', 'nested.zip': b'', 'notes.txt': ""})
+    with zipfile.ZipFile(archive) as zip_ref:
+        members = zip_data_members(zip_ref)
+    archive.seek(0)
+    with UploadSpool(memory_bytes=1024) as spool:
+        spool.add_zip_members(archive, is_data_file)
+        assert spool.filenames == members
+
+
+if __name__ == "__main__":
+    test_members_with_the_same_columns_are_stacked()
+    test_members_with_different_columns_are_not_mixed()
+    test_xls_members_are_data_files()
+    test_app_accepts_what_the_readers_read()
+    print("ZIP member tests passed.")